@@ -0,0 +1,128 @@
+from typing import Optional
+from json_store import WriteBehindFile,atomic_write_json
+from balance_journal import BalanceJournal
+
+
+class AccountStore(WriteBehindFile):
+    """Process-resident view of bank.json ({username: balance}).
+
+    Reads are served from memory, writes are batched to disk by the
+    write-behind thread, so the on-disk format stays the same.
+
+    With a journal every change is also appended to it and fsynced before
+    the call returns, and the background flush becomes a compaction: the
+    journal is rotated, bank.json is rewritten as a snapshot and the folded
+    segments are deleted. On startup the journal tail is replayed over
+    bank.json.
+    """
+    def __init__(self,path:str,flush_interval:float = 1.0,journal:Optional[BalanceJournal] = None):
+        super().__init__(path,{},flush_interval)
+        self.journal = journal
+        if journal is not None:
+            if journal.replay(self.data):
+                self.mark_dirty()
+            journal.open()
+        self._total = sum(self.data.values())
+
+    def serialize(self) -> dict:
+        return dict(self.data)
+
+    def _log(self,op:str,username:str,amount:int,balance:int) -> int:
+        # write-ahead: the record goes to the journal before memory changes
+        if self.journal is None:
+            return 0
+        return self.journal.write(op,username,amount,balance)
+
+    def _commit(self,seq:int):
+        # waits for the fsync after self.lock is released, so changes made
+        # meanwhile by other threads are synced by the same fsync
+        if seq:
+            self.journal.wait(seq)
+
+    def flush(self) -> bool:
+        if self.journal is None:
+            return super().flush()
+        with self._flush_lock:
+            with self.lock:
+                if not self._dirty:
+                    return False
+                payload = self.serialize()
+                segments = self.journal.rotate()
+                self._dirty = False
+            try:
+                atomic_write_json(self.path,payload)
+            except Exception:
+                # the segments stay on disk and are replayed on the next start
+                self._dirty = True
+                raise
+            self.journal.discard(segments)
+            return True
+
+    def exists(self,username:str) -> bool:
+        return username in self.data
+
+    def get(self,username:str) -> Optional[int]:
+        return self.data.get(username)
+
+    def total(self) -> int:
+        return self._total
+
+    def set_default(self,username:str,amount:int = 100) -> bool:
+        with self.lock:
+            if username in self.data:
+                return False
+            seq = self._log("NEW",username,amount,amount)
+            self.data[username] = amount
+            self._total += amount
+            self.mark_dirty()
+        self._commit(seq)
+        return True
+
+    def increase(self,username:str,amount:int) -> int:
+        with self.lock:
+            if username not in self.data:
+                raise KeyError(username)
+            seq = self._log("INC",username,amount,self.data[username] + amount)
+            self.data[username] += amount
+            self._total += amount
+            self.mark_dirty()
+            balance = self.data[username]
+        self._commit(seq)
+        return balance
+
+    def decrease(self,username:str,amount:int) -> bool:
+        with self.lock:
+            if username not in self.data:
+                raise KeyError(username)
+            if self.data[username] < amount:
+                return False
+            seq = self._log("DEC",username,amount,self.data[username] - amount)
+            self.data[username] -= amount
+            self._total -= amount
+            self.mark_dirty()
+        self._commit(seq)
+        return True
+
+    def reset(self,username:str) -> int:
+        with self.lock:
+            if username not in self.data:
+                raise KeyError(username)
+            old = self.data[username]
+            seq = self._log("WDR",username,old,0)
+            self.data[username] = 0
+            self._total -= old
+            self.mark_dirty()
+        self._commit(seq)
+        return old
+
+    def delete(self,username:str) -> bool:
+        with self.lock:
+            if username not in self.data:
+                return False
+            old = self.data[username]
+            seq = self._log("DEL",username,old,0)
+            del self.data[username]
+            self._total -= old
+            self.mark_dirty()
+        self._commit(seq)
+        return True
@@ -0,0 +1,64 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any
+import httpx
+from json_store import atomic_write_json,read_json as read_json_sync
+
+# Blocking file and network work never runs on the event loop: files go
+# through a bounded thread pool, HTTP through one shared async client.
+
+IO_WORKERS = int(os.getenv("IO_WORKERS","8"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT","10"))
+
+executor = ThreadPoolExecutor(max_workers=IO_WORKERS,thread_name_prefix="io")
+_locks = {}
+_http = None
+
+
+async def run_blocking(func,*args,**kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor,functools.partial(func,*args,**kwargs))
+
+
+def path_lock(path:str) -> asyncio.Lock:
+    lock = _locks.get(path)
+    if lock is None:
+        lock = _locks[path] = asyncio.Lock()
+    return lock
+
+
+async def read_json(path:str,default:Any = None) -> Any:
+    return await run_blocking(read_json_sync,path,default)
+
+
+async def write_json(path:str,data:Any):
+    async with path_lock(path):
+        await run_blocking(atomic_write_json,path,data)
+
+
+@asynccontextmanager
+async def edit_json(path:str,default:Any = None):
+    # read-modify-write, serialized per file so concurrent requests can not
+    # lose each other's updates; written back only if the block did not raise
+    async with path_lock(path):
+        data = await run_blocking(read_json_sync,path,default)
+        yield data
+        await run_blocking(atomic_write_json,path,data)
+
+
+def http_client() -> httpx.AsyncClient:
+    global _http
+    if _http is None or _http.is_closed:
+        _http = httpx.AsyncClient(timeout=HTTP_TIMEOUT)
+    return _http
+
+
+async def close():
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+    executor.shutdown(wait=True)
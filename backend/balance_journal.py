@@ -0,0 +1,159 @@
+import glob
+import os
+import threading
+from typing import List
+
+
+# seq op amount balance username
+# every record stores the balance after the change, so replaying a record
+# twice (e.g. after a crash in the middle of compaction) is harmless
+RECORD_FORMAT = "{seq:012d} {op} {amount:+013d} {balance:+013d} {username}\n"
+OPS = ("NEW","INC","DEC","WDR","DEL")
+
+
+class BalanceJournal:
+    """Append-only write-ahead journal of balance changes.
+
+    `append` returns once its record is fsynced. Records written while an
+    fsync runs are synced together by the next one (group commit): the
+    first waiter that finds no fsync running syncs everything written so
+    far and the others wait for it. `write` and `wait` are the two halves,
+    so a caller can write under its own lock and wait after releasing it.
+    `rotate()` closes the current segment so a snapshot can be written,
+    `discard()` drops it afterwards.
+    """
+    def __init__(self,path:str):
+        self.path = path
+        self.seq = 0
+        self.synced = 0
+        self.lock = threading.Lock()
+        self._file = None
+        self._syncing = False
+        self._synced_cond = threading.Condition()
+
+    def segments(self) -> List[str]:
+        # rotated segments are named <path>.<last seq>, oldest first
+        return sorted(p for p in glob.glob(f"{glob.escape(self.path)}.*") if p.rsplit(".",1)[1].isdigit())
+
+    def replay(self,data:dict) -> int:
+        applied = 0
+        for path in self.segments() + [self.path]:
+            if not os.path.exists(path):
+                continue
+            with open(path,"r") as file:
+                for line in file:
+                    record = parse_record(line)
+                    if record is None:
+                        # torn tail of a crashed write, nothing after it was acknowledged
+                        break
+                    seq,op,amount,balance,username = record
+                    if op == "DEL":
+                        data.pop(username,None)
+                    else:
+                        data[username] = balance
+                    self.seq = max(self.seq,seq)
+                    applied += 1
+        self.synced = self.seq
+        return applied
+
+    def open(self):
+        if self._file is None:
+            self._file = open(self.path,"a")
+
+    def write(self,op:str,username:str,amount:int,balance:int) -> int:
+        """Write a record through to the OS and return its seq; `wait` makes it durable."""
+        if op not in OPS:
+            raise ValueError(f"Unknown journal operation : {op}")
+        if "\n" in username:
+            raise ValueError("Username can not contain a newline")
+        with self.lock:
+            self.open()
+            self.seq += 1
+            self._file.write(RECORD_FORMAT.format(seq=self.seq,op=op,amount=amount,balance=balance,username=username))
+            # out of the userspace buffer, a crash of the process can not lose it any more
+            self._file.flush()
+            return self.seq
+
+    def wait(self,seq:int):
+        """Return once record `seq` is fsynced, syncing the whole batch if nobody else is."""
+        with self._synced_cond:
+            while self.synced < seq:
+                if not self._syncing:
+                    self._syncing = True
+                    break
+                self._synced_cond.wait()
+            else:
+                return
+        try:
+            # fsync a duplicate outside self.lock: writers keep appending to
+            # the next batch meanwhile, and rotate or close can not close it
+            with self.lock:
+                seq = self.seq
+                fd = os.dup(self._file.fileno()) if self._file is not None and self.synced < seq else None
+            if fd is not None:
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            with self._synced_cond:
+                self.synced = max(self.synced,seq)
+        finally:
+            with self._synced_cond:
+                self._syncing = False
+                self._synced_cond.notify_all()
+
+    def append(self,op:str,username:str,amount:int,balance:int) -> int:
+        seq = self.write(op,username,amount,balance)
+        self.wait(seq)
+        return seq
+
+    def sync(self):
+        with self.lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        seq = self.seq
+        if self._file is not None and self.synced < seq:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        with self._synced_cond:
+            self.synced = max(self.synced,seq)
+            self._synced_cond.notify_all()
+
+    def rotate(self) -> List[str]:
+        # must be called while the caller holds the lock that guards the data
+        # being snapshotted, so the returned segments are exactly what it covers
+        with self.lock:
+            if self._file is not None:
+                self._sync_locked()
+                self._file.close()
+                self._file = None
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                os.replace(self.path,f"{self.path}.{self.seq:012d}")
+            self.open()
+            return self.segments()
+
+    def discard(self,segments:List[str]):
+        # the snapshot is on disk, the folded segments are no longer needed
+        for path in segments:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def close(self):
+        with self.lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def parse_record(line:str):
+    if not line.endswith("\n"):
+        return None
+    parts = line[:-1].split(" ",4)
+    if len(parts) != 5 or parts[1] not in OPS:
+        return None
+    try:
+        return int(parts[0]),parts[1],int(parts[2]),int(parts[3]),parts[4]
+    except ValueError:
+        return None
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Any
+
+
+def atomic_write_json(path:str,data:Any) -> None:
+    # write next to the target and rename so readers never see a half written file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd,tmp_path = tempfile.mkstemp(dir=directory,prefix=".tmp-",suffix=".json")
+    try:
+        with os.fdopen(fd,"w") as file:
+            json.dump(data,file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path,path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_json(path:str,default:Any) -> Any:
+    try:
+        with open(path,"r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return default
+
+
+class WriteBehindFile:
+    """JSON file that lives in memory and is flushed to disk in batches.
+
+    Mutations only mark the file dirty, a background thread writes the
+    whole document at most once per `flush_interval` seconds.
+    """
+    def __init__(self,path:str,default:Any,flush_interval:float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self.data = read_json(path,default)
+        self._dirty = False
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def serialize(self) -> Any:
+        # called under self.lock, must return a copy that is safe to dump outside of it
+        return json.loads(json.dumps(self.data))
+
+    def flush(self) -> bool:
+        with self._flush_lock:
+            with self.lock:
+                if not self._dirty:
+                    return False
+                payload = self.serialize()
+                self._dirty = False
+            try:
+                atomic_write_json(self.path,payload)
+            except Exception:
+                self._dirty = True
+                raise
+            return True
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error while flushing {self.path} : {e}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,name=f"flush:{os.path.basename(self.path)}",daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
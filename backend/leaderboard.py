@@ -0,0 +1,118 @@
+import threading
+from itertools import islice
+from typing import Iterable,List,Optional,Tuple
+from sortedcontainers import SortedList
+
+BOARDS = ("games","wins","procent")
+
+
+def procent(wins:int,games:int) -> float:
+    if not games:
+        return 0.0
+    return round(wins / games * 100,2)
+
+
+def scores(wins:int,games:int) -> dict:
+    return {"games":games,"wins":wins,"procent":procent(wins,games)}
+
+
+class Leaderboard:
+    """Ranked boards (most games, most wins, win percentage) kept in memory.
+
+    Every board is a SortedList of (-score, user), updated on each win or
+    game, so top-N is O(log n + N) and a user's rank is O(log n) without
+    ever scanning or sorting the stats.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._stats = {}
+        self._ranked = {board:SortedList() for board in BOARDS}
+
+    def _unrank(self,user:str):
+        old = self._stats.get(user)
+        if old is not None:
+            for board,score in scores(*old).items():
+                self._ranked[board].remove((-score,user))
+
+    def set(self,user:str,wins:int,games:int):
+        with self.lock:
+            self._unrank(user)
+            self._stats[user] = (wins,games)
+            for board,score in scores(wins,games).items():
+                self._ranked[board].add((-score,user))
+
+    def add(self,user:str,wins:int = 0,games:int = 0):
+        with self.lock:
+            old_wins,old_games = self._stats.get(user,(0,0))
+            self.set(user,old_wins + wins,old_games + games)
+
+    def remove(self,user:str):
+        with self.lock:
+            self._unrank(user)
+            self._stats.pop(user,None)
+
+    def load(self,rows:Iterable[Tuple[str,int,int]]):
+        for user,wins,games in rows:
+            self.set(user,wins,games)
+
+    def top(self,board:str,n:Optional[int] = None) -> List[Tuple[str,float]]:
+        with self.lock:
+            return [(user,-score) for score,user in islice(self._ranked[board],n)]
+
+    def rank(self,board:str,user:str) -> Optional[int]:
+        # 1 is the top of the board
+        with self.lock:
+            stats = self._stats.get(user)
+            if stats is None:
+                return None
+            return self._ranked[board].index((-scores(*stats)[board],user)) + 1
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+
+class RedisLeaderboard:
+    """The same boards as Redis sorted sets, shared by every worker."""
+    def __init__(self,client,prefix:str = "leaderboard:"):
+        self.client = client
+        self.prefix = prefix
+
+    def key(self,board:str) -> str:
+        return self.prefix + board
+
+    def set(self,user:str,wins:int,games:int):
+        pipe = self.client.pipeline()
+        for board,score in scores(wins,games).items():
+            pipe.zadd(self.key(board),{user:score})
+        pipe.execute()
+
+    def add(self,user:str,wins:int = 0,games:int = 0):
+        pipe = self.client.pipeline()
+        pipe.zincrby(self.key("wins"),wins,user)
+        pipe.zincrby(self.key("games"),games,user)
+        new_wins,new_games = pipe.execute()
+        self.client.zadd(self.key("procent"),{user:procent(new_wins,new_games)})
+
+    def remove(self,user:str):
+        pipe = self.client.pipeline()
+        for board in BOARDS:
+            pipe.zrem(self.key(board),user)
+        pipe.execute()
+
+    def load(self,rows:Iterable[Tuple[str,int,int]]):
+        pipe = self.client.pipeline()
+        for user,wins,games in rows:
+            for board,score in scores(wins,games).items():
+                pipe.zadd(self.key(board),{user:score})
+        pipe.execute()
+
+    def top(self,board:str,n:Optional[int] = None) -> List[Tuple[str,float]]:
+        end = -1 if n is None else n - 1
+        rows = self.client.zrevrange(self.key(board),0,end,withscores = True)
+        if board == "procent":
+            return [(user,score) for user,score in rows]
+        return [(user,int(score)) for user,score in rows]
+
+    def rank(self,board:str,user:str) -> Optional[int]:
+        rank = self.client.zrevrank(self.key(board),user)
+        return None if rank is None else rank + 1
@@ -0,0 +1,74 @@
+import asyncio
+import inspect
+from typing import Awaitable,Callable,Union
+
+
+class LobbyEvents:
+    """Wakes long-poll requests waiting on a lobby.
+
+    Waiters sleep on one asyncio.Event per lobby and re-check their
+    condition when woken. `notify` may be called from any thread, the
+    wake-up itself always runs on the loop.
+    """
+    def __init__(self):
+        self._events = {}
+        self._waiters = {}
+        self._loop = None
+
+    def notify(self,id_:str):
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wake(id_)
+            return
+        # the events belong to the loop: looked up from this thread, a waiter
+        # between its check and its await would not have one yet and sleep on
+        try:
+            loop.call_soon_threadsafe(self._wake,id_)
+        except RuntimeError:
+            pass
+
+    def _wake(self,id_:str):
+        event = self._events.pop(id_,None)
+        if event is not None:
+            event.set()
+
+    async def wait_for(self,id_:str,ready:Callable[[],Union[bool,Awaitable[bool]]],timeout:float) -> bool:
+        # ready may be a coroutine function (stores read off the loop); the
+        # event is registered before every check, so a change made while the
+        # check runs sets it and the waiter looks again instead of sleeping
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        deadline = loop.time() + timeout
+        self._waiters[id_] = self._waiters.get(id_,0) + 1
+        try:
+            while True:
+                event = self._events.setdefault(id_,asyncio.Event())
+                if await self._check(ready):
+                    return True
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(event.wait(),remaining)
+                except asyncio.TimeoutError:
+                    return await self._check(ready)
+        finally:
+            self._waiters[id_] -= 1
+            if self._waiters[id_] == 0:
+                del self._waiters[id_]
+                self._events.pop(id_,None)
+
+    async def _check(self,ready) -> bool:
+        result = ready()
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def waiting(self) -> int:
+        return sum(self._waiters.values())
@@ -0,0 +1,550 @@
+import json
+import uuid
+from collections import OrderedDict
+from typing import Callable,Optional,Tuple
+from json_store import WriteBehindFile
+
+
+def copy_record(record:dict) -> dict:
+    # records are flat apart from lists (players, cache) that get appended to
+    return {key:list(value) if isinstance(value,list) else value for key,value in record.items()}
+
+
+class LobbyRepository(WriteBehindFile):
+    """A JSON list of game records kept in memory as an id -> record dict.
+
+    Shared by every game type, so per-game lookups are O(1) instead of a
+    scan over the whole file. `on_change` is called with the id of every
+    record that changes.
+    """
+    def __init__(self,path:str,flush_interval:float = 1.0,on_change:Optional[Callable[[str],None]] = None):
+        super().__init__(path,[],flush_interval)
+        self.on_change = on_change
+        self.rebuild()
+
+    def rebuild(self):
+        with self.lock:
+            games = self.data if isinstance(self.data,list) else list(self.data.values())
+            self.data = {game["id"]:game for game in games}
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        pass
+
+    def changed(self,id_:str):
+        self.mark_dirty()
+        if self.on_change is not None:
+            self.on_change(id_)
+
+    def serialize(self) -> list:
+        return [copy_record(game) for game in self.data.values()]
+
+    # readers get copies taken under the lock: pool threads keep changing
+    # the records while handlers read them and FastAPI serializes them
+    def get(self,id_:str) -> Optional[dict]:
+        with self.lock:
+            game = self.data.get(id_)
+            return None if game is None else copy_record(game)
+
+    def values(self) -> list:
+        with self.lock:
+            return [copy_record(game) for game in self.data.values()]
+
+    def add(self,record:dict) -> str:
+        with self.lock:
+            self.data[record["id"]] = record
+            self.changed(record["id"])
+            return record["id"]
+
+    def remove(self,id_:str) -> bool:
+        with self.lock:
+            if self.data.pop(id_,None) is None:
+                return False
+            self.changed(id_)
+            return True
+
+    def append_to(self,id_:str,key:str,value) -> bool:
+        with self.lock:
+            game = self.data.get(id_)
+            if game is None:
+                return False
+            game.setdefault(key,[]).append(value)
+            self.changed(id_)
+            return True
+
+
+def empty_lobby(id_:str) -> dict:
+    return {"id":id_,"players":[],"bet":0,"winner":""}
+
+
+def empty_drotic_lobby(id_:str) -> dict:
+    return {"bet":0,"players":[],"id":id_,"cache":[]}
+
+
+class LobbyTable(LobbyRepository):
+    """Two player lobbies (game.json, drotic.json) with a matchmaking index.
+
+    `waiting` maps a bet to the queue of lobbies that have one player,
+    `free` is the list of empty lobbies. Both are OrderedDicts used as
+    queues so a lobby can also be taken out of the middle in O(1).
+
+    Lobbies are allocated on demand when `free` is empty, so `open` never
+    fails. Cancelled and finished lobbies are recycled into `free` while it
+    holds fewer than `max_free` (None: no limit) and dropped after that;
+    `warm` empty lobbies are made ready on load.
+    """
+    def __init__(self,path:str,flush_interval:float = 1.0,on_change:Optional[Callable[[str],None]] = None,
+                 empty:Callable[[str],dict] = empty_lobby,warm:int = 0,max_free:Optional[int] = None):
+        self.empty = empty
+        self.max_free = max_free
+        super().__init__(path,flush_interval,on_change)
+        self.fill(warm - len(self.free))
+
+    def fill(self,count:int) -> int:
+        """Add `count` empty lobbies; one write for the whole batch."""
+        with self.lock:
+            for _ in range(count):
+                game = self.empty(str(uuid.uuid4()))
+                self.data[game["id"]] = game
+                self.free[game["id"]] = None
+            if count > 0:
+                self.mark_dirty()
+            return max(count,0)
+
+    def _allocate(self) -> dict:
+        if self.free:
+            id_,_ = self.free.popitem(last = False)
+            return self.data[id_]
+        game = self.empty(str(uuid.uuid4()))
+        self.data[game["id"]] = game
+        return game
+
+    def recycle(self,id_:str) -> bool:
+        """Empty a lobby and put it back on the free list (or drop it once that is full)."""
+        with self.lock:
+            game = self.data.get(id_)
+            if game is None:
+                return False
+            self._unindex(game)
+            if self.max_free is not None and len(self.free) >= self.max_free:
+                del self.data[id_]
+            else:
+                self.data[id_] = game = self.empty(id_)
+                self._index(game)
+            self.changed(id_)
+            return True
+
+    def _rebuild_index(self):
+        self.waiting = {}
+        self.free = OrderedDict()
+        for game in self.data.values():
+            self._index(game)
+
+    def _index(self,game:dict):
+        if len(game["players"]) == 0:
+            self.free[game["id"]] = None
+        elif len(game["players"]) == 1:
+            self.waiting.setdefault(game["bet"],OrderedDict())[game["id"]] = None
+
+    def _unindex(self,game:dict):
+        self.free.pop(game["id"],None)
+        queue = self.waiting.get(game["bet"])
+        if queue is not None:
+            queue.pop(game["id"],None)
+            if not queue:
+                del self.waiting[game["bet"]]
+
+    def add(self,record:dict) -> str:
+        with self.lock:
+            old = self.data.get(record["id"])
+            if old is not None:
+                self._unindex(old)
+            self._index(record)
+            return super().add(record)
+
+    def remove(self,id_:str) -> bool:
+        with self.lock:
+            game = self.data.get(id_)
+            if game is None:
+                return False
+            self._unindex(game)
+            return super().remove(id_)
+
+    def player_lobby(self,username:str) -> Optional[dict]:
+        with self.lock:
+            for game in self.data.values():
+                if username in game["players"]:
+                    return copy_record(game)
+            return None
+
+    def is_playing(self,username:str) -> bool:
+        with self.lock:
+            return any(username in game["players"] for game in self.data.values())
+
+    def match(self,username:str,bet:int) -> Optional[str]:
+        # oldest waiting lobby with the same bet that the user does not own
+        with self.lock:
+            for id_ in self.waiting.get(bet,()):
+                game = self.data[id_]
+                if username not in game["players"]:
+                    self._unindex(game)
+                    game["players"].append(username)
+                    self.changed(id_)
+                    return id_
+            return None
+
+    def open(self,username:str,bet:int) -> str:
+        with self.lock:
+            game = self._allocate()
+            game["bet"] = bet
+            game["players"].append(username)
+            self._index(game)
+            self.changed(game["id"])
+            return game["id"]
+
+    def match_or_open(self,username:str,bet:int) -> Tuple[str,bool]:
+        """match, else open, under one lock: (lobby id, whether a waiting lobby was joined)."""
+        with self.lock:
+            id_ = self.match(username,bet)
+            if id_ is not None:
+                return id_,True
+            return self.open(username,bet),False
+
+    def join(self,id_:str,username:str,bet:int) -> bool:
+        with self.lock:
+            game = self.data.get(id_)
+            if game is None:
+                raise KeyError(id_)
+            if len(game["players"]) != 1 or username in game["players"] or game["bet"] != bet:
+                return False
+            self._unindex(game)
+            game["players"].append(username)
+            self.changed(id_)
+            return True
+
+    def cancel(self,id_:str,username:str) -> bool:
+        with self.lock:
+            game = self.data.get(id_)
+            if game is None or len(game["players"]) != 1 or username not in game["players"]:
+                return False
+            return self.recycle(id_)
+
+    def reset(self,id_:str,username:str) -> bool:
+        with self.lock:
+            game = self.data.get(id_)
+            if game is None or len(game["players"]) != 2 or username not in game["players"]:
+                return False
+            return self.recycle(id_)
+
+    def set_winner(self,id_:str,username:str) -> bool:
+        with self.lock:
+            game = self.data.get(id_)
+            if game is None or len(game["players"]) != 2 or username not in game["players"]:
+                return False
+            if game.get("winner","") != "":
+                return False
+            game["winner"] = username
+            self.changed(id_)
+            return True
+
+    def set_result(self,id_:str,username:str,result:int) -> bool:
+        with self.lock:
+            game = self.data.get(id_)
+            if game is None:
+                return False
+            game[f"result_{username}"] = result
+            self.changed(id_)
+            return True
+
+
+# Every script gets the lobby hash (or the waiting list) as KEYS[1] and the key
+# prefix in ARGV[1]; the other keys are derived from it, so this is meant for
+# a single Redis and not for Cluster. Hash fields hold JSON values.
+
+# oldest waiting lobby of the bet that the user does not own; stale ids left
+# by lobbies that were filled or dropped are cleaned up on the way
+MATCH_LUA = """
+local ids = redis.call('LRANGE', KEYS[1], 0, -1)
+for _, id in ipairs(ids) do
+    local lobby = ARGV[1] .. 'game:' .. id
+    local raw = redis.call('HGET', lobby, 'players')
+    local players = raw and cjson.decode(raw)
+    if not players or #players ~= 1 then
+        redis.call('LREM', KEYS[1], 0, id)
+    elseif players[1] ~= ARGV[2] then
+        table.insert(players, ARGV[2])
+        redis.call('HSET', lobby, 'players', cjson.encode(players))
+        redis.call('LREM', KEYS[1], 0, id)
+        redis.call('SADD', ARGV[1] .. 'player:' .. ARGV[2], id)
+        return id
+    end
+end
+return false
+"""
+
+# MATCH_LUA, and when nothing matches the new lobby ARGV[3] with the fields
+# in ARGV[4..] is created and queued in the same script: {id, 1} when a
+# waiting lobby was joined, {id, 0} when the new one was opened
+MATCH_OR_OPEN_LUA = """
+local ids = redis.call('LRANGE', KEYS[1], 0, -1)
+for _, id in ipairs(ids) do
+    local lobby = ARGV[1] .. 'game:' .. id
+    local raw = redis.call('HGET', lobby, 'players')
+    local players = raw and cjson.decode(raw)
+    if not players or #players ~= 1 then
+        redis.call('LREM', KEYS[1], 0, id)
+    elseif players[1] ~= ARGV[2] then
+        table.insert(players, ARGV[2])
+        redis.call('HSET', lobby, 'players', cjson.encode(players))
+        redis.call('LREM', KEYS[1], 0, id)
+        redis.call('SADD', ARGV[1] .. 'player:' .. ARGV[2], id)
+        return {id, 1}
+    end
+end
+redis.call('HSET', ARGV[1] .. 'game:' .. ARGV[3], unpack(ARGV, 4))
+redis.call('RPUSH', KEYS[1], ARGV[3])
+redis.call('SADD', ARGV[1] .. 'player:' .. ARGV[2], ARGV[3])
+return {ARGV[3], 0}
+"""
+
+# join a lobby by id: -1 when it does not exist, 0 when it is full, owned or
+# for another bet, 1 when the user took the second seat
+JOIN_LUA = """
+local raw = redis.call('HMGET', KEYS[1], 'players', 'bet')
+if not raw[1] then
+    return -1
+end
+local players = cjson.decode(raw[1])
+if #players ~= 1 or players[1] == ARGV[3] or tonumber(raw[2]) ~= tonumber(ARGV[4]) then
+    return 0
+end
+table.insert(players, ARGV[3])
+redis.call('HSET', KEYS[1], 'players', cjson.encode(players))
+redis.call('LREM', ARGV[1] .. 'waiting:' .. raw[2], 0, ARGV[2])
+redis.call('SADD', ARGV[1] .. 'player:' .. ARGV[3], ARGV[2])
+return 1
+"""
+
+# drop a lobby; with ARGV[3] >= 0 only if it has that many players and
+# ARGV[4] is one of them (cancel: 1, leave: 2)
+RECYCLE_LUA = """
+local raw = redis.call('HMGET', KEYS[1], 'players', 'bet')
+if not raw[1] then
+    return 0
+end
+local players = cjson.decode(raw[1])
+if tonumber(ARGV[3]) >= 0 then
+    local seated = false
+    for _, player in ipairs(players) do
+        if player == ARGV[4] then
+            seated = true
+        end
+    end
+    if #players ~= tonumber(ARGV[3]) or not seated then
+        return 0
+    end
+end
+redis.call('DEL', KEYS[1])
+redis.call('LREM', ARGV[1] .. 'waiting:' .. raw[2], 0, ARGV[2])
+for _, player in ipairs(players) do
+    redis.call('SREM', ARGV[1] .. 'player:' .. player, ARGV[2])
+end
+return 1
+"""
+
+# first winner of a full lobby wins, later writes are ignored
+WINNER_LUA = """
+local raw = redis.call('HMGET', KEYS[1], 'players', 'winner')
+if not raw[1] then
+    return 0
+end
+local players = cjson.decode(raw[1])
+if #players ~= 2 or (players[1] ~= ARGV[2] and players[2] ~= ARGV[2]) then
+    return 0
+end
+if raw[2] and cjson.decode(raw[2]) ~= '' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'winner', cjson.encode(ARGV[2]))
+return 1
+"""
+
+# set a field (ARGV[3] = 0) or append to a list field (ARGV[3] = 1) of an existing lobby
+UPDATE_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local value = ARGV[3]
+if ARGV[4] == '1' then
+    local raw = redis.call('HGET', KEYS[1], ARGV[2])
+    local items = raw and cjson.decode(raw) or {}
+    table.insert(items, cjson.decode(value))
+    value = cjson.encode(items)
+end
+redis.call('HSET', KEYS[1], ARGV[2], value)
+return 1
+"""
+
+
+class RedisLobbyTable:
+    """The same lobbies in Redis, shared by every uvicorn worker.
+
+    A lobby is a hash `{prefix}game:{id}`, lobbies with one player wait in
+    the list `{prefix}waiting:{bet}` and `{prefix}player:{user}` is the set
+    of lobbies a user sits in. Every claim, join and drop is a Lua script,
+    so two workers can never seat the same user twice or fill a lobby with
+    three players. Lobbies are created on demand and deleted when they end,
+    so there is no free list to warm.
+
+    Changes are published on `{prefix}changed`; `start` subscribes to it
+    and passes every changed id to `on_change`, so long polls are woken
+    whichever worker made the change. Unlike the Redis replay cache and
+    rate limiter there is no local fallback: lobbies kept by one worker
+    only could be joined by nobody else.
+    """
+    def __init__(self,client,prefix:str = "lobby:",on_change:Optional[Callable[[str],None]] = None,
+                 empty:Callable[[str],dict] = empty_lobby):
+        self.client = client
+        self.prefix = prefix
+        self.channel = prefix + "changed"
+        self.on_change = on_change
+        self.empty = empty
+        self._thread = None
+        self._match = client.register_script(MATCH_LUA)
+        self._match_or_open = client.register_script(MATCH_OR_OPEN_LUA)
+        self._join = client.register_script(JOIN_LUA)
+        self._recycle = client.register_script(RECYCLE_LUA)
+        self._winner = client.register_script(WINNER_LUA)
+        self._update = client.register_script(UPDATE_LUA)
+
+    def key(self,id_:str) -> str:
+        return f"{self.prefix}game:{id_}"
+
+    def start(self):
+        if self.on_change is None or self._thread is not None:
+            return
+        pubsub = self.client.pubsub(ignore_subscribe_messages = True)
+        pubsub.subscribe(**{self.channel:lambda message: self.on_change(message["data"])})
+        self._thread = pubsub.run_in_thread(sleep_time = 1.0,daemon = True)
+
+    def close(self):
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+
+    def changed(self,id_:str):
+        self.client.publish(self.channel,id_)
+
+    def _load(self,data:dict) -> Optional[dict]:
+        if not data:
+            return None
+        return {field:json.loads(value) for field,value in data.items()}
+
+    def get(self,id_:str) -> Optional[dict]:
+        return self._load(self.client.hgetall(self.key(id_)))
+
+    def _get_many(self,ids) -> list:
+        pipe = self.client.pipeline(transaction = False)
+        for id_ in ids:
+            pipe.hgetall(self.key(id_))
+        return [game for game in map(self._load,pipe.execute()) if game is not None]
+
+    def values(self) -> list:
+        # a SCAN over every lobby, for the rare callers that need them all
+        start = len(self.prefix) + len("game:")
+        return self._get_many(key[start:] for key in self.client.scan_iter(match = self.key("*"),count = 1000))
+
+    def _write(self,pipe,game:dict):
+        pipe.hset(self.key(game["id"]),mapping = {field:json.dumps(value) for field,value in game.items()})
+        if len(game["players"]) == 1:
+            pipe.rpush(f"{self.prefix}waiting:{game['bet']}",game["id"])
+        for player in game["players"]:
+            pipe.sadd(f"{self.prefix}player:{player}",game["id"])
+
+    def add(self,record:dict) -> str:
+        self.remove(record["id"])
+        pipe = self.client.pipeline()
+        self._write(pipe,record)
+        pipe.execute()
+        self.changed(record["id"])
+        return record["id"]
+
+    def _drop(self,id_:str,players:int = -1,username:str = "") -> bool:
+        if not self._recycle(keys = [self.key(id_)],args = [self.prefix,id_,players,username]):
+            return False
+        self.changed(id_)
+        return True
+
+    def remove(self,id_:str) -> bool:
+        return self._drop(id_)
+
+    def recycle(self,id_:str) -> bool:
+        return self._drop(id_)
+
+    def player_lobby(self,username:str) -> Optional[dict]:
+        ids = self.client.smembers(f"{self.prefix}player:{username}")
+        games = self._get_many(sorted(ids))
+        return games[0] if games else None
+
+    def is_playing(self,username:str) -> bool:
+        return self.client.scard(f"{self.prefix}player:{username}") > 0
+
+    def match(self,username:str,bet:int) -> Optional[str]:
+        id_ = self._match(keys = [f"{self.prefix}waiting:{bet}"],args = [self.prefix,username])
+        if not id_:
+            return None
+        self.changed(id_)
+        return id_
+
+    def open(self,username:str,bet:int) -> str:
+        game = self.empty(str(uuid.uuid4()))
+        game["bet"] = bet
+        game["players"] = [username]
+        pipe = self.client.pipeline()
+        self._write(pipe,game)
+        pipe.execute()
+        self.changed(game["id"])
+        return game["id"]
+
+    def match_or_open(self,username:str,bet:int) -> Tuple[str,bool]:
+        """match, else open, in one script: (lobby id, whether a waiting lobby was joined)."""
+        game = self.empty(str(uuid.uuid4()))
+        game["bet"] = bet
+        game["players"] = [username]
+        fields = [item for field,value in game.items() for item in (field,json.dumps(value))]
+        id_,joined = self._match_or_open(keys = [f"{self.prefix}waiting:{bet}"],
+                                         args = [self.prefix,username,game["id"]] + fields)
+        self.changed(id_)
+        return id_,bool(joined)
+
+    def join(self,id_:str,username:str,bet:int) -> bool:
+        joined = self._join(keys = [self.key(id_)],args = [self.prefix,id_,username,bet])
+        if joined < 0:
+            raise KeyError(id_)
+        if joined:
+            self.changed(id_)
+        return bool(joined)
+
+    def cancel(self,id_:str,username:str) -> bool:
+        return self._drop(id_,1,username)
+
+    def reset(self,id_:str,username:str) -> bool:
+        return self._drop(id_,2,username)
+
+    def set_winner(self,id_:str,username:str) -> bool:
+        if not self._winner(keys = [self.key(id_)],args = [self.prefix,username]):
+            return False
+        self.changed(id_)
+        return True
+
+    def _set(self,id_:str,key:str,value,append:bool) -> bool:
+        if not self._update(keys = [self.key(id_)],args = [self.prefix,key,json.dumps(value),int(append)]):
+            return False
+        self.changed(id_)
+        return True
+
+    def set_result(self,id_:str,username:str,result:int) -> bool:
+        return self._set(id_,f"result_{username}",result,False)
+
+    def append_to(self,id_:str,key:str,value) -> bool:
+        return self._set(id_,key,value,True)
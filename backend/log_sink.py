@@ -0,0 +1,252 @@
+import json
+import os
+import queue
+import re
+import threading
+import uuid
+from datetime import datetime
+from typing import Iterator,List,Optional,Tuple
+
+SEGMENT_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:\.(\d+))?\.ndjson$")
+# <date>.idx holds "<line number> <part> <byte offset>" for every
+# INDEX_EVERY-th line of the day, so any line is at most INDEX_EVERY - 1
+# lines past a seek
+INDEX_EVERY = 1000
+
+
+class LogSink:
+    """Server error log as newline-delimited JSON, one segment per day.
+
+    `write` only builds the record and puts it on a queue, so logging from a
+    request is O(1) and never waits on the disk. A background thread appends
+    records in batches to `<directory>/<YYYY-MM-DD>.ndjson` and continues in
+    `<YYYY-MM-DD>.<n>.ndjson` once a segment reaches `max_bytes`. If the
+    writer falls `max_queue` records behind, new records are dropped and
+    counted in `dropped`.
+
+    Lines are numbered per day and a sparse offset index per day lets
+    `page` start reading at any line number without scanning the day.
+    """
+    def __init__(self,directory:str,max_bytes:int = 16 * 2**20,max_queue:int = 10000,flush_interval:float = 0.5):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize = max_queue)
+        self._file = None
+        self._date = None
+        self._part = 0
+        self._size = 0
+        self._lines = 0
+        self._index = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self,error:str,**fields) -> bool:
+        record = {"time":str(datetime.now()),"error":error,"id":str(uuid.uuid4())}
+        record.update(fields)
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def segment_path(self,date:str,part:int = 0) -> str:
+        name = f"{date}.ndjson" if part == 0 else f"{date}.{part}.ndjson"
+        return os.path.join(self.directory,name)
+
+    def index_path(self,date:str) -> str:
+        return os.path.join(self.directory,f"{date}.idx")
+
+    def dates(self) -> List[str]:
+        return sorted({SEGMENT_RE.match(os.path.basename(path)).group(1) for path in self.segments()})
+
+    def segments(self,date:Optional[str] = None) -> List[str]:
+        # oldest first: by date, then by part
+        found = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        for name in names:
+            match = SEGMENT_RE.match(name)
+            if match and (date is None or match.group(1) == date):
+                found.append((match.group(1),int(match.group(2) or 0),name))
+        return [os.path.join(self.directory,name) for _,_,name in sorted(found)]
+
+    def records(self,date:Optional[str] = None) -> Iterator[dict]:
+        for path in self.segments(date):
+            with open(path,"r",encoding = "utf-8") as file:
+                for line in file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # torn last line of a crashed write
+                        continue
+
+    def checkpoint(self,date:str,line:int) -> Tuple[int,int,int]:
+        # last indexed (line,part,offset) at or before `line`
+        best = (0,0,0)
+        try:
+            with open(self.index_path(date),"r") as file:
+                for entry in file:
+                    fields = entry.split()
+                    if len(fields) != 3:
+                        continue
+                    point = tuple(int(field) for field in fields)
+                    if point[0] > line:
+                        break
+                    best = point
+        except FileNotFoundError:
+            pass
+        return best
+
+    def _lines_from(self,date:str,part:int,offset:int) -> Iterator[bytes]:
+        for path in self.segments(date):
+            path_part = int(SEGMENT_RE.match(os.path.basename(path)).group(2) or 0)
+            if path_part < part:
+                continue
+            with open(path,"rb") as file:
+                if path_part == part:
+                    file.seek(offset)
+                for line in file:
+                    if line.endswith(b"\n"):
+                        yield line
+
+    def page(self,date:str,start:int = 0,limit:int = 100) -> Tuple[List[dict],int]:
+        """Records from line `start` of the day, and the line to continue from."""
+        line,part,offset = self.checkpoint(date,start)
+        result = []
+        for raw in self._lines_from(date,part,offset):
+            if line >= start:
+                if len(result) >= limit:
+                    break
+                try:
+                    result.append(json.loads(raw))
+                except ValueError:
+                    pass
+            line += 1
+        return result,max(line,start)
+
+    def read(self,cursor:Optional[str] = None,limit:int = 100) -> Tuple[List[dict],Optional[str]]:
+        """A page of records across days from `cursor` ("<date>:<line>").
+
+        The returned cursor continues after the last record, also once new
+        records are written; an empty page means there is nothing newer yet.
+        """
+        dates = self.dates()
+        if cursor:
+            date,line = cursor.rsplit(":",1)
+            line = int(line)
+        elif dates:
+            date,line = dates[0],0
+        else:
+            return [],None
+        result = []
+        while len(result) < limit:
+            records,line = self.page(date,line,limit - len(result))
+            result.extend(records)
+            if len(result) >= limit:
+                break
+            later = [day for day in dates if day > date]
+            if not later:
+                break
+            date,line = later[0],0
+        return result,f"{date}:{line}"
+
+    def _recover(self,date:str):
+        # line count of a day that already has segments, from its last checkpoint
+        line,part,offset = self.checkpoint(date,float("inf"))
+        for _ in self._lines_from(date,part,offset):
+            line += 1
+        self._lines = line
+
+    def _open(self,date:str):
+        if self._file is not None:
+            self._file.close()
+        if self._index is not None:
+            self._index.close()
+        os.makedirs(self.directory,exist_ok = True)
+        existing = self.segments(date)
+        part = 0
+        if existing:
+            part = int(SEGMENT_RE.match(os.path.basename(existing[-1])).group(2) or 0)
+            if os.path.getsize(existing[-1]) >= self.max_bytes:
+                part += 1
+        self._file = open(self.segment_path(date,part),"ab")
+        self._date = date
+        self._part = part
+        self._size = self._file.tell()
+        if self._size and not self._ends_with_newline():
+            # terminate a torn line so it stays one (unreadable) line
+            self._file.write(b"\n")
+            self._file.flush()
+            self._size += 1
+        self._recover(date)
+        self._index = open(self.index_path(date),"a")
+
+    def _ends_with_newline(self) -> bool:
+        with open(self._file.name,"rb") as file:
+            file.seek(-1,os.SEEK_END)
+            return file.read(1) == b"\n"
+
+    def _write_batch(self,batch:List[dict]):
+        for record in batch:
+            date = record["time"][:10]
+            if date != self._date:
+                self._open(date)
+            elif self._size >= self.max_bytes:
+                self._file.close()
+                self._part += 1
+                self._file = open(self.segment_path(date,self._part),"ab")
+                self._size = 0
+            line = (json.dumps(record,default = str,ensure_ascii = False) + "\n").encode("utf-8")
+            if self._lines % INDEX_EVERY == 0:
+                self._index.write(f"{self._lines} {self._part} {self._size}\n")
+            self._file.write(line)
+            self._size += len(line)
+            self._lines += 1
+        self._file.flush()
+        self._index.flush()
+
+    def drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write_batch(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout = self.flush_interval)
+            except queue.Empty:
+                continue
+            try:
+                self._write_batch([first])
+                self.drain()
+            except Exception as e:
+                print(f"Error while writing logs : {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target = self._run,name = "log-sink",daemon = True)
+            self._thread.start()
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.drain()
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = None
+            self._index = None
+            self._date = None
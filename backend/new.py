@@ -18,19 +18,51 @@ import secrets
 import hashlib
 from jose import jwt,JWTError
 from passlib.context import CryptContext
-from filelock import FileLock
+from filelock import FileLock,Timeout
 import hmac
 import secrets
 import time
-import requests
 import uvicorn
 from datetime import datetime
 from secrets import compare_digest
+from contextlib import asynccontextmanager
+from account_store import AccountStore
+from balance_journal import BalanceJournal
+from lobby_store import LobbyRepository,LobbyTable,RedisLobbyTable,empty_drotic_lobby
+from lobby_events import LobbyEvents
+from secrets_store import SecretsFile
+import signing
+from replay_cache import ReplayCache,RedisReplayCache
+from rate_limiter import RateLimiter,RedisRateLimiter
+from log_sink import LogSink
+from streaming import ndjson_response,json_array_response,json_object_response
+from leaderboard import Leaderboard,RedisLeaderboard,procent
+from repositories import ENTITIES,backend,load_sql,JsonStats,JsonTerms,JsonPayments
+from sqlite_store import SqliteDatabase,SqliteAccounts,SqliteStats,SqliteTerms,SqlitePayments,SqliteLobbyTable,SqliteRepository,SqliteLogSink
+import async_io
+from async_io import run_blocking,read_json,edit_json,http_client
 
 
 
 ### INIT API ###
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+    secrets_file.install_sighup()
+    log_sink.start()
+    for store in stores:
+        store.start()
+    yield
+    for store in reversed(stores):
+        store.close()
+    if balance_journal is not None:
+        balance_journal.close()
+        bank_lock.release()
+    await async_io.close()
+    log_sink.close()
+    if sqlite_db is not None:
+        sqlite_db.close()
+
+app = FastAPI(lifespan=lifespan)
 security = HTTPBearer()
 limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
@@ -42,17 +74,105 @@ bets_path = "/Users/vikrorkhanin/Ludice/data/bets.json"
 game_paths = "/Users/vikrorkhanin/Ludice/data/game.json"
 stats_path = "/Users/vikrorkhanin/Ludice/data/stats.json"
 users_path = "/Users/vikrorkhanin/Ludice/data/users.json"
-time_sec_path = "/Users/vikrorkhanin/Ludice/data/times_sec.json"
-logs_path = "/Users/vikrorkhanin/Ludice/data/logs.json"
+logs_dir = "/Users/vikrorkhanin/Ludice/data/logs"
 lobby_path = "/Users/vikrorkhanin/Ludice/data/lobby.json"
 sogl_path = "/Users/vikrorkhanin/Ludice/data/sogl.json"
 vznos_path = "/Users/vikrorkhanin/Ludice/data/first_vznos.json"
+drotic_path = "/Users/vikrorkhanin/Ludice/data/drotic.json"
+second_game_path = "/Users/vikrorkhanin/Ludice/data/data_second_game.json"
+sqlite_path = "/Users/vikrorkhanin/Ludice/data/ludice.db"
 
+try:
+    redis = redis.Redis('localhost',6379,0,decode_responses=True)
+except Exception as e:
+    print(f"Redis is not start")    
+
+#STORES
+# every entity is served by the backend named in STORAGE_<ENTITY> (or
+# STORAGE, default json), see repositories.py; sql is sql_database/ on
+# Postgres, or on SQLite with DB_URL=sqlite:///...; sqlite is sqlite_store.py,
+# one WAL file for every data/*.json (import them once with
+# python sqlite_store.py <data dir> <database file>)
+sqlite_db = SqliteDatabase(sqlite_path) if "sqlite" in [backend(entity) for entity in ENTITIES] else None
+if backend("accounts") == "sqlite":
+    balance_journal = None
+    accounts = SqliteAccounts(sqlite_db)
+elif backend("accounts") == "sql":
+    balance_journal = None
+    accounts = load_sql().SqlAccounts()
+else:
+    # bank.json is only rewritten by compaction, the journal carries every change in between.
+    # Every process keeps its own copy of the balances, so only one may serve them: a second
+    # uvicorn worker would overwrite the first one's changes. Use sqlite or sql with --workers N
+    bank_lock = FileLock(bank_path + ".lock")
+    try:
+        bank_lock.acquire(timeout = 0)
+    except Timeout:
+        raise Exception(f"Error : {bank_path} is served by another process, run one worker or set STORAGE_ACCOUNTS=sqlite")
+    balance_journal = BalanceJournal(bank_path + ".journal")
+    accounts = AccountStore(bank_path,flush_interval = 30,journal = balance_journal)
+if backend("stats") == "sqlite":
+    stats = SqliteStats(sqlite_db)
+elif backend("stats") == "sql":
+    stats = load_sql().SqlStats()
+else:
+    stats = JsonStats(stats_path)
+if backend("terms") == "sqlite":
+    terms = SqliteTerms(sqlite_db)
+elif backend("terms") == "sql":
+    terms = load_sql().SqlTerms()
+else:
+    terms = JsonTerms(sogl_path)
+if backend("payments") == "sqlite":
+    payments = SqlitePayments(sqlite_db)
+elif backend("payments") == "sql":
+    payments = load_sql().SqlPayments()
+else:
+    payments = JsonPayments(vznos_path)
+# one id -> record repository per game type
+# long-poll requests on /wait/... are woken by lobby_events on every change
+lobby_events = LobbyEvents()
+LONG_POLL_MAX = 25
+# lobbies are allocated on demand and recycled when a game ends; LOBBY_WARM_POOL
+# empty ones are kept ready and at most LOBBY_MAX_FREE are kept around
+LOBBY_WARM_POOL = int(os.getenv("LOBBY_WARM_POOL","16"))
+LOBBY_MAX_FREE = int(os.getenv("LOBBY_MAX_FREE","256"))
+# redis keeps both lobby tables in Redis so any number of uvicorn workers
+# match players from the same queues; sql keeps the main game in game_data
+# (drotic lobbies have no table there and stay in drotic.json); sqlite keeps
+# all three game types in the tables of sqlite_store.py
+if backend("lobbies") == "sqlite":
+    lobbies = SqliteLobbyTable(sqlite_db,"game",on_change = lobby_events.notify,warm = LOBBY_WARM_POOL,max_free = LOBBY_MAX_FREE)
+    drotic_lobbies = SqliteLobbyTable(sqlite_db,"drotic",empty = empty_drotic_lobby,warm = LOBBY_WARM_POOL,max_free = LOBBY_MAX_FREE)
+elif backend("lobbies") == "redis":
+    lobbies = RedisLobbyTable(redis,on_change = lobby_events.notify)
+    drotic_lobbies = RedisLobbyTable(redis,prefix = "drotic:",empty = empty_drotic_lobby)
+elif backend("lobbies") == "sql":
+    lobbies = load_sql().SqlLobbyTable(on_change = lobby_events.notify)
+    drotic_lobbies = LobbyTable(drotic_path,empty = empty_drotic_lobby,warm = LOBBY_WARM_POOL,max_free = LOBBY_MAX_FREE)
+else:
+    lobbies = LobbyTable(game_paths,on_change = lobby_events.notify,warm = LOBBY_WARM_POOL,max_free = LOBBY_MAX_FREE)
+    drotic_lobbies = LobbyTable(drotic_path,empty = empty_drotic_lobby,warm = LOBBY_WARM_POOL,max_free = LOBBY_MAX_FREE)
+if backend("lobbies") == "sqlite":
+    second_games = SqliteRepository(sqlite_db)
+else:
+    second_games = LobbyRepository(second_game_path)
+stores = [accounts,lobbies,drotic_lobbies,second_games]
+# errors go to per-day NDJSON segments (or the sqlite logs table) through a
+# queue, see write_logs
+if backend("logs") == "sqlite":
+    log_sink = SqliteLogSink(sqlite_db)
+else:
+    log_sink = LogSink(logs_dir)
+
+
+#SECRETS
+# kept in memory, reloaded when secrets.json is replaced or on SIGHUP;
+# read per call so a rotated key is used right away
+secrets_file = SecretsFile(secrets_path)
 
 def get_api_key() -> str:
-    with open(secrets_path,"r") as file:
-        data = json.load(file)
-    return data["x-api-normal"]    
+    return secrets_file.get("x-api-normal")
 
 
  
@@ -68,13 +188,9 @@ async def main():
     return "Ludice API"
 
 
-def write_deafault_bank(username:str) -> bool:
+async def write_deafault_bank(username:str) -> bool:
     try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
-        data[username] = 100
-        with open(bank_path,"w") as file:
-            json.dump(data,file)
+        return await run_blocking(accounts.set_default,username,100)
     except Exception as e:
         return False        
 
@@ -84,77 +200,70 @@ def get_ton_url() -> str:
  
 
 
-def write_def_stats(user_id:str) -> bool:
+async def write_def_stats(user_id:str) -> bool:
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
-        data.append({
-            "user_id":user_id,
-            "wins":0,
-            "total_games":0
-        })    
-        with open(stats_path,"w") as file:
-            json.dump(data,file)
+        await stats.create(user_id)
+        leaderboard.set(user_id,0,0)
         return True    
     except Exception as e:
         return False
     
 
-try:
-    redis = redis.Redis('localhost',6379,0,decode_responses=True)
-except Exception as e:
-    print(f"Redis is not start")    
+#REPLAY PROTECTION
+# a signed body is accepted once; it can not be older than SIGNATURE_WINDOW
+# or further than MAX_CLOCK_SKEW in the future, so remembering signatures
+# for both is enough. REPLAY_CACHE=redis shares the cache between workers
+SIGNATURE_WINDOW = 300
+MAX_CLOCK_SKEW = 30
+if os.getenv("REPLAY_CACHE","memory") == "redis":
+    replay_cache = RedisReplayCache(redis,SIGNATURE_WINDOW + MAX_CLOCK_SKEW)
+else:
+    replay_cache = ReplayCache(SIGNATURE_WINDOW + MAX_CLOCK_SKEW)
+
+#LEADERBOARDS
+# ranked boards are updated with every stats change instead of sorting
+# stats.json per request; LEADERBOARD=redis keeps them in sorted sets
+if os.getenv("LEADERBOARD","memory") == "redis":
+    leaderboard = RedisLeaderboard(redis)
+else:
+    leaderboard = Leaderboard()
+leaderboard.load(stats.rows())
 
 def get_key() -> str:
-    with open(secrets_path,"r") as file:
-        data = json.load(file)
-    return data["key"]    
-
-KEY = get_key()
+    return secrets_file.get("key")
 
-def verify_signature(data: dict, received_signature: str) -> bool:
-    if time.time() - data.get('timestamp', 0) > 300:
+def verify_signature(data: Union[dict,BaseModel], received_signature: str) -> bool:
+    # request models are signed as they are, without a model_dump() copy
+    timestamp = data.get('timestamp', 0) if isinstance(data,dict) else getattr(data,'timestamp',0)
+    age = time.time() - timestamp
+    if age > SIGNATURE_WINDOW or age < -MAX_CLOCK_SKEW:
         print("====== DEBUG =======")
         print("TIME SECURITY ERROR")
         return False
     
     
-    data_to_verify = data.copy()
-    data_to_verify.pop("signature", None)
-    
-    data_str = json.dumps(data_to_verify, sort_keys=True, separators=(',', ':'))
-    expected_signature = hmac.new(KEY.encode(), data_str.encode(), hashlib.sha256).hexdigest()
-    
-    return hmac.compare_digest(received_signature, expected_signature)
+    key = get_key()
+    if not signing.verify(key,data,received_signature):
+        return False
+    # only valid signatures are remembered, so garbage can not fill the cache
+    return not replay_cache.seen(received_signature)
 
 def generate_siganture(data:dict) -> str:
-    data_to_ver = data.copy()
-    data_to_ver.pop("signature",None)
-    data_str = json.dumps(data_to_ver, sort_keys=True, separators=(',', ':'))
-    expected_signature = hmac.new(KEY.encode(), data_str.encode(), hashlib.sha256).hexdigest()
-    return str(expected_signature)
+    return signing.sign(get_key(),data)
 
 
-time_lock = threading.Lock()
+#RATE LIMIT
+# token bucket per user, RATE_LIMIT_RATE requests per second with bursts of
+# RATE_LIMIT_BURST; RATE_LIMIT=redis shares the buckets between workers
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE","1"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST","1"))
+if os.getenv("RATE_LIMIT","memory") == "redis":
+    rate_limiter = RedisRateLimiter(redis,RATE_LIMIT_RATE,RATE_LIMIT_BURST)
+else:
+    rate_limiter = RateLimiter(RATE_LIMIT_RATE,RATE_LIMIT_BURST)
+
 def check_time_seciruty(username:str) -> bool:
-    with time_lock:
-        with open(time_sec_path,"r") as file:
-            data = json.load(file)
-        cur_time = time.time()   
-        if username in data:
-            if cur_time - data[username] < 1:
-                return False
-        data[username] = cur_time
-        #clear all old data
-
-        cleaned_data = {}
-
-        for user,user_time in data.items():
-            if cur_time - user_time < 3600:
-                cleaned_data[user] = user_time
-        with open(time_sec_path,"w") as file:
-            json.dump(data,file)
-        return True
+    return rate_limiter.allow(username)
     
 
 def redis_register(username:str,pasw:str) -> bool:
@@ -167,7 +276,7 @@ def redis_register(username:str,pasw:str) -> bool:
 
 
 
-def payment(username:str,amount:int,message:str = "") -> bool:
+async def payment(username:str,amount:int,message:str = "") -> bool:
     #payment url change to real payment url
     url = "http://0.0.0.0:8080/user/pay"
     main_data = {
@@ -176,20 +285,13 @@ def payment(username:str,amount:int,message:str = "") -> bool:
         "message":message,
         "timestamp":time.time()
     }
-    data_str = json.dumps(main_data, sort_keys=True, separators=(',', ':'))
-        
-    signature = hmac.new(
-        KEY.encode(),
-        data_str.encode(),
-        hashlib.sha256
-    ).hexdigest()
-    main_data["signature"] = signature
+    main_data["signature"] = signing.sign(get_key(),main_data)
     
     headers ={
         "Content-Type": "application/json"
     }
     try:
-        resp = requests.post(url,json = main_data,headers=headers)
+        resp = await http_client().post(url,json = main_data,headers=headers)
         return resp.status_code == 200
     except Exception as e:
         print(f"Error : {e}")
@@ -197,37 +299,13 @@ def payment(username:str,amount:int,message:str = "") -> bool:
                 
 #------- ЛОГИ -------
 def write_logs(error:str):
+    # O(1): queued for the log writer thread
+    log_sink.write(error)
+async def is_user_balance_exists(username:str) -> bool:
+    return await run_blocking(accounts.exists,username)
+async def write_first_vznos(username:str) -> bool:
     try:
-        with open(logs_path,"r") as file:
-            data = json.load(file)
-        data.append({
-            "time":datetime.now(),
-            "error":error,
-            "id":uuid.uuid4()
-        })    
-        with open(logs_path,"w") as file:
-            json.dump(data,file)
-    except Exception as e:
-        print(f"Error : {e}")
-def is_user_balance_exists(username:str) -> bool:
-    try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
-        if not data.get(username):
-            return False
-        return True
-
-    except Exception as e:
-        print(f"Exception as {e}")
-def write_first_vznos(username:str) -> bool:
-    try:
-        with open(vznos_path,"r") as file:
-            data = json.load(file)
-        if not data.get(username):
-            data[username] = 100
-            return True
-        else:
-            return False
+        return await payments.claim_first(username)
     except Exception as e:
         raise Exception(f"Error : {e}")
 
@@ -239,63 +317,44 @@ class Register(BaseModel):
 
 async def register(request:Register):
    
-    if not verify_signature(request.dict(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code=403,detail="Invalid signature")
     else:
         # DEFAULT LOBBY DATA
-        with open(lobby_path,"r") as file:
-            lobs = json.load(file)
-        lobs.append({
-            "username":request.username,
-            "lobbys":[]
-        })
-        with open(lobby_path,"w") as file:
-            json.dump(lobs,file)
+        async with edit_json(lobby_path,[]) as lobs:
+            lobs.append({
+                "username":request.username,
+                "lobbys":[]
+            })
         #DEFAULT DATA
-        if not is_user_balance_exists(request.username):
-            write_def_stats(request.username) 
-            write_deafault_bank(request.username)
-            if not write_first_vznos(request.username):
+        if not await is_user_balance_exists(request.username):
+            await write_def_stats(request.username) 
+            await write_deafault_bank(request.username)
+            if not await write_first_vznos(request.username):
                 print("User already has first vznos")
 
 
 def delete_the_same(bet:int,user_id1 : str,user_id2:str,id_that_we_need:str) -> bool:
-    with open(game_paths,"r") as file:
-        data = json.load(file)
-    for game in data:
-        if game["id"] != id_that_we_need and user_id1 in data["players"] and user_id2 in data["players"] and game["bet"] == bet:
-            ind = data.index(game)
-            data.pop(ind)
-            with open(game_paths,"w") as file:
-                json.dump(data,file)
-            return True
+    for game in lobbies.values():
+        if game["id"] != id_that_we_need and user_id1 in game["players"] and user_id2 in game["players"] and game["bet"] == bet:
+            return lobbies.recycle(game["id"])
     return False        
 
 
-def add_win(user_id:str) -> bool:
+async def add_win(user_id:str) -> bool:
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["user_id"] == user_id:
-                user["wins"] += 1
-                with open(stats_path,"w") as file:
-                    json.dump(data,file)
-                return True         
+        if await stats.add_win(user_id):
+            leaderboard.add(user_id,wins = 1)
+            return True
         return False
     except Exception as e:
         return False
-def add_game(user_id:str) -> bool:
+async def add_game(user_id:str) -> bool:
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["user_id"] == user_id:
-                user["total_games"] += 1
-                with open(stats_path,"w") as file:
-                    json.dump(data,file)     
-                return True
-        return False     
+        if await stats.add_game(user_id):
+            leaderboard.add(user_id,games = 1)
+            return True
+        return False
     except Exception as e:
         return False  
 
@@ -309,30 +368,20 @@ class IncreaseUserBalance(BaseModel):
 @app.post("/user/increase")
 async def increase_user_balance(request:IncreaseUserBalance):
     
-    request_dict = request.dict()
-    if not verify_signature(request_dict, request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(
             status_code=403, 
             detail="Invalid signature - data tampered"
         )
     try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
-        data[request.username] += request.amount
-
-        with open(bank_path,"w") as file:
-            json.dump(data,file)
+        await run_blocking(accounts.increase,request.username,request.amount)
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Error something went wrong : {e}")
     
-def write_sogl(username:str,state:bool):
+async def write_sogl(username:str,state:bool):
     try:
-        with open(sogl_path,"r") as file:
-            data = json.load(file)
-        data[username] = state
-        with open(sogl_path,"w") as file:
-            json.dump(data,file)     
+        await terms.set(username,state)
     except Exception as e:
         print(f"Error : {e}")
         raise ValueError("Error soglasie") 
@@ -344,10 +393,10 @@ class WriteTerms(BaseModel):
     timestamp:float = Field(default_factory=time.time)
 @app.post("/write/terms")
 async def write_terms(req:WriteTerms):
-    if not verify_signature(req.model_dump(),req.signature):
+    if not verify_signature(req,req.signature):
         raise HTTPException(status_code = 403,detail = "Invalid signature")
     try:
-        write_sogl(username=req.username,state=req.terms)
+        await write_sogl(username=req.username,state=req.terms)
     except Exception as e:
         raise HTTPException(status_code = 400,detail = f"Error : {e}")
 
@@ -355,20 +404,18 @@ async def write_terms(req:WriteTerms):
 @app.get("/check/terms/{username}",dependencies=[Depends(verify_headeer)])
 async def check_terms(username:str):
     try:
-        with open(sogl_path,"r") as file:
-            data = json.load(file)
-        if data.get(username):
-            return data[username]
+        state = await terms.get(username)
+        if state:
+            return state
         else:
             raise HTTPException(status_code = 404,detail = "User not found")    
     except Exception as e:
         raise HTTPException(status_code = 400,detail = f"Error : {e}")
 @app.get("/get/user/exist/{username}",dependencies=[Depends(verify_headeer)])
 async def check_user_exists(username:str):
-    with open(sogl_path,"r") as file:
-        data = json.load(file)
+    state = await terms.get(username)
     try:
-        if data.get(username):
+        if state:
             return True
         raise HTTPException(status_code = 404,detail = "User doenst excists")
     except Exception as e:
@@ -377,20 +424,20 @@ async def check_user_exists(username:str):
 @app.post("/user/withdraw")
 async def withdraw(request:IncreaseUserBalance):
    
-    request_dict = request.dict()
-    if not verify_signature(request_dict, request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(
             status_code=403, 
             detail="Invalid signature - data tampered"
         )
     try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
+        if not await run_blocking(accounts.exists,request.username):
+            raise KeyError(request.username)
         try:
-            payment(request.username,request.amount,"")
-            data[request.username] = 0
-            with open(bank_path,"w") as file:
-                json.dump(data,file)
+            # the balance is taken before the payout and given back if it fails
+            old = await run_blocking(accounts.reset,request.username)
+            if not await payment(request.username,request.amount,""):
+                await run_blocking(accounts.increase,request.username,old)
+                raise ValueError("Payment failed")
         except Exception as e:
             raise HTTPException(status_code = 400,detail = f"Error : {e}")    
     except Exception as e:
@@ -398,16 +445,10 @@ async def withdraw(request:IncreaseUserBalance):
         raise HTTPException(status_code=400,detail=f"Something went wrong : {e}")
 @app.post("/user/decrease")
 async def decrease(request:IncreaseUserBalance):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code = 403,detail = "Invalid signature")
     try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
-        if data[request.username] >= request.amount:
-            data[request.username] -= request.amount
-            with open(bank_path,"w") as file:
-                json.dump(data,file)
-        else:
+        if not await run_blocking(accounts.decrease,request.username,request.amount):
             raise HTTPException(status_code = 400,detail="Error user doesnt have enough money")        
 
     except Exception as e:
@@ -420,12 +461,10 @@ async def decrease(request:IncreaseUserBalance):
 async def get_user_balance(username:str):
     
     try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
-        try:
-            return data[username]
-        except Exception as e:
+        balance = await run_blocking(accounts.get,username)
+        if balance is None:
             raise HTTPException(status_code=404,detail=f"User:{username} not found")              
+        return balance
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Error : {e}")
@@ -434,9 +473,7 @@ async def get_user_balance(username:str):
 @app.get("/count_money",dependencies = [Depends(verify_headeer)])
 async def count_all_money():
     try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
-        return sum(data.values())
+        return await run_blocking(accounts.total)
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Something went wrong {e}")
@@ -451,34 +488,17 @@ class Start_Game(BaseModel):
 @app.post("/start/game")
 async def start_game(request:Start_Game):
     
-    request_dict = request.model_dump()
-    if not verify_signature(request_dict, request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(
             status_code=403, 
             detail="Invalid signature - data tampered"
         )
-    found = False
-    with open(game_paths,"r") as file:
-        data = json.load(file)
-    found_id = ""    
-    for game in data:
-        if len(game["players"]) == 1 and game["bet"] == request.bet and request.username not in game["players"]:
-            game["players"].append(request.username)
-            found = True
-            found_id = game["id"]
-            add_game(user_id = request.username)
-    if found:
-        with open(game_paths,"w") as file:
-            json.dump(data,file)
-        return found_id
+    lobby_id,joined = await run_blocking(lobbies.match_or_open,request.username,request.bet)
+    if joined:
+        await add_game(user_id = request.username)
+        return lobby_id
     else:
-        for game in data:
-            if len(game["players"]) == 0:
-                game["bet"] = request.bet  
-                game["players"].append(request.username)
-                with open(game_paths,"w") as file:
-                    json.dump(data,file)
-                raise HTTPException(status_code=400,detail=game["id"])
+        raise HTTPException(status_code=400,detail=lobby_id)
 
 class IsLobbyfull(BaseModel):
     lobby_id:str
@@ -486,30 +506,44 @@ class IsLobbyfull(BaseModel):
     timestamp:float = Field(default_factory=time.time)
 @app.post("/check/lobby/fill")
 async def check_lobby_fill(request:IsLobbyfull):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code = 403,deatil = "Invalid signature")
     try:
-        with open(game_paths,"r") as file:
-            data = json.load(file)
-        for game in data:
-            if game["id"] == request.lobby_id:
-                return len(game["players"]) == 2
+        game = await run_blocking(lobbies.get,request.lobby_id)
+        if game is not None:
+            return len(game["players"]) == 2
         raise HTTPException(status_code = 404,deatil = "Lobby not found")    
                 
     except Exception as e:
         raise HTTPException(status_code = 400,deatil = f"Error as {e}")
 
-def count_procent_of_wins(user_id:str) -> float:
+class WaitLobby(BaseModel):
+    lobby_id:str
+    wait:float = LONG_POLL_MAX
+    signature:str
+    timestamp:float = Field(default_factory=time.time)
+@app.post("/wait/lobby/fill")
+async def wait_lobby_fill(request:WaitLobby):
+    """Long-poll version of /check/lobby/fill, returns as soon as the second player joins."""
+    if not verify_signature(request,request.signature):
+        raise HTTPException(status_code = 403,detail = "Invalid signature")
+    async def ready() -> bool:
+        game = await run_blocking(lobbies.get,request.lobby_id)
+        return game is None or len(game["players"]) == 2
+    await lobby_events.wait_for(request.lobby_id,ready,min(max(request.wait,0),LONG_POLL_MAX))
+    game = await run_blocking(lobbies.get,request.lobby_id)
+    if game is None:
+        raise HTTPException(status_code = 404,detail = "Lobby not found")
+    return len(game["players"]) == 2
+
+def procent_of_wins(user:dict) -> float:
+    return procent(user["wins"],user["total_games"])
+
+async def count_procent_of_wins(user_id:str) -> float:
     try:
-        found = False
-        with open(stats_path,"r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["user_id"] == user_id:
-                found = True
-                return float(user["total_games"] / user["wins"]) * 100
-        if found:
-            return True
+        user = await stats.get(user_id)
+        if user is not None:
+            return procent_of_wins(user)
         return False                    
                  
     except Exception as e:
@@ -523,23 +557,13 @@ class Cancel_My_Find(BaseModel):
 @app.post("/cancel/find")
 async def cancel_find(request:Cancel_My_Find):
     
-    request_dict = request.model_dump()
-    if not verify_signature(request_dict, request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(
             status_code=403, 
             detail="Invalid signature - data tampered"
         )
-    with open(game_paths,"r") as file:
-        data = json.load(file)               
     try:
-        for game in data:
-            if game["id"] == request.id and len(game["players"]) == 1 and request.username in game["players"]:
-                ind = data.index(game)
-                data.pop(ind)
-                with open(game_paths,"w") as file:
-                    json.dump(data,file)
-                return True
-        return False             
+        return await run_blocking(lobbies.cancel,request.id,request.username)
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Exception as {e}")         
@@ -550,12 +574,10 @@ class Check_User_First_Vznos(BaseModel):
     timestamp:float = Field(default_factory=time.time)
 @app.post("/check/first/vznos")  
 async def check_vznos(req:Check_User_First_Vznos):
-    if not verify_signature(req.model_dump(),req.signature):
+    if not verify_signature(req,req.signature):
         raise HTTPException(status_code = 401,detail = "Invalid signature")
     try:
-        with open(vznos_path,"r") as file:
-            data = json.load(file)
-        if not data.get(req.username):
+        if not await payments.has_first(req.username):
             return False # могу тут вернуть HTTPException но на фронте проверять лучше не по response.status_code а по response.json()
         return True
     except Exception as e:
@@ -569,21 +591,13 @@ class Win(BaseModel):
 @app.post("/write/winner")
 async def write_winner(request:Win):
 
-    request_dict = request.model_dump()
-    if not verify_signature(request_dict, request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(
             status_code=403, 
             detail="Invalid signature - data tampered"
         )
     try:
-        with open(game_paths,"r") as file:
-            data = json.load(file)
-        for game in data:
-            if game["id"] == request.id_ and len(game["players"]) == 2 and request.username in game["players"]:
-                if game["winner"] == "":
-                    game["winner"] = request.username
-                    with open(game_paths,"w") as file:
-                        json.dump(data,file)
+        await run_blocking(lobbies.set_winner,request.id_,request.username)
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Error {e}")   
@@ -594,7 +608,7 @@ class FragmentStarsTransfer:
         self.secret_key = secret_key
         self.base_url = "https://fragment.com/api/v1"
     
-    def transfer_stars(self, to_username, amount):
+    async def transfer_stars(self, to_username, amount):
         # Параметры запроса
         params = {
             'api_key': self.api_key,
@@ -609,7 +623,7 @@ class FragmentStarsTransfer:
         params['signature'] = signature
         
         # Отправка запроса
-        response = requests.post(
+        response = await http_client().post(
             f"{self.base_url}/transfer",
             json=params,
             headers={'Content-Type': 'application/json'}
@@ -631,7 +645,7 @@ class FragmentPay(BaseModel):
     amount:int
 @app.post("/pay/fragment")
 async def fragment_pay(req:FragmentPay,x_signature:str = Header(...),x_timestamp:str = Header()):
-    if not verify_signature(req.model_dump(),x_signature,x_timestamp):
+    if not verify_signature(req,x_signature,x_timestamp):
         raise HTTPException(status_code = 401,detail = "Invalid signature")
     try:
         pass
@@ -646,24 +660,14 @@ class Leave(BaseModel):
 @app.post("/leave")
 async def leave(request:Leave):
     
-    request_dict = request.model_dump()
-    if not verify_signature(request_dict, request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(
             status_code=403, 
             detail="Invalid signature - data tampered"
         )
     try:
-        with open(game_paths,"r") as file:
-            data = json.load(file)
-        for game in data:
-            if game["id"] == request.id:
-                if len(game["players"]) == 2 and request.user_id in game["players"]:
-                    game["players"] = []
-                    game["bet"] = 0
-                    game["winner"] = ""
-                    with open(game_paths,"w") as file:
-                        json.dump(data,file)
-                    return True
+        if await run_blocking(lobbies.reset,request.id,request.user_id):
+            return True
         raise HTTPException(status_code=400,detail="Error lobby not found :(")        
     except Exception as e:
         write_logs(str(e))
@@ -676,84 +680,68 @@ class Procent_Of_Wins(BaseModel):
 @app.post("/count/wins") 
 async def count_of_wins(request:Procent_Of_Wins):
     
-    request_dict = request.model_dump()
-    if not verify_signature(request_dict, request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(
             status_code=403, 
             detail="Invalid signature - data tampered"
         )
-    result = count_of_wins(request.user_id)
     try:
-        return result
+        return await count_procent_of_wins(request.user_id)
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Error: {e}")    
 @app.get("/get/leader/board/most_games",dependencies = [Depends(verify_headeer)])
-async def get_leader_board_games():
+async def get_leader_board_games(limit:Optional[int] = None):
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
-        result = {}
-        for user in data:
-            result[user["user_id"]] = user["total_games"]   
-        return result     
+        return json_object_response(leaderboard.top("games",limit))
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Error: {e}")
 @app.get("/get/procent/wins",dependencies = [Depends(verify_headeer)])
-async def get_leader_board():
+async def get_leader_board(limit:Optional[int] = None):
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
-        result = {}
-        for user in data:
-            pr = count_of_wins(user["user_id"])
-            result[user["user_id"]] = pr
-        return result        
+        return json_object_response(leaderboard.top("procent",limit))
     except Exception as e:
         raise HTTPException(status_code=400,detail=f"Error:{e}")
+@app.get("/get/leader/board/rank/{user_id}",dependencies = [Depends(verify_headeer)])
+async def get_leader_board_rank(user_id:str):
+    try:
+        ranks = {board:leaderboard.rank(board,user_id) for board in ("games","wins","procent")}
+    except Exception as e:
+        write_logs(str(e))
+        raise HTTPException(status_code=400,detail=f"Error: {e}")
+    if ranks["games"] is None:
+        raise HTTPException(status_code=404,detail="User not found")
+    return ranks
 
 @app.get("/getme/{user_id}",dependencies = [Depends(verify_headeer)])
 async def get_me(user_id:str):
-    with open(bank_path,"r") as file:
-        data = json.load(file)
-    balance = None    
-    for user in data:
-        if user["username"] == user_id:
-            balance = user["balance"]
-
+    balance = await run_blocking(accounts.get,user_id)
 
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["user_id"] == user_id:
-                wins_pocent = count_of_wins(user_id)
-                return {
-                    "Total games":user["total_games"],
-                    "Wins":user["wins"],
-                    "Wins procent" : wins_pocent,
-                    "Balance":balance
-                }
+        user = await stats.get(user_id)
+        if user is not None:
+            wins_pocent = procent_of_wins(user)
+            return {
+                "Total games":user["total_games"],
+                "Wins":user["wins"],
+                "Wins procent" : wins_pocent,
+                "Balance":balance
+            }
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Error : {e}")        
 
 
-def is_user_playing(user_id:str) -> bool:
-    with open(game_paths,"r") as file:
-        data = json.load(file)
-    for game in data:
-        if user_id in game["players"]:
-            return True
-    return False
+async def is_user_playing(user_id:str) -> bool:
+    return await run_blocking(lobbies.is_playing,user_id)
         
 
 
 @app.get("/isuser/playing/{user_id}",dependencies = [Depends(verify_headeer)])
 async def is_playing(user_id:str) -> bool:
     try:
-       return is_user_playing(user_id)
+       return await is_user_playing(user_id)
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Error {e}")
@@ -768,19 +756,10 @@ class WriteResult(BaseModel):
     timestamp:float = Field(default_factory=time.time)
 @app.post("/write/game/result")
 async def write_game_result(request:WriteResult):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code = 403,detail = "Invalid signature")
     try:
-        ind = False
-        with open(game_paths,"r") as file:
-            data = json.load(file)
-        for game in data:
-            if game["id"] == request.lobby_id:
-                game[f"result_{request.username}"] = request.result
-                with open(game_paths,"w") as file:
-                    json.dump(data,file)
-                ind = True
-        if not ind:
+        if not await run_blocking(lobbies.set_result,request.lobby_id,request.username,request.result):
             raise HTTPException(status_code=404,detail = "Lobby not found")
     except Exception as e:
         raise HTTPException(status_code = 400,detail = f"Error : {e}")    
@@ -790,40 +769,37 @@ async def write_game_result(request:WriteResult):
 async def get_game_result(game_id: str):
     """Get game results if both players have submitted their dice rolls."""
     try:
-        with open(game_paths, "r") as file:
-            data = json.load(file)
-
-        for game in data:
-            if game["id"] == game_id:
-                if len(game["players"]) != 2:
-                    raise HTTPException(status_code=400, detail="Game does not have 2 players")
-
-                player1 = game["players"][0]
-                player2 = game["players"][1]
-
-                # Check if both players have submitted results
-                result1_key = f"result_{player1}"
-                result2_key = f"result_{player2}"
-
-                if result1_key not in game or result2_key not in game:
-                    # Not all players have rolled yet
-                    raise HTTPException(status_code = 405,detail = "Users are not rooled yet")
-
-                # Both players have rolled - determine winner
-                result1 = game[result1_key]
-                result2 = game[result2_key]
-
-                if result1 > result2:
-                    winner = player1
-                elif result2 > result1:
-                    winner = player2
-                else:
-                    winner = "draw"
-                return {
-                    f"{player1}":f"{result1}",
-                    f"{player2}":f"{result2}",
-                    "winner":winner
-                }
+        game = await run_blocking(lobbies.get,game_id)
+        if game is not None:
+            if len(game["players"]) != 2:
+                raise HTTPException(status_code=400, detail="Game does not have 2 players")
+
+            player1 = game["players"][0]
+            player2 = game["players"][1]
+
+            # Check if both players have submitted results
+            result1_key = f"result_{player1}"
+            result2_key = f"result_{player2}"
+
+            if result1_key not in game or result2_key not in game:
+                # Not all players have rolled yet
+                raise HTTPException(status_code = 405,detail = "Users are not rooled yet")
+
+            # Both players have rolled - determine winner
+            result1 = game[result1_key]
+            result2 = game[result2_key]
+
+            if result1 > result2:
+                winner = player1
+            elif result2 > result1:
+                winner = player2
+            else:
+                winner = "draw"
+            return {
+                f"{player1}":f"{result1}",
+                f"{player2}":f"{result2}",
+                "winner":winner
+            }
         raise HTTPException(status_code=404, detail="Game not found")
 
     except FileNotFoundError:
@@ -833,28 +809,32 @@ async def get_game_result(game_id: str):
         raise HTTPException(status_code=400, detail=f"Error: {e}")
 
 
+@app.get("/wait/game/result/{game_id}",dependencies = [Depends(verify_headeer)])
+async def wait_game_result(game_id: str,wait:float = LONG_POLL_MAX):
+    """Long-poll version of /get/game/result, returns as soon as both players have rolled."""
+    async def ready() -> bool:
+        game = await run_blocking(lobbies.get,game_id)
+        if game is None or len(game["players"]) != 2:
+            return True
+        return all(f"result_{player}" in game for player in game["players"])
+    await lobby_events.wait_for(game_id,ready,min(max(wait,0),LONG_POLL_MAX))
+    return await get_game_result(game_id)
+
+
 @app.get("/join/link/{game_id}/{user_id}/{bet}",dependencies = [Depends(verify_headeer)])
 async def join_by_the_link(user_id:str,bet:int,game_id:str):
     
     try:
-        with open(game_paths,"r") as file:
-            data = json.load(file)
-        done = False
-        for game in data:
-            if game["id"] == game_id:
-                try:
-                    if len(game["players"] == 1 and user_id not in game["players"]) and game["bet"] == bet:
-                        game["players"].append(user_id)
-                        done = True
-                        with open(game_paths,"w") as file:
-                            json.dump(data,file)
-                        return True
-                    else:
-                        raise HTTPException(status_code=400,detail="Lobby is full")
-                     
-                except Exception as e:
-                    write_logs(str(e))
-                    raise HTTPException(status_code=400,detail=f"Error : {e}")        
+        if await run_blocking(lobbies.get,game_id) is not None:
+            try:
+                if await run_blocking(lobbies.join,game_id,user_id,bet):
+                    return True
+                else:
+                    raise HTTPException(status_code=400,detail="Lobby is full")
+                 
+            except Exception as e:
+                write_logs(str(e))
+                raise HTTPException(status_code=400,detail=f"Error : {e}")        
 
     except Exception as e:
         raise HTTPException(status_code=400,detail=f"Error while joining : {e}")
@@ -863,14 +843,17 @@ class GetLogs(BaseModel):
     siganture:str
     timestamp:float = Field(default_factory=time.time)
 @app.post("/get/server/logs")
-async def get_logs(request:GetLogs):
-    if not verify_signature(request.model_dump(),request.siganture):
+async def get_logs(request:GetLogs,cursor:Optional[str] = None,limit:int = 100,format:Literal["page","ndjson"] = "page"):
+    # paginated oldest first, pass the returned cursor back for the next page;
+    # format=ndjson streams the whole log instead
+    if not verify_signature(request,request.siganture):
         raise HTTPException(status_code = 429,detail = "Invalid siganture")
     else:
-        with open(logs_path,"r") as file:
-            data = json.load(file)
         try:
-            return data
+            if format == "ndjson":
+                return ndjson_response(log_sink.records())
+            logs,next_cursor = await run_blocking(log_sink.read,cursor,min(max(limit,1),1000))
+            return {"logs":logs,"cursor":next_cursor}
         except Exception as e:
             write_logs(str(e))
             raise HTTPException(status_code = 400 ,detail = f"Error: {e} ")
@@ -882,18 +865,11 @@ class GetLogsByDate(BaseModel):
     timestamp:float = Field(default_factory=time.time)      
 @app.post("/get/log/date")
 async def get_log_by_date(request:GetLogsByDate):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code=429,detail = "Invalid signature")
     else:
-        with open(logs_path,"r") as file:
-            data = json.load(file)
-        result = []    
-        for log in data:
-            tm = str(log["time"]).split()[0]
-            if tm == request.date:
-                result.append(tm)
         try:
-            return result
+            return json_array_response(log_sink.records(request.date))
         except Exception as e:
             raise HTTPException(status_code=400,detail = f"Error : {e}")        
 # Интрефейс Платежки
@@ -910,7 +886,7 @@ class TelegrammPayment(PaymentInter):
     def __init__(self,bot_token):
         self.token = bot_token
         self.url = f"https://api.telegram.org/bot{bot_token}"    
-    def create_payment(self,chat_id:str,description:str,amount:int,title:str):
+    async def create_payment(self,chat_id:str,description:str,amount:int,title:str):
         payload = {
             "chat_id": chat_id,
             "title": title,
@@ -920,12 +896,12 @@ class TelegrammPayment(PaymentInter):
             "currency": "XTR",  
             "prices": [{"label": "Stars", "amount": amount}] 
         }
-        response = requests.post(f"{self.url}/sendInvoice", json=payload)
+        response = await http_client().post(f"{self.url}/sendInvoice", json=payload)
         return response.json()
-    def get_user_balance(self,user_id:str):
+    async def get_user_balance(self,user_id:str):
         try:
             payload = {"user_id": user_id}
-            response = requests.post(f"{self.base_url}/getUserStars", json=payload)
+            response = await http_client().post(f"{self.url}/getUserStars", json=payload)
             return response.json()
         except Exception as e:
             return f"Exception {e}"
@@ -937,18 +913,17 @@ class Get_User_Balance(BaseModel):
     user_id:str
     signature:str
     timestamp:float = Field(default_factory=time.time)
-
+@app.post("/get/user/balance")
 async def get_user_balance(request:Get_User_Balance):
     if not check_time_seciruty(request.user_id):
         raise HTTPException(status_code=429,detail="Too many requests")
-    request_dict = request.dict()
-    if not verify_signature(request_dict, request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(
             status_code=403, 
             detail="Invalid signature - data tampered"
         )    
     try:
-        return UserPayment.get_user_balance(user_id=request.user_id)
+        return await UserPayment.get_user_balance(user_id=request.user_id)
     except Exception as e:
         raise HTTPException(status_code=400,detail=f"Payment Error: {e}")
 class Payment(BaseModel):
@@ -960,14 +935,15 @@ class Payment(BaseModel):
     timestamp:float = Field(default_factory=time.time)
 @app.post("/user/pay")
 async def user_pay(request:Payment):
-    request_dict = request.model_dump()
-    if not verify_signature(request_dict, request.signature):
+    if not check_time_seciruty(request.user_id):
+        raise HTTPException(status_code=429,detail="Too many requests")
+    if not verify_signature(request,request.signature):
         raise HTTPException(
             status_code=403, 
             detail="Invalid signature - data tampered"
         )   
     try:
-        UserPayment.create_payment(
+        await UserPayment.create_payment(
             chat_id = request.user_id,
             description = request.description,
             amount = request.amount,
@@ -978,13 +954,21 @@ async def user_pay(request:Payment):
         raise HTTPException(status_code=400,detail=f"Error : {e}")
 
 def is_game2_already_played_by_user(username:str) -> bool:
-    with open("data_second_game.json","r") as file:
-        data = json.load(file)
-    for user in data:
-        if user["username"] == username:
+    for game in second_games.values():
+        if game["username"] == username:
             return True
     return False        
 
+# the check and the add run as one call in the I/O pool, so two requests
+# of the same user can not both start a game
+second_game_lock = threading.Lock()
+def add_second_game(record:dict) -> bool:
+    with second_game_lock:
+        if is_game2_already_played_by_user(record["username"]):
+            return False
+        second_games.add(record)
+        return True
+
 
 ############ SECOND GAME ############
 ####################################
@@ -1002,22 +986,17 @@ class Start_Second_Game(BaseModel):
     timestamp:float = Field(default_factory = time.time)
 @app.post("/start/new/game2")
 async def start_new_game(request:Start_Second_Game):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code=403,detail="Invalid signature")
     try:
-        with open("data_second_game.json","r") as file:
-            data = json.load(file)
         id = str(uuid.uuid4())    
-        if not is_game2_already_played_by_user(request.username):
-            data.append({
+        if await run_blocking(add_second_game,{
                 "username":request.username,
                 "bet":request.bet,
                 "win":False,
                 "num":request.num,
                 "id":id
-            })
-            with open("data_second_game.json","w") as file:
-                json.dump(data,file)
+            }):
             return id
         else:
             raise HTTPException(status_code=400,detail="User is already playing")    
@@ -1032,19 +1011,14 @@ class Delete_Game(BaseModel):
     timestamp:float = Field(default_factory=time.time)
 @app.post("/delete_game")
 async def delete_game(request:Delete_Game):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code=403,detail="Invalid signature")
     else:
         try:
-            with open("data_second_game.json","r") as file:
-                data = json.load(file)
-            for game in data:
-                if game["username"] == request.usernmae and game["id"] == request.id:
-                    index = data.index(game)
-                    data.pop(index)
-                    with open("data_second_game.json","w") as file:
-                        json.dump(data,file)
-                    return True
+            game = await run_blocking(second_games.get,request.id)
+            if game is not None and game["username"] == request.usernmae:
+                await run_blocking(second_games.remove,request.id)
+                return True
             raise HTTPException(status_code=404,detail="Game not found")            
         except Exception as e:
             raise HTTPException(status_code=400,detail=f"Error : {e}")  
@@ -1055,18 +1029,16 @@ class GetUserGuess(BaseModel):
     id:str = Optional[str]
 @app.post("/get/user/num")
 async def get_user_num(request:GetUserGuess):
-    if not verify_signature(request.model_dump(),request.siganture):
+    if not verify_signature(request,request.siganture):
         raise HTTPException(status_code=403,detail="Invalid signature")
     else:
         try:
-            with open("data_second_game.json","r") as file:
-                data = json.load(file)
             if request.id:
-                for game in data:
-                    if game["id"] == request.id:
-                        return game["num"]
+                game = await run_blocking(second_games.get,request.id)
+                if game is not None:
+                    return game["num"]
             else:
-                for game in data:
+                for game in await run_blocking(second_games.values):
                     if game["username"] == request.username:
                         return game["num"]
             raise HTTPException(status_code=404,detail="Game not found")                    
@@ -1082,31 +1054,13 @@ class StartnewGame(BaseModel):
     timestamp:float = Field(default_factory = time.time)
 @app.post("/start/drotic/game")
 async def start_drotic_game(request:StartnewGame):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code = 403,detail = "Invalid signature") 
     else:
-        with open("drotic.json","r") as file:
-            data = json.load(file)
-        found = False    
-        for game in data:
-            if game["bet"] == request.bet and len(game["players"]) == 1 and request.username not in game["players"]:
-                game["players"].append(request.usernmae)
-                id = game["id"]
-                with open("drotic.json","w") as file:
-                    json.dump(data,file)
-                found = True    
-                return id
-        if not found:
-            with open("drotic.json","r") as file:
-                data = json.load(file)
-            for game in data:
-                if game["bet"] == request.bet and len(game["players"]) == 0:
-                    game["players"].append(request.username)
-                    game["bet"] = request.bet
-                    id = game["id"]
-                    with open("drotic.json","w") as file:
-                        json.dump(data,file)
-                    raise HTTPException(status_code = 400,detail = f"Lobby not found : {id}")            
+        id,joined = await run_blocking(drotic_lobbies.match_or_open,request.usernmae,request.bet)
+        if joined:
+            return id
+        raise HTTPException(status_code = 400,detail = f"Lobby not found : {id}")            
                        
 class DeleteGame(BaseModel):
     id:str
@@ -1114,19 +1068,12 @@ class DeleteGame(BaseModel):
     timestamp:float = Field(default_factory = time.time) 
 @app.post("/delete/drotic/game")
 async def delete_drotic_game(request:DeleteGame):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code = 403,detail = "Invalid Signature")
     else:
         try:
-            with open("drotic.json","r") as file:
-                data = json.load(file)
-            for game in data:
-                if data["id"] == request.id:
-                    ind = data.index(game)    
-                    data.pop(ind)
-                    with open("drotic.json","w") as file:
-                        json.dump(data,file)
-                    return True
+            if await run_blocking(drotic_lobbies.recycle,request.id):
+                return True
             raise HTTPException(status_code = 404,detail = "User not found")        
         except Exception as e:
             raise HTTPException(status_code = 400,detail = f"Error : {e}")           
@@ -1138,21 +1085,15 @@ class WriteOneTry(BaseModel):
     timestamp:float = Field(default_factory = time.time)
 @app.post("/write/one/try")
 async def write_one_try(request:WriteOneTry):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code = 403,detail = "Invalid signature")
     else:
         try:
-            with open("drotic.json","r") as file:
-                data = json.load(file)
-            for game in data:
-                if game["id"] == request.id:
-                    game["cache"].append({
-                        "username":request.username,
-                        "result":request.result
-                    })
-                    with open("drotic.json","w") as file:
-                        json.dump(data,file)
-                    return True
+            if await run_blocking(drotic_lobbies.append_to,request.id,"cache",{
+                "username":request.username,
+                "result":request.result
+            }):
+                return True
             raise HTTPException(status_code = 404,detail = "User not found")        
         except Exception as e:
             raise HTTPException(status_code = 400,deatail = f"Error : {e}") 
@@ -1170,7 +1111,7 @@ class SOS(BaseModel):
     timestamp:str = Field(default_factory=time.time)
 @app.post("/activate/sos")
 async def activates_sos(request:SOS):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code = 403,deatail= "Invalid signature")
     try:
         activate(request.ip)
@@ -1188,16 +1129,14 @@ class Get_Last_Throw(BaseModel):
     timestamp:float = Field(default_factory=time.time)
 @app.post("/get/last/throw")    
 async def get_last_throw(request:Get_Last_Throw):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code=403,detail="Invalid signature")
     try:
-        with open("drotic.json","r") as file:
-            data = json.load(file)
-        for game in data:
-            if game["id"] == request.id:
-                if len(game["players"]) == 2 and len(game["cache"]) != 0:
-                    return game["cache"][-1]
-                raise HTTPException(status_code=400 ,detail="Error the cache is empty -> zero bets or there are less than 2 players")
+        game = await run_blocking(drotic_lobbies.get,request.game_id)
+        if game is not None:
+            if len(game["players"]) == 2 and len(game["cache"]) != 0:
+                return game["cache"][-1]
+            raise HTTPException(status_code=400 ,detail="Error the cache is empty -> zero bets or there are less than 2 players")
         raise HTTPException(status_code=400,detail="Error game not found")    
     except Exception as e:
         raise HTTPException(status_code=400,detail=f"Error : {e}")
@@ -1215,36 +1154,20 @@ class DeleteUser(BaseModel):
     timestamp:float = Field(default_factory=time.time)
 @app.post("/delete/user")  
 async def delete_user(request:DeleteUser):
-    if not verify_signature(request.model_dump(),request.siganture):
+    if not verify_signature(request,request.siganture):
         raise HTTPException(status_code=403,detail="Invalid signature")
     found = False
     try:
-        with open("users.json","r") as file:
-            data = json.load(file)
-        if request.username in data:
-            del data[request.username]
-            with open("users.json","w") as file:
-                json.dump(data,file)
-            found = True    
-
-        with open("stats.json","r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["user_id"] == request.username:
-                ind = data.index(user)
-                data.pop(ind)
-                found = True
-                with open("stats.json","w") as file:
-                    json.dump(data,file)
-        with open("bank.json","r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["username"] == request.username:
-                ind = data.index(user)
-                data.pop(ind)
-                found = True
-                with open("stats.json","w") as file:
-                    json.dump(data,file)
+        async with edit_json(users_path,{}) as data:
+            if request.username in data:
+                del data[request.username]
+                found = True    
+
+        if await stats.delete(request.username):
+            found = True
+        leaderboard.remove(request.username)
+        if await run_blocking(accounts.delete,request.username):
+            found = True
         if found:
             return True
         raise HTTPException(status_code=404,detail="Error user not found")
@@ -1256,40 +1179,31 @@ class GetAllGames(BaseModel):
     timestamp:float = Field(default_factory=time.time)
 @app.post("/get/all/games")
 async def get_all_games(request:GetAllGames):
-    if not verify_signature(request.model_dump(),request.signature):
+    if not verify_signature(request,request.signature):
         raise HTTPException(status_code=403,detail="Invalid signature")
     games = []
     try:
-        with open("game.json","r") as file:
-            data = json.load(file)
-        for game in data:
-            if request.username in game["players"]:
-                games.append({
-                    "Name":"Ludice main game",
-                    "Game":game
-                })
-            break
+        game = await run_blocking(lobbies.player_lobby,request.username)
+        if game is not None:
+            games.append({
+                "Name":"Ludice main game",
+                "Game":game
+            })
 
-        with open("data_second_game.json","r") as file:
-            second_ = json.load(file)
-        for game in second_:
+        for game in await run_blocking(second_games.values):
             if game["username"] == request.username:
-                game.append({
+                games.append({
                     "Name":"Data second Game",
                     "Game":game
                 })
                 break
 
-        with open("drotic.json","r") as file:
-            drotic = json.load(file)
-
-        for game in drotic:
-            if request.username in game["players"]:
-                games.append({
-                    "Name":"Drotic",
-                    "Game":game
-                })    
-                break   
+        game = await run_blocking(drotic_lobbies.player_lobby,request.username)
+        if game is not None:
+            games.append({
+                "Name":"Drotic",
+                "Game":game
+            })    
         if len(games) != 0:
             return games
         raise HTTPException(status_code=404,detail="Right now user is not playing")        
@@ -6,6 +6,7 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import json
 import threading
+import os
 import socket
 from typing import Union,Literal,List,Optional,Any
 import random
@@ -21,10 +22,13 @@ from filelock import FileLock
 import hmac
 import secrets
 import time
-import requests
 import uvicorn
 from datetime import datetime
 from secrets import compare_digest
+import async_io
+from async_io import read_json,edit_json,http_client
+from json_store import atomic_write_json,read_json as read_json_sync
+from rate_limiter import RateLimiter
 
 
 
@@ -41,7 +45,6 @@ bets_path = "/Users/vikrorkhanin/Ludice/data/bets.json"
 game_paths = "/Users/vikrorkhanin/Ludice/data/game.json"
 stats_path = "/Users/vikrorkhanin/Ludice/data/stats.json"
 users_path = "/Users/vikrorkhanin/Ludice/data/users.json"
-time_sec_path = "/Users/vikrorkhanin/Ludice/data/times_sec.json"
 logs_path = "/Users/vikrorkhanin/Ludice/data/logs.json"
 lobby_path = "/Users/vikrorkhanin/Ludice/data/lobby.json"
 
@@ -60,16 +63,13 @@ async def main():
     return "Ludice API"
 
 
-def write_deafault_bank(username:str) -> bool:
+async def write_deafault_bank(username:str) -> bool:
     try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
-        data.append({
-            "username":username,
-            "balance":0
-        }) 
-        with open(bank_path,"w") as file:
-            json.dump(data,file)
+        async with edit_json(bank_path,[]) as data:
+            data.append({
+                "username":username,
+                "balance":0
+            })
     except Exception as e:
         return False        
 
@@ -80,17 +80,14 @@ def get_ton_url() -> str:
 
 
 
-def write_def_stats(user_id:str) -> bool:
+async def write_def_stats(user_id:str) -> bool:
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
-        data.append({
-            "user_id":user_id,
-            "wins":0,
-            "total_games":0
-        })    
-        with open(stats_path,"w") as file:
-            json.dump(data,file)
+        async with edit_json(stats_path,[]) as data:
+            data.append({
+                "user_id":user_id,
+                "wins":0,
+                "total_games":0
+            })
         return True    
     except Exception as e:
         return False
@@ -132,26 +129,9 @@ def generate_siganture(data:dict) -> str:
     return str(expected_signature)
 
 
-time_lock = threading.Lock()
+rate_limiter = RateLimiter(float(os.getenv("RATE_LIMIT_RATE","1")),float(os.getenv("RATE_LIMIT_BURST","1")))
 def check_time_seciruty(username:str) -> bool:
-    with time_lock:
-        with open(time_sec_path,"r") as file:
-            data = json.load(file)
-        cur_time = time.time()   
-        if username in data:
-            if cur_time - data[username] < 1:
-                return False
-        data[username] = cur_time
-        #clear all old data
-
-        cleaned_data = {}
-
-        for user,user_time in data.items():
-            if cur_time - user_time < 3600:
-                cleaned_data[user] = user_time
-        with open(time_sec_path,"w") as file:
-            json.dump(data,file)
-        return True
+    return rate_limiter.allow(username)
     
 
 def redis_register(username:str,pasw:str) -> bool:
@@ -164,7 +144,7 @@ def redis_register(username:str,pasw:str) -> bool:
 
 
 
-def payment(username:str,amount:int,message:str = "") -> bool:
+async def payment(username:str,amount:int,message:str = "") -> bool:
     #payment url change to real payment url
     url = "http://0.0.0.0:8080/user/pay"
     main_data = {
@@ -186,26 +166,29 @@ def payment(username:str,amount:int,message:str = "") -> bool:
         "Content-Type": "application/json"
     }
     try:
-        resp = requests.post(url,json = main_data,headers=headers)
+        resp = await http_client().post(url,json = main_data,headers=headers)
         return resp.status_code == 200
     except Exception as e:
         print(f"Error : {e}")
         return False
                 
 #------- ЛОГИ -------
-def write_logs(error:str):
+logs_lock = threading.Lock()
+def append_log(error:str):
     try:
-        with open(logs_path,"r") as file:
-            data = json.load(file)
-        data.append({
-            "time":datetime.now(),
-            "error":error,
-            "id":uuid.uuid4()
-        })    
-        with open(logs_path,"w") as file:
-            json.dump(data,file)
+        with logs_lock:
+            data = read_json_sync(logs_path,[])
+            data.append({
+                "time":str(datetime.now()),
+                "error":error,
+                "id":str(uuid.uuid4())
+            })    
+            atomic_write_json(logs_path,data)
     except Exception as e:
         print(f"Error : {e}")
+def write_logs(error:str):
+    # called from request handlers, the file append runs on the io pool
+    async_io.executor.submit(append_log,error)
 
 class Register(BaseModel):
     signature:str
@@ -219,56 +202,44 @@ async def register(request:Register):
         raise HTTPException(status_code=403,detail="Invalid signature")
     else:
         # DEFAULT LOBBY DATA
-        with open(lobby_path,"r") as file:
-            lobs = json.load(file)
-        lobs.append({
-            "username":request.username,
-            "lobbys":[]
-        })
-        with open(lobby_path,"w") as file:
-            json.dump(lobs,file)
+        async with edit_json(lobby_path,[]) as lobs:
+            lobs.append({
+                "username":request.username,
+                "lobbys":[]
+            })
         #DEFAUL DATA
-        write_def_stats(request.username) 
-        write_deafault_bank(request.username)
+        await write_def_stats(request.username) 
+        await write_deafault_bank(request.username)
 
 
 
-def delete_the_same(bet:int,user_id1 : str,user_id2:str,id_that_we_need:str) -> bool:
-    with open(game_paths,"r") as file:
-        data = json.load(file)
-    for game in data:
-        if game["id"] != id_that_we_need and user_id1 in data["players"] and user_id2 in data["players"] and game["bet"] == bet:
-            ind = data.index(game)
-            data.pop(ind)
-            with open(game_paths,"w") as file:
-                json.dump(data,file)
-            return True
+async def delete_the_same(bet:int,user_id1 : str,user_id2:str,id_that_we_need:str) -> bool:
+    async with edit_json(game_paths,[]) as data:
+        for game in data:
+            if game["id"] != id_that_we_need and user_id1 in data["players"] and user_id2 in data["players"] and game["bet"] == bet:
+                ind = data.index(game)
+                data.pop(ind)
+                return True
     return False        
 
 
-def add_win(user_id:str) -> bool:
+async def add_win(user_id:str) -> bool:
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["user_id"] == user_id:
-                user["wins"] += 1
-                with open(stats_path,"w") as file:
-                    json.dump(data,file)
-                return True         
+        async with edit_json(stats_path,[]) as data:
+            for user in data:
+                if user["user_id"] == user_id:
+                    user["wins"] += 1
+                    return True         
         return False
     except Exception as e:
         return False
-def add_game(user_id:str) -> bool:
+async def add_game(user_id:str) -> bool:
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["user_id"] == user_id:
-                user["total_games"] += 1
-                with open(stats_path,"w") as file:
-                    json.dump(data,file)     
-                return True
+        async with edit_json(stats_path,[]) as data:
+            for user in data:
+                if user["user_id"] == user_id:
+                    user["total_games"] += 1
+                    return True
         return False     
     except Exception as e:
         return False  
@@ -292,14 +263,11 @@ async def increase_user_balance(request:IncreaseUserBalance):
         )
     try:
         done = False
-        with open(bank_path,"r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["username"] == request.username:
-                user["balance"] += request.amount
-                with open(bank_path,"w") as file:
-                    json.dump(data,file)
-                done = True
+        async with edit_json(bank_path,[]) as data:
+            for user in data:
+                if user["username"] == request.username:
+                    user["balance"] += request.amount
+                    done = True
         if not done:
             raise HTTPException(status_code=404,detail="User not found")            
 
@@ -317,22 +285,30 @@ async def withdraw(request:IncreaseUserBalance):
             detail="Invalid signature - data tampered"
         )
     try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
-        done = False
-        for user in data:
-            if user["username"] == request.username:
-                try:
+        # the amount is reserved under the bank.json lock, paid out with the
+        # lock released and given back if the payment fails, so no other
+        # request can spend it in between and a slow payout blocks nobody
+        error = None
+        reserved = False
+        async with edit_json(bank_path,[]) as data:
+            for user in data:
+                if user["username"] == request.username:
                     if user["balance"] >= request.amount:
                         user["balance"] -= request.amount
-                        #payment(username:str,amount:int,message:str = "")
-                        payment(request.username,request.amount,"")
-                        with open(bank_path,"w") as file:
-                            json.dump(data,file)
-                    raise HTTPException(status_code=400,detail=f"User balance doesnt have this much money :(")
-                except Exception as e:
-                    write_logs(str(e))
-                    raise HTTPException(status_code=400,detail=f"Error while withdraw : {e}")    
+                        reserved = True
+                    else:
+                        error = "User balance doesnt have this much money :("
+                    break
+        if reserved and not await payment(request.username,request.amount,""):
+            async with edit_json(bank_path,[]) as data:
+                for user in data:
+                    if user["username"] == request.username:
+                        user["balance"] += request.amount
+                        break
+            error = "Payment failed"
+        if error is not None:
+            write_logs(error)
+            raise HTTPException(status_code=400,detail=f"Error while withdraw : {error}")
 
     except Exception as e:
         write_logs(str(e))
@@ -344,8 +320,7 @@ async def get_user_balance(username:str):
     if not check_time_seciruty(username):
         raise HTTPException(status_code=429,detail="Too many requests")
     try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
+        data = await read_json(bank_path)
         for user in data:
             if user["username"] == username:
                 try:
@@ -363,8 +338,7 @@ async def get_user_balance(username:str):
 @app.get("/count_money",dependencies = [Depends(verify_headeer)])
 async def count_all_money():
     try:
-        with open(bank_path,"r") as file:
-            data = json.load(file)
+        data = await read_json(bank_path)
         total = 0
         for user in data:
             try:
@@ -395,33 +369,31 @@ async def start_game(request:Start_Game):
             detail="Invalid signature - data tampered"
         )
     found = False
-    with open(game_paths,"r") as file:
-        data = json.load(file)
     found_id = ""    
-    for game in data:
-        if len(game["players"]) == 1 and game["bet"] == request.bet and request.username not in game["players"]:
-            game["players"].append(request.username)
-            found = True
-            found_id = game["id"]
-            add_game(user_id = request.username)
-    if found:
-        with open(game_paths,"w") as file:
-            json.dump(data,file)
-        return found_id
-    else:
+    opened_id = None
+    async with edit_json(game_paths,[]) as data:
         for game in data:
-            if len(game["players"]) == 0:
-                game["bet"] = request.bet  
+            if len(game["players"]) == 1 and game["bet"] == request.bet and request.username not in game["players"]:
                 game["players"].append(request.username)
-                with open(game_paths,"w") as file:
-                    json.dump(data,file)
-                raise HTTPException(status_code=400,detail=game["id"])
+                found = True
+                found_id = game["id"]
+                await add_game(user_id = request.username)
+        if not found:
+            for game in data:
+                if len(game["players"]) == 0:
+                    game["bet"] = request.bet  
+                    game["players"].append(request.username)
+                    opened_id = game["id"]
+                    break
+    if found:
+        return found_id
+    if opened_id is not None:
+        raise HTTPException(status_code=400,detail=opened_id)
 
-def count_procent_of_wins(user_id:str) -> float:
+async def count_procent_of_wins(user_id:str) -> float:
     try:
         found = False
-        with open(stats_path,"r") as file:
-            data = json.load(file)
+        data = await read_json(stats_path)
         for user in data:
             if user["user_id"] == user_id:
                 found = True
@@ -448,16 +420,13 @@ async def cancel_find(request:Cancel_My_Find):
             status_code=403, 
             detail="Invalid signature - data tampered"
         )
-    with open(game_paths,"r") as file:
-        data = json.load(file)               
     try:
-        for game in data:
-            if game["id"] == request.id and len(game["players"]) == 1 and request.username in game["players"]:
-                ind = data.index(game)
-                data.pop(ind)
-                with open(game_paths,"w") as file:
-                    json.dump(data,file)
-                return True
+        async with edit_json(game_paths,[]) as data:
+            for game in data:
+                if game["id"] == request.id and len(game["players"]) == 1 and request.username in game["players"]:
+                    ind = data.index(game)
+                    data.pop(ind)
+                    return True
         return False             
     except Exception as e:
         write_logs(str(e))
@@ -481,14 +450,11 @@ async def write_winner(request:Win):
             detail="Invalid signature - data tampered"
         )
     try:
-        with open(game_paths,"r") as file:
-            data = json.load(file)
-        for game in data:
-            if game["id"] == request.id and len(game["players"]) == 2 and request.username in game["players"]:
-                if game["winner"] == "":
-                    game["winner"] = request.username
-                    with open(game_paths,"w") as file:
-                        json.dump(data,file)
+        async with edit_json(game_paths,[]) as data:
+            for game in data:
+                if game["id"] == request.id and len(game["players"]) == 2 and request.username in game["players"]:
+                    if game["winner"] == "":
+                        game["winner"] = request.username
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Error {e}")   
@@ -509,17 +475,14 @@ async def leave(request:Leave):
             detail="Invalid signature - data tampered"
         )
     try:
-        with open(game_paths,"r") as file:
-            data = json.load(file)
-        for game in data:
-            if game["id"] == request.id:
-                if len(game["players"]) == 2 and request.user_id in game["players"]:
-                    game["players"] = []
-                    game["bet"] = 0
-                    game["winner"] = ""
-                    with open(game_paths,"w") as file:
-                        json.dump(data,file)
-                    return True
+        async with edit_json(game_paths,[]) as data:
+            for game in data:
+                if game["id"] == request.id:
+                    if len(game["players"]) == 2 and request.user_id in game["players"]:
+                        game["players"] = []
+                        game["bet"] = 0
+                        game["winner"] = ""
+                        return True
         raise HTTPException(status_code=400,detail="Error lobby not found :(")        
     except Exception as e:
         write_logs(str(e))
@@ -539,7 +502,7 @@ async def count_of_wins(request:Procent_Of_Wins):
             status_code=403, 
             detail="Invalid signature - data tampered"
         )
-    result = count_of_wins(request.user_id)
+    result = await count_procent_of_wins(request.user_id)
     try:
         return result
     except Exception as e:
@@ -548,8 +511,7 @@ async def count_of_wins(request:Procent_Of_Wins):
 @app.get("/get/leader/board/most_games",dependencies = [Depends(verify_headeer)])
 async def get_leader_board_games():
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
+        data = await read_json(stats_path)
         result = {}
         for user in data:
             result[user["user_id"]] = user["total_games"]   
@@ -560,11 +522,10 @@ async def get_leader_board_games():
 @app.get("/get/procent/wins",dependencies = [Depends(verify_headeer)])
 async def get_leader_board():
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
+        data = await read_json(stats_path)
         result = {}
         for user in data:
-            pr = count_of_wins(user["user_id"])
+            pr = await count_procent_of_wins(user["user_id"])
             result[user["user_id"]] = pr
         return result        
     except Exception as e:
@@ -574,8 +535,7 @@ async def get_leader_board():
 async def get_me(user_id:str):
     if not check_time_seciruty(user_id):
         raise HTTPException(status_code=429,detail="Too many requests")
-    with open(bank_path,"r") as file:
-        data = json.load(file)
+    data = await read_json(bank_path)
     balance = None    
     for user in data:
         if user["username"] == user_id:
@@ -583,11 +543,10 @@ async def get_me(user_id:str):
 
 
     try:
-        with open(stats_path,"r") as file:
-            data = json.load(file)
+        data = await read_json(stats_path)
         for user in data:
             if user["user_id"] == user_id:
-                wins_pocent = count_of_wins(user_id)
+                wins_pocent = await count_procent_of_wins(user_id)
                 return {
                     "Total games":user["total_games"],
                     "Wins":user["wins"],
@@ -599,9 +558,8 @@ async def get_me(user_id:str):
         raise HTTPException(status_code=400,detail=f"Error : {e}")        
 
 
-def is_user_playing(user_id:str) -> bool:
-    with open(game_paths,"r") as file:
-        data = json.load(file)
+async def is_user_playing(user_id:str) -> bool:
+    data = await read_json(game_paths)
     for game in data:
         if user_id in game["players"]:
             return True
@@ -614,7 +572,7 @@ async def is_playing(user_id:str) -> bool:
     if not check_time_seciruty(user_id):
         raise HTTPException(status_code=429,detail="Too many requests")
     try:
-       return is_user_playing(user_id)
+       return await is_user_playing(user_id)
     except Exception as e:
         write_logs(str(e))
         raise HTTPException(status_code=400,detail=f"Error {e}")
@@ -634,15 +592,12 @@ async def write_res(request:WriteRes):
             detail="Invalid signature - data tampered"
         )
     try:
-        with open(game_paths,"r") as file:
-            data = json.load(file)
-        for game in data:
-            if game["id"] == request.game_id:
-                if len(game["players"]) == 2 and request.user_id in game["players"]:
-                    game[f"result_{request.user_id}"] = request.result
-                    with open(game_paths,"w") as file:
-                        json.dump(data,file)
-                    return True
+        async with edit_json(game_paths,[]) as data:
+            for game in data:
+                if game["id"] == request.game_id:
+                    if len(game["players"]) == 2 and request.user_id in game["players"]:
+                        game[f"result_{request.user_id}"] = request.result
+                        return True
         return False         
     except Exception as e:
         write_logs(str(e))
@@ -656,24 +611,21 @@ async def join_by_the_link(user_id:str,bet:int,game_id:str):
     if not check_time_seciruty(user_id):
         raise HTTPException(status_code=429,detail="Too many requests")
     try:
-        with open(game_paths,"r") as file:
-            data = json.load(file)
         done = False
-        for game in data:
-            if game["id"] == game_id:
-                try:
-                    if len(game["players"] == 1 and user_id not in game["players"]) and game["bet"] == bet:
-                        game["players"].append(user_id)
-                        done = True
-                        with open(game_paths,"w") as file:
-                            json.dump(data,file)
-                        return True
-                    else:
-                        raise HTTPException(status_code=400,detail="Lobby is full")
-                     
-                except Exception as e:
-                    write_logs(str(e))
-                    raise HTTPException(status_code=400,detail=f"Error : {e}")        
+        async with edit_json(game_paths,[]) as data:
+            for game in data:
+                if game["id"] == game_id:
+                    try:
+                        if len(game["players"] == 1 and user_id not in game["players"]) and game["bet"] == bet:
+                            game["players"].append(user_id)
+                            done = True
+                            return True
+                        else:
+                            raise HTTPException(status_code=400,detail="Lobby is full")
+                         
+                    except Exception as e:
+                        write_logs(str(e))
+                        raise HTTPException(status_code=400,detail=f"Error : {e}")        
 
     except Exception as e:
         raise HTTPException(status_code=400,detail=f"Error while joining : {e}")
@@ -686,8 +638,7 @@ async def get_logs(request:GetLogs):
     if not verify_signature(request.model_dump(),request.siganture):
         raise HTTPException(status_code = 429,detail = "Invalid siganture")
     else:
-        with open(logs_path,"r") as file:
-            data = json.load(file)
+        data = await read_json(logs_path)
         try:
             return data
         except Exception as e:
@@ -704,8 +655,7 @@ async def get_log_by_date(request:GetLogsByDate):
     if not verify_signature(request.model_dump(),request.signature):
         raise HTTPException(status_code=429,detail = "Invalid signature")
     else:
-        with open(logs_path,"r") as file:
-            data = json.load(file)
+        data = await read_json(logs_path)
         result = []    
         for log in data:
             tm = str(log["time"]).split()[0]
@@ -729,7 +679,7 @@ class TelegrammPayment(PaymentInter):
     def __init__(self,bot_token):
         self.token = bot_token
         self.url = f"https://api.telegram.org/bot{bot_token}"    
-    def create_payment(self,chat_id:str,description:str,amount:int,title:str):
+    async def create_payment(self,chat_id:str,description:str,amount:int,title:str):
         payload = {
             "chat_id": chat_id,
             "title": title,
@@ -739,12 +689,12 @@ class TelegrammPayment(PaymentInter):
             "currency": "XTR",  
             "prices": [{"label": "Stars", "amount": amount}] 
         }
-        response = requests.post(f"{self.url}/sendInvoice", json=payload)
+        response = await http_client().post(f"{self.url}/sendInvoice", json=payload)
         return response.json()
-    def get_user_balance(self,user_id:str):
+    async def get_user_balance(self,user_id:str):
         try:
             payload = {"user_id": user_id}
-            response = requests.post(f"{self.base_url}/getUserStars", json=payload)
+            response = await http_client().post(f"{self.url}/getUserStars", json=payload)
             return response.json()
         except Exception as e:
             return f"Exception {e}"
@@ -767,7 +717,7 @@ async def get_user_balance(request:Get_User_Balance):
             detail="Invalid signature - data tampered"
         )    
     try:
-        return UserPayment.get_user_balance(user_id=request.user_id)
+        return await UserPayment.get_user_balance(user_id=request.user_id)
     except Exception as e:
         raise HTTPException(status_code=400,detail=f"Payment Error: {e}")
 class Payment(BaseModel):
@@ -788,7 +738,7 @@ async def user_pay(request:Payment):
             detail="Invalid signature - data tampered"
         )   
     try:
-        UserPayment.create_payment(
+        await UserPayment.create_payment(
             chat_id = request.user_id,
             description = request.description,
             amount = request.amount,
@@ -798,9 +748,8 @@ async def user_pay(request:Payment):
     except Exception as e:
         raise HTTPException(status_code=400,detail=f"Error : {e}")
 
-def is_game2_already_played_by_user(username:str) -> bool:
-    with open("data_second_game.json","r") as file:
-        data = json.load(file)
+async def is_game2_already_played_by_user(username:str) -> bool:
+    data = await read_json("data_second_game.json")
     for user in data:
         if user["username"] == username:
             return True
@@ -828,19 +777,19 @@ async def start_new_game(request:Start_Second_Game):
     if not verify_signature(request.model_dump(),request.signature):
         raise HTTPException(status_code=403,detail="Invalid signature")
     try:
-        with open("data_second_game.json","r") as file:
-            data = json.load(file)
         id = str(uuid.uuid4())    
-        if not is_game2_already_played_by_user(request.username):
-            data.append({
-                "username":request.username,
-                "bet":request.bet,
-                "win":False,
-                "num":request.num,
-                "id":id
-            })
-            with open("data_second_game.json","w") as file:
-                json.dump(data,file)
+        async with edit_json("data_second_game.json",[]) as data:
+            # checked on the locked copy, so two requests can not both start a game
+            playing = any(user["username"] == request.username for user in data)
+            if not playing:
+                data.append({
+                    "username":request.username,
+                    "bet":request.bet,
+                    "win":False,
+                    "num":request.num,
+                    "id":id
+                })
+        if not playing:
             return id
         else:
             raise HTTPException(status_code=400,detail="User is already playing")    
@@ -861,15 +810,12 @@ async def delete_game(request:Delete_Game):
         raise HTTPException(status_code=403,detail="Invalid signature")
     else:
         try:
-            with open("data_second_game.json","r") as file:
-                data = json.load(file)
-            for game in data:
-                if game["username"] == request.usernmae and game["id"] == request.id:
-                    index = data.index(game)
-                    data.pop(index)
-                    with open("data_second_game.json","w") as file:
-                        json.dump(data,file)
-                    return True
+            async with edit_json("data_second_game.json",[]) as data:
+                for game in data:
+                    if game["username"] == request.usernmae and game["id"] == request.id:
+                        index = data.index(game)
+                        data.pop(index)
+                        return True
             raise HTTPException(status_code=404,detail="Game not found")            
         except Exception as e:
             raise HTTPException(status_code=400,detail=f"Error : {e}")  
@@ -886,8 +832,7 @@ async def get_user_num(request:GetUserGuess):
         raise HTTPException(status_code=403,detail="Invalid signature")
     else:
         try:
-            with open("data_second_game.json","r") as file:
-                data = json.load(file)
+            data = await read_json("data_second_game.json")
             if request.id:
                 for game in data:
                     if game["id"] == request.id:
@@ -912,28 +857,24 @@ async def start_drotic_game(request:StartnewGame):
     if not verify_signature(request.model_dump(),request.signature):
         raise HTTPException(status_code = 403,detail = "Invalid signature") 
     else:
-        with open("drotic.json","r") as file:
-            data = json.load(file)
         found = False    
-        for game in data:
-            if game["bet"] == request.bet and len(game["players"]) == 1 and request.username not in game["players"]:
-                game["players"].append(request.usernmae)
-                id = game["id"]
-                with open("drotic.json","w") as file:
-                    json.dump(data,file)
-                found = True    
-                return id
-        if not found:
-            with open("drotic.json","r") as file:
-                data = json.load(file)
+        opened_id = None
+        async with edit_json("drotic.json",[]) as data:
             for game in data:
-                if game["bet"] == request.bet and len(game["players"]) == 0:
-                    game["players"].append(request.username)
-                    game["bet"] = request.bet
+                if game["bet"] == request.bet and len(game["players"]) == 1 and request.username not in game["players"]:
+                    game["players"].append(request.usernmae)
                     id = game["id"]
-                    with open("drotic.json","w") as file:
-                        json.dump(data,file)
-                    raise HTTPException(status_code = 400,detail = f"Lobby not found : {id}")            
+                    found = True    
+                    return id
+            if not found:
+                for game in data:
+                    if game["bet"] == request.bet and len(game["players"]) == 0:
+                        game["players"].append(request.username)
+                        game["bet"] = request.bet
+                        opened_id = game["id"]
+                        break
+        if opened_id is not None:
+            raise HTTPException(status_code = 400,detail = f"Lobby not found : {opened_id}")            
                        
 class DeleteGame(BaseModel):
     id:str
@@ -945,15 +886,12 @@ async def delete_drotic_game(request:DeleteGame):
         raise HTTPException(status_code = 403,detail = "Invalid Signature")
     else:
         try:
-            with open("drotic.json","r") as file:
-                data = json.load(file)
-            for game in data:
-                if data["id"] == request.id:
-                    ind = data.index(game)    
-                    data.pop(ind)
-                    with open("drotic.json","w") as file:
-                        json.dump(data,file)
-                    return True
+            async with edit_json("drotic.json",[]) as data:
+                for game in data:
+                    if data["id"] == request.id:
+                        ind = data.index(game)    
+                        data.pop(ind)
+                        return True
             raise HTTPException(status_code = 404,detail = "User not found")        
         except Exception as e:
             raise HTTPException(status_code = 400,detail = f"Error : {e}")           
@@ -971,17 +909,14 @@ async def write_one_try(request:WriteOneTry):
         raise HTTPException(status_code = 403,detail = "Invalid signature")
     else:
         try:
-            with open("drotic.json","r") as file:
-                data = json.load(file)
-            for game in data:
-                if game["id"] == request.id:
-                    game["cache"].append({
-                        "username":request.username,
-                        "result":request.result
-                    })
-                    with open("drotic.json","w") as file:
-                        json.dump(data,file)
-                    return True
+            async with edit_json("drotic.json",[]) as data:
+                for game in data:
+                    if game["id"] == request.id:
+                        game["cache"].append({
+                            "username":request.username,
+                            "result":request.result
+                        })
+                        return True
             raise HTTPException(status_code = 404,detail = "User not found")        
         except Exception as e:
             raise HTTPException(status_code = 400,deatail = f"Error : {e}") 
@@ -996,8 +931,7 @@ async def get_last_throw(request:Get_Last_Throw):
     if not verify_signature(request.model_dump(),request.signature):
         raise HTTPException(status_code=403,detail="Invalid signature")
     try:
-        with open("drotic.json","r") as file:
-            data = json.load(file)
+        data = await read_json("drotic.json")
         for game in data:
             if game["id"] == request.id:
                 if len(game["players"]) == 2 and len(game["cache"]) != 0:
@@ -1024,32 +958,23 @@ async def delete_user(request:DeleteUser):
         raise HTTPException(status_code=403,detail="Invalid signature")
     found = False
     try:
-        with open("users.json","r") as file:
-            data = json.load(file)
-        if request.username in data:
-            del data[request.username]
-            with open("users.json","w") as file:
-                json.dump(data,file)
-            found = True    
-
-        with open("stats.json","r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["user_id"] == request.username:
-                ind = data.index(user)
-                data.pop(ind)
-                found = True
-                with open("stats.json","w") as file:
-                    json.dump(data,file)
-        with open("bank.json","r") as file:
-            data = json.load(file)
-        for user in data:
-            if user["username"] == request.username:
-                ind = data.index(user)
-                data.pop(ind)
-                found = True
-                with open("stats.json","w") as file:
-                    json.dump(data,file)
+        async with edit_json("users.json",{}) as data:
+            if request.username in data:
+                del data[request.username]
+                found = True    
+
+        async with edit_json("stats.json",[]) as data:
+            for user in data:
+                if user["user_id"] == request.username:
+                    ind = data.index(user)
+                    data.pop(ind)
+                    found = True
+        async with edit_json("bank.json",[]) as data:
+            for user in data:
+                if user["username"] == request.username:
+                    ind = data.index(user)
+                    data.pop(ind)
+                    found = True
         if found:
             return True
         raise HTTPException(status_code=404,detail="Error user not found")
@@ -1065,8 +990,7 @@ async def get_all_games(request:GetAllGames):
         raise HTTPException(status_code=403,detail="Invalid signature")
     games = []
     try:
-        with open("game.json","r") as file:
-            data = json.load(file)
+        data = await read_json("game.json")
         for game in data:
             if request.username in game["players"]:
                 games.append({
@@ -1075,8 +999,7 @@ async def get_all_games(request:GetAllGames):
                 })
             break
 
-        with open("data_second_game.json","r") as file:
-            second_ = json.load(file)
+        second_ = await read_json("data_second_game.json")
         for game in second_:
             if game["username"] == request.username:
                 game.append({
@@ -1085,8 +1008,7 @@ async def get_all_games(request:GetAllGames):
                 })
                 break
 
-        with open("drotic.json","r") as file:
-            drotic = json.load(file)
+        drotic = await read_json("drotic.json")
 
         for game in drotic:
             if request.username in game["players"]:
@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Per-user token buckets kept in memory.
+
+    Each user gets `burst` tokens refilled at `rate` tokens per second and
+    every request takes one. Buckets that have refilled completely carry
+    no state, so they are dropped every `sweep_interval` seconds.
+    """
+    def __init__(self,rate:float = 1.0,burst:float = 1.0,sweep_interval:float = 60.0):
+        self.rate = rate
+        self.burst = burst
+        self.sweep_interval = sweep_interval
+        self.lock = threading.Lock()
+        self._buckets = {}
+        self._swept = 0.0
+
+    def _sweep(self,now:float):
+        rate,burst = self.rate,self.burst
+        self._buckets = {key:bucket for key,bucket in self._buckets.items() if bucket[0] + (now - bucket[1]) * rate < burst}
+        self._swept = now
+
+    def allow(self,key:str,now:Optional[float] = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            if now - self._swept >= self.sweep_interval:
+                self._sweep(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.burst
+            else:
+                tokens = min(self.burst,bucket[0] + (now - bucket[1]) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = [tokens,now]
+            return allowed
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# refill, take a token and store the bucket in one round trip; the clock is
+# Redis' own so every worker agrees on it
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = burst
+    ts = now
+end
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return allowed
+"""
+
+
+class RedisRateLimiter:
+    """The same token bucket shared by every worker, as a Redis hash per user.
+
+    Falls back to a local RateLimiter while Redis is unreachable.
+    """
+    def __init__(self,client,rate:float = 1.0,burst:float = 1.0,prefix:str = "rate:",fallback:Optional[RateLimiter] = None):
+        self.client = client
+        self.rate = rate
+        self.burst = burst
+        self.prefix = prefix
+        self.fallback = fallback if fallback is not None else RateLimiter(rate,burst)
+        self._script = client.register_script(TOKEN_BUCKET_LUA)
+
+    def allow(self,key:str,now:Optional[float] = None) -> bool:
+        try:
+            return bool(self._script(keys = [self.prefix + key],args = [self.rate,self.burst]))
+        except Exception as e:
+            print(f"Redis rate limiter error : {e}")
+            return self.fallback.allow(key,now)
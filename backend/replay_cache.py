@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def _digest(signature:str):
+    # a hex HMAC-SHA256 signature takes 32 bytes as bytes instead of 64 as str
+    try:
+        return bytes.fromhex(signature)
+    except (TypeError,ValueError):
+        return signature
+
+
+class ReplayCache:
+    """Signatures accepted in the last `ttl` seconds, kept in memory.
+
+    Every entry lives exactly `ttl` seconds, so insertion order is also
+    expiry order and expired entries are popped from the front in O(1).
+    Past `max_entries` the oldest entries are dropped first to bound memory.
+    """
+    def __init__(self,ttl:float = 300.0,max_entries:int = 1_000_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._seen = OrderedDict()
+
+    def _expire(self,now:float):
+        seen = self._seen
+        while seen:
+            key = next(iter(seen))
+            if seen[key] > now:
+                break
+            del seen[key]
+
+    def seen(self,signature:str,now:Optional[float] = None) -> bool:
+        # True if the signature was already used, otherwise remembers it
+        if now is None:
+            now = time.monotonic()
+        key = _digest(signature)
+        with self.lock:
+            self._expire(now)
+            if key in self._seen:
+                return True
+            if len(self._seen) >= self.max_entries:
+                self._seen.popitem(last = False)
+            self._seen[key] = now + self.ttl
+            return False
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class RedisReplayCache:
+    """The same check shared by every worker through Redis SET NX EX.
+
+    Falls back to a local ReplayCache while Redis is unreachable.
+    """
+    def __init__(self,client,ttl:float = 300.0,prefix:str = "replay:",fallback:Optional[ReplayCache] = None):
+        self.client = client
+        self.ttl = int(ttl) + 1
+        self.prefix = prefix
+        self.fallback = fallback if fallback is not None else ReplayCache(ttl)
+
+    def seen(self,signature:str,now:Optional[float] = None) -> bool:
+        try:
+            return not self.client.set(self.prefix + signature,1,nx = True,ex = self.ttl)
+        except Exception as e:
+            print(f"Redis replay cache error : {e}")
+            return self.fallback.seen(signature,now)
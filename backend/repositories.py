@@ -0,0 +1,185 @@
+import os
+import sys
+from typing import Iterable,Iterator,List,Optional,Protocol,Tuple
+import json_store
+from async_io import read_json,edit_json
+
+# What new.py needs from each store. Every entity is served by one backend
+# picked with STORAGE_<ENTITY>, else STORAGE, else json:
+#   accounts  json (AccountStore)         sql  sqlite
+#   stats     json (JsonStats)            sql  sqlite
+#   lobbies   json (LobbyTable)   redis   sql  sqlite
+#   terms     json (JsonTerms)            sql  sqlite
+#   payments  json (JsonPayments)         sql  sqlite
+#   logs      json (LogSink)                   sqlite
+# sql runs on the engine of sql_database/config.py: Postgres by default,
+# SQLite with DB_URL=sqlite:///path (lobbies need Postgres arrays).
+# sqlite is sqlite_store.py, one embedded WAL file for a single node.
+
+ENTITIES = ("accounts","stats","lobbies","terms","payments","logs")
+BACKENDS = {
+    "accounts":("json","sql","sqlite"),
+    "stats":("json","sql","sqlite"),
+    "lobbies":("json","redis","sql","sqlite"),
+    "terms":("json","sql","sqlite"),
+    "payments":("json","sql","sqlite"),
+    "logs":("json","sqlite"),
+}
+
+
+def backend(entity:str) -> str:
+    # STORAGE=sql moves every entity that has a sql backend, the rest stay on json
+    name = os.getenv(f"STORAGE_{entity.upper()}")
+    if name is None:
+        name = os.getenv("STORAGE","json")
+        return name if name in BACKENDS[entity] else "json"
+    if name not in BACKENDS[entity]:
+        raise ValueError(f"No {name} backend for {entity}, use one of {', '.join(BACKENDS[entity])}")
+    return name
+
+
+def load_sql():
+    # imported on demand so the JSON backends run without SQLAlchemy
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),"sql_database"))
+    import sql_repositories
+    return sql_repositories
+
+
+class Accounts(Protocol):
+    """Balances (bank.json). Blocking, new.py calls it through run_blocking."""
+    def exists(self,username:str) -> bool: ...
+    def get(self,username:str) -> Optional[int]: ...
+    def total(self) -> int: ...
+    def set_default(self,username:str,amount:int = 100) -> bool: ...
+    def increase(self,username:str,amount:int) -> int: ...
+    def decrease(self,username:str,amount:int) -> bool: ...
+    def reset(self,username:str) -> int: ...
+    def delete(self,username:str) -> bool: ...
+    def start(self): ...
+    def close(self): ...
+
+
+class Stats(Protocol):
+    """Wins and games per user (stats.json); `rows` feeds the leaderboard on startup."""
+    async def create(self,user_id:str) -> bool: ...
+    async def add_win(self,user_id:str) -> bool: ...
+    async def add_game(self,user_id:str) -> bool: ...
+    async def get(self,user_id:str) -> Optional[dict]: ...
+    async def delete(self,user_id:str) -> bool: ...
+    def rows(self) -> Iterable[Tuple[str,int,int]]: ...
+
+
+class Lobbies(Protocol):
+    """Two player lobbies, see lobby_store.LobbyTable. Blocking, new.py calls it through run_blocking."""
+    def get(self,id_:str) -> Optional[dict]: ...
+    def values(self) -> list: ...
+    def match(self,username:str,bet:int) -> Optional[str]: ...
+    def open(self,username:str,bet:int) -> str: ...
+    def match_or_open(self,username:str,bet:int) -> Tuple[str,bool]: ...
+    def join(self,id_:str,username:str,bet:int) -> bool: ...
+    def cancel(self,id_:str,username:str) -> bool: ...
+    def reset(self,id_:str,username:str) -> bool: ...
+    def recycle(self,id_:str) -> bool: ...
+    def set_winner(self,id_:str,username:str) -> bool: ...
+    def set_result(self,id_:str,username:str,result:int) -> bool: ...
+    def player_lobby(self,username:str) -> Optional[dict]: ...
+    def is_playing(self,username:str) -> bool: ...
+    def start(self): ...
+    def close(self): ...
+
+
+class Terms(Protocol):
+    """Accepted terms (sogl.json); None when the user never answered."""
+    async def set(self,username:str,state:bool): ...
+    async def get(self,username:str) -> Optional[bool]: ...
+
+
+class Payments(Protocol):
+    """The first deposit every user gets once (first_vznos.json)."""
+    async def claim_first(self,username:str) -> bool: ...
+    async def has_first(self,username:str) -> bool: ...
+
+
+class Logs(Protocol):
+    """Server error log, see log_sink.LogSink."""
+    def write(self,error:str,**fields) -> bool: ...
+    def read(self,cursor:Optional[str] = None,limit:int = 100) -> Tuple[List[dict],Optional[str]]: ...
+    def records(self,date:Optional[str] = None) -> Iterator[dict]: ...
+    def start(self): ...
+    def close(self): ...
+
+
+class JsonStats:
+    """stats.json, a list of {"user_id","wins","total_games"}."""
+    def __init__(self,path:str):
+        self.path = path
+
+    async def create(self,user_id:str) -> bool:
+        async with edit_json(self.path,[]) as data:
+            data.append({
+                "user_id":user_id,
+                "wins":0,
+                "total_games":0
+            })
+        return True
+
+    async def _increment(self,user_id:str,key:str) -> bool:
+        async with edit_json(self.path,[]) as data:
+            for user in data:
+                if user["user_id"] == user_id:
+                    user[key] += 1
+                    return True
+        return False
+
+    async def add_win(self,user_id:str) -> bool:
+        return await self._increment(user_id,"wins")
+
+    async def add_game(self,user_id:str) -> bool:
+        return await self._increment(user_id,"total_games")
+
+    async def get(self,user_id:str) -> Optional[dict]:
+        for user in await read_json(self.path,[]):
+            if user["user_id"] == user_id:
+                return user
+        return None
+
+    async def delete(self,user_id:str) -> bool:
+        async with edit_json(self.path,[]) as data:
+            for user in data:
+                if user["user_id"] == user_id:
+                    data.remove(user)
+                    return True
+        return False
+
+    def rows(self) -> Iterable[Tuple[str,int,int]]:
+        return [(user["user_id"],user["wins"],user["total_games"]) for user in json_store.read_json(self.path,[])]
+
+
+class JsonTerms:
+    """sogl.json, {username: accepted}."""
+    def __init__(self,path:str):
+        self.path = path
+
+    async def set(self,username:str,state:bool):
+        async with edit_json(self.path,{}) as data:
+            data[username] = state
+
+    async def get(self,username:str) -> Optional[bool]:
+        return (await read_json(self.path,{})).get(username)
+
+
+class JsonPayments:
+    """first_vznos.json, {username: amount} of the first deposit."""
+    def __init__(self,path:str,amount:int = 100):
+        self.path = path
+        self.amount = amount
+
+    async def claim_first(self,username:str) -> bool:
+        async with edit_json(self.path,{}) as data:
+            if data.get(username):
+                return False
+            data[username] = self.amount
+            return True
+
+    async def has_first(self,username:str) -> bool:
+        return bool((await read_json(self.path,{})).get(username))
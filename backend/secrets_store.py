@@ -0,0 +1,77 @@
+import json
+import os
+import signal
+import threading
+import time
+from typing import Callable,Optional
+
+# Shared by the API and the bot: backend/secrets_store.py and
+# frontend/common/secrets_store.py must stay identical.
+
+
+class SecretsFile:
+    """secrets.json kept in memory and reloaded only when it changes.
+
+    Readers get the cached dict. At most once per `check_interval` seconds
+    the file is stat()ed and reparsed if its inode, mtime or size changed,
+    so a rotated key is picked up without a restart. SIGHUP forces a
+    reload on the next read. `on_reload` is called with the new data.
+    """
+    def __init__(self,path:str,check_interval:float = 1.0,on_reload:Optional[Callable[[dict],None]] = None):
+        self.path = path
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self.lock = threading.Lock()
+        self._data = None
+        self._stamp = None
+        self._checked = 0.0
+        self._stale = False
+
+    def _stat(self) -> tuple:
+        st = os.stat(self.path)
+        return (st.st_ino,st.st_mtime_ns,st.st_size)
+
+    def reload(self) -> dict:
+        with self.lock:
+            stamp = self._stat()
+            with open(self.path,"r") as file:
+                data = json.load(file)
+            self._data = data
+            self._stamp = stamp
+            self._checked = time.monotonic()
+            self._stale = False
+        if self.on_reload is not None:
+            self.on_reload(data)
+        return data
+
+    def invalidate(self):
+        # only sets a flag, safe to call from a signal handler
+        self._stale = True
+
+    def data(self) -> dict:
+        if self._data is None:
+            return self.reload()
+        now = time.monotonic()
+        if not self._stale and now - self._checked < self.check_interval:
+            return self._data
+        self._checked = now
+        try:
+            if self._stale or self._stat() != self._stamp:
+                return self.reload()
+        except (OSError,ValueError) as e:
+            # a half written or missing file keeps the last good keys
+            print(f"Error while reloading secrets : {e}")
+        return self._data
+
+    def get(self,key:str) -> str:
+        return self.data()[key]
+
+    def install_sighup(self) -> bool:
+        if not hasattr(signal,"SIGHUP"):
+            return False
+        try:
+            signal.signal(signal.SIGHUP,lambda signum,frame:self.invalidate())
+        except ValueError:
+            # not the main thread
+            return False
+        return True
@@ -0,0 +1,227 @@
+from sqlalchemy import select,func
+from sql_i import async_engine
+from models import metadata_obj,table
+from core import game_changes,balance_update,counter_update,profile_select,profile,win_procent,record_games_stmt,outcome_params,finish_statements,track_outcomes,track_counters
+import core
+from typing import AsyncIterator,List,Optional
+
+# awaitable versions of core.py for async handlers, database waits park the
+# coroutine instead of the event loop
+
+
+async def create_table():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(metadata_obj.create_all)
+
+async def check_user_dowm_payment(username:str) -> bool:
+    async with async_engine.connect() as conn:
+        try:
+            stmt = select(table.c.down_payment).where(table.c.username == username)
+            data = (await conn.execute(stmt)).fetchone()
+            if data is not None:
+                return bool(data[0])
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+
+async def is_users_exists(username:str) -> bool:
+    async with async_engine.connect() as conn:
+        stmt = select(table.c.username).where(table.c.username == username)
+        return (await conn.execute(stmt)).fetchone() is not None
+
+async def register(username:str) -> bool:
+    if await is_users_exists(username):
+        raise KeyError("User already exists")
+    async with async_engine.connect() as conn:
+        try:
+            stmt = table.insert().values(
+                username = username,
+                balance = 100,
+                wins = 0,
+                loses = 0,
+                games_count = 0,
+                sogl = False,
+                down_payment = True
+            )
+            await conn.execute(stmt)
+            await conn.commit()
+            return True
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def write_soglasion(username:str,res:bool):
+    async with async_engine.connect() as conn:
+        try:
+            update_stmt = table.update().where(table.c.username == username).values(sogl = res)
+            found = (await conn.execute(update_stmt)).rowcount > 0
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    if not found:
+        raise KeyError("User not found")
+async def check_sogl(username:str) -> bool:
+    async with async_engine.connect() as conn:
+        try:
+            stmt = select(table.c.sogl).where(table.c.username == username)
+            data = (await conn.execute(stmt)).fetchone()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    if data is None:
+        raise KeyError("User not found")
+    return data[0]
+
+
+async def _change_balance(conn,username:str,delta:int) -> Optional[int]:
+    row = (await conn.execute(balance_update(username,delta))).fetchone()
+    return None if row is None else row[0]
+async def decrease_user_balance(username:str,amount:int) -> bool:
+    async with async_engine.connect() as conn:
+        try:
+            balance = await _change_balance(conn,username,-amount)
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    if balance is None:
+        if not await is_users_exists(username):
+            raise KeyError("User not found")
+        return False
+    return True
+async def increase_user_balance(username:str,amount:int) -> bool:
+    async with async_engine.connect() as conn:
+        try:
+            balance = await _change_balance(conn,username,amount)
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    if balance is None:
+        raise KeyError("User not found")
+    return True
+async def settle_balances(changes:dict) -> Optional[dict]:
+    """See core.settle_balances."""
+    async with async_engine.connect() as conn:
+        try:
+            balances = await _settle(conn,changes)
+            if balances is None:
+                await conn.rollback()
+                return None
+            await conn.commit()
+            return balances
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def _settle(conn,changes:dict) -> Optional[dict]:
+    balances = {}
+    for username in sorted(changes):
+        balance = await _change_balance(conn,username,changes[username])
+        if balance is None:
+            return None
+        balances[username] = balance
+    return balances
+async def settle_game(winner:str,loser:str,bet:int) -> Optional[dict]:
+    return await settle_balances(game_changes(winner,loser,bet))
+async def finish_game(game_id:str,winner:str,loser:str,bet:int,results:dict) -> Optional[dict]:
+    """See core.finish_game."""
+    changes = game_changes(winner,loser,bet)
+    outcomes = [(winner,True),(loser,False)]
+    async with async_engine.connect() as conn:
+        try:
+            balances = await _settle(conn,changes)
+            if balances is None:
+                await conn.rollback()
+                return None
+            for stmt,params in finish_statements(game_id,winner,bet,results,outcomes):
+                await conn.execute(stmt,params)
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    track_outcomes(outcomes)
+    return balances
+async def get_user_balance(username:str) -> int:
+    async with async_engine.connect() as conn:
+        try:
+            stmt = select(table.c.balance).where(table.c.username == username)
+            data = (await conn.execute(stmt)).fetchone()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    if data is None:
+        raise KeyError("User not found")
+    return int(data[0])
+async def count_all_user_money() -> int:
+    async with async_engine.connect() as conn:
+        try:
+            stmt = select(func.coalesce(func.sum(table.c.balance),0))
+            return int((await conn.execute(stmt)).scalar())
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+
+
+async def _increment(username:str,**counters) -> bool:
+    async with async_engine.connect() as conn:
+        try:
+            found = (await conn.execute(counter_update(username,**counters))).rowcount > 0
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    if not found:
+        return False
+    track_counters(username,counters)
+    return True
+async def plus_one_win(username:str) -> bool:
+    return await _increment(username,wins = 1)
+async def plus_one_game(username:str) -> bool:
+    return await _increment(username,games_count = 1)
+async def plus_one_lose(username:str) -> bool:
+    return await _increment(username,loses = 1)
+async def record_game(username:str,won:bool) -> bool:
+    if won:
+        return await _increment(username,wins = 1,games_count = 1)
+    return await _increment(username,loses = 1,games_count = 1)
+async def record_games(outcomes:List[tuple]) -> None:
+    if not outcomes:
+        return
+    async with async_engine.connect() as conn:
+        try:
+            await conn.execute(record_games_stmt,outcome_params(outcomes))
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    track_outcomes(outcomes)
+
+
+async def count_procent_of_wins(username:str) -> float:
+    async with async_engine.connect() as conn:
+        try:
+            stmt = select(table.c.wins,table.c.games_count).where(table.c.username == username)
+            row = (await conn.execute(stmt)).fetchone()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    if row is None:
+        return 0
+    return win_procent(row.wins,row.games_count)
+async def get_leader_borad_games(limit:Optional[int] = None) -> dict:
+    if core.leaderboard is not None:
+        return dict(core.leaderboard.top("games",limit))
+    async with async_engine.connect() as conn:
+        try:
+            stmt = select(table.c.username,table.c.games_count).order_by(table.c.games_count.desc()).limit(limit)
+            return {row.username:row.games_count for row in await conn.execute(stmt)}
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def iter_all_data(batch_size:int = 1000) -> AsyncIterator:
+    # server side cursor, rows arrive batch_size at a time
+    async with async_engine.connect() as conn:
+        result = await conn.stream(select(table).execution_options(yield_per = batch_size))
+        async for row in result:
+            yield row
+async def get_all_data():
+    async with async_engine.connect() as conn:
+        try:
+            return (await conn.execute(select(table))).fetchall()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def get_me(username:str) -> dict:
+    async with async_engine.connect() as conn:
+        try:
+            row = (await conn.execute(profile_select(username))).fetchone()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    if row is None:
+        raise KeyError("User not found")
+    return profile(row)
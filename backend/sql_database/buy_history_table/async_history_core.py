@@ -0,0 +1,53 @@
+from sqlalchemy import select,delete
+from history_sqli import async_engine,schema_ddl
+from history_models import metadata_obj,history_table
+from typing import AsyncIterator,List
+from datetime import date
+
+# awaitable versions of history_core.py for async handlers
+
+
+async def create_table():
+    async with async_engine.begin() as conn:
+        for stmt in schema_ddl():
+            await conn.execute(stmt)
+        await conn.run_sync(metadata_obj.create_all)
+async def iter_all_data(batch_size:int = 1000) -> AsyncIterator:
+    async with async_engine.connect() as conn:
+        result = await conn.stream(select(history_table).execution_options(yield_per = batch_size))
+        async for row in result:
+            yield row
+async def get_all_data():
+    async with async_engine.connect() as conn:
+        try:
+            return (await conn.execute(select(history_table))).fetchall()
+        except Exception as e:
+            raise Exception(f"Error  {e}")
+async def create_new_buy(username:str,name:str,price:str):
+    async with async_engine.connect() as conn:
+        try:
+            stmt = history_table.insert().values(
+                username = username,
+                name = name,
+                price = price,
+                date = date.today()
+            )
+            await conn.execute(stmt)
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def get_user_history(username:str) -> List:
+    async with async_engine.connect() as conn:
+        try:
+            stmt = select(history_table).where(history_table.c.username == username).order_by(history_table.c.date,history_table.c.id)
+            return (await conn.execute(stmt)).fetchall()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def clear_history(username:str):
+    async with async_engine.connect() as conn:
+        try:
+            stmt = delete(history_table).where(history_table.c.username == username)
+            await conn.execute(stmt)
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
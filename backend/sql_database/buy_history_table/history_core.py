@@ -1,15 +1,21 @@
 from sqlalchemy import text,select,delete
-from history_sqli import sync_engine
+from history_sqli import sync_engine,create_schemas
 from history_models import metadata_obj,history_table
-import uuid
 from typing import List
-from datetime import datetime
+from datetime import date
 
 
 
 def create_table():
+    create_schemas()
     #metadata_obj.drop_all(sync_engine)
     metadata_obj.create_all(sync_engine)
+def iter_all_data(batch_size:int = 1000):
+    # server side cursor, rows arrive batch_size at a time so exports stay flat in memory
+    with sync_engine.connect() as conn:
+        stmt = select(history_table).execution_options(yield_per = batch_size)
+        for row in conn.execute(stmt):
+            yield row
 def get_all_data():
     with sync_engine.connect() as conn:
         try:
@@ -24,9 +30,8 @@ def create_new_buy(username:str,name:str,price:str):
             stmt = history_table.insert().values(
                 username = username,
                 name = name,
-                id = str(uuid.uuid4()),
                 price = price,
-                date = str(datetime.now()).split()[0]
+                date = date.today()
             )
             conn.execute(stmt)
             conn.commit()
@@ -35,7 +40,7 @@ def create_new_buy(username:str,name:str,price:str):
 def get_user_history(username:str) -> List:
     with sync_engine.connect() as conn:
         try:
-            stmt = select(history_table).where(history_table.c.username == username)
+            stmt = select(history_table).where(history_table.c.username == username).order_by(history_table.c.date,history_table.c.id)
             res = conn.execute(stmt)
             return res.fetchall()
         except Exception as e:
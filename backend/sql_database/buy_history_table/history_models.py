@@ -1,15 +1,18 @@
-from sqlalchemy import Table,String,Integer,MetaData,Column,ARRAY
+from sqlalchemy import Table,String,Integer,BigInteger,Date,MetaData,Column,Identity,Index
 from sqlalchemy.dialects.postgresql import JSONB
 
 
-metadata_obj = MetaData()
+metadata_obj = MetaData(schema = "history")
 
 history_table = Table(
     "history_data",
     metadata_obj,
-    Column("username",String,primary_key=True),
+    # a user has many purchases, rows are keyed by a generated id
+    Column("id",BigInteger().with_variant(Integer,"sqlite"),Identity(),primary_key=True),
+    Column("username",String,nullable=False),
     Column("name",String),
-    Column("id",String),
     Column("price",Integer),
-    Column("date",String)
-)
\ No newline at end of file
+    Column("date",Date),
+    # get_user_history / clear_history are range scans over one user
+    Index("ix_history_data_username_date","username","date")
+)
@@ -1,12 +1,18 @@
-from sqlalchemy import text,select,and_,func
+from sqlalchemy import text,select,and_,func,bindparam
 from sql_i import sync_engine
 from models import metadata_obj,table
+from game_table.game_models import game_table
+from drop_history_table.drop_models import drop_table
 import uuid
 from typing import List,Optional
 import os
 from dotenv import load_dotenv
 from typing import List,Optional
 
+# set to a leaderboard.Leaderboard (or RedisLeaderboard) to keep ranked boards
+# updated by the stats counters below, see attach_leaderboard
+leaderboard = None
+
 
 def create_table():
     metadata_obj.create_all(sync_engine)
@@ -76,38 +82,132 @@ def check_sogl(username:str) -> bool:
             raise Exception(f"Error : {e}")  
 
 
+# statements shared with async_core
+
+def balance_update(username:str,delta:int):
+    # one conditional UPDATE, the database does the arithmetic so concurrent
+    # bets can not overwrite each other; returns no row when the user is
+    # missing or the balance would go below zero
+    stmt = table.update().where(table.c.username == username).values(balance = table.c.balance + delta).returning(table.c.balance)
+    if delta < 0:
+        stmt = stmt.where(table.c.balance >= -delta)
+    return stmt
+def counter_update(username:str,**counters):
+    # col = col + n in the UPDATE itself, no read-modify-write between requests
+    return table.update().where(table.c.username == username).values(**{name:table.c[name] + n for name,n in counters.items()})
+def profile_select(username:str):
+    return select(table.c.balance,table.c.wins,table.c.loses,table.c.games_count).where(table.c.username == username)
+def profile(row) -> dict:
+    return {
+        "Tatal games":row.games_count,
+        "Wins":row.wins,
+        "Loses":row.loses,
+        "Balance":row.balance,
+        "Wins procent":win_procent(row.wins,row.games_count)
+    }
+def outcome_params(outcomes:List[tuple]) -> List[dict]:
+    return [{"player":username,"won":int(won),"lost":int(not won)} for username,won in outcomes]
+def finish_statements(game_id:str,winner:str,bet:int,results:dict,outcomes:List[tuple]) -> list:
+    # everything finish_game writes after the balances, as (statement, params)
+    return [
+        (record_games_stmt,outcome_params(outcomes)),
+        (game_table.update().where(game_table.c.id == game_id).values(winner = winner,results = results),None),
+        (drop_table.insert(),[{
+            "username":username,
+            "result":results.get(username),
+            "bet":bet,
+            "won":won
+        } for username,won in outcomes]),
+    ]
+def track_outcomes(outcomes:List[tuple]):
+    if leaderboard is not None:
+        for username,won in outcomes:
+            leaderboard.add(username,wins = int(won),games = 1)
+def track_counters(username:str,counters:dict):
+    if leaderboard is not None:
+        leaderboard.add(username,wins = counters.get("wins",0),games = counters.get("games_count",0))
+
+
+def _change_balance(conn,username:str,delta:int) -> Optional[int]:
+    row = conn.execute(balance_update(username,delta)).fetchone()
+    return None if row is None else row[0]
 def decrease_user_balance(username:str,amount:int) -> bool:
-    if not is_users_exists(username):
-        raise KeyError("User not found")
     with sync_engine.connect() as conn:
         try:
-            stmt = select(table.c.balance).where(table.c.username == username)
-            res = conn.execute(stmt)
-            user_balance = res.fetchone()[0]
-            if user_balance < amount:
-                return False
-            update_stmt = table.update().where(table.c.username == username).values(balance = user_balance - amount)
-            conn.execute(update_stmt)
+            balance = _change_balance(conn,username,-amount)
             conn.commit()
-            return True
         except Exception as e:
             raise Exception(f"Error : {e}")
+    if balance is None:
+        if not is_users_exists(username):
+            raise KeyError("User not found")
+        return False
+    return True
 def increase_user_balance(username:str,amount:int) -> bool:
-    if not is_users_exists(username):
+    with sync_engine.connect() as conn:
+        try:
+            balance = _change_balance(conn,username,amount)
+            conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    if balance is None:
         raise KeyError("User not found")
+    return True
+def settle_balances(changes:dict) -> Optional[dict]:
+    """Apply {username: delta} in one transaction, e.g. both players of a finished game.
+
+    Returns the new balances, or None (and nothing is applied) when a user is
+    missing or would end up below zero.
+    """
     with sync_engine.connect() as conn:
         try:
-            stmt = select(table.c.balance).where(table.c.username == username)
-            res = conn.execute(stmt)
-            data = res.fetchone()[0]
-            if data:
-                update_stmt = table.update().where(table.c.username == username).values(balance = data + amount)
-                conn.execute(update_stmt)
-                conn.commit()
-                return True
-            return False
+            balances = _settle(conn,changes)
+            if balances is None:
+                conn.rollback()
+                return None
+            conn.commit()
+            return balances
         except Exception as e:
-            raise Exception(f"Error : {e}")   
+            raise Exception(f"Error : {e}")
+def _settle(conn,changes:dict) -> Optional[dict]:
+    balances = {}
+    # fixed order so two settlements over the same users can not deadlock
+    for username in sorted(changes):
+        balance = _change_balance(conn,username,changes[username])
+        if balance is None:
+            return None
+        balances[username] = balance
+    return balances
+def game_changes(winner:str,loser:str,bet:int) -> dict:
+    # with one player on both sides the two deltas would collapse into one key
+    if winner == loser:
+        raise ValueError(f"{winner} can not win against themselves")
+    return {winner:bet,loser:-bet}
+def settle_game(winner:str,loser:str,bet:int) -> Optional[dict]:
+    return settle_balances(game_changes(winner,loser,bet))
+def finish_game(game_id:str,winner:str,loser:str,bet:int,results:dict) -> Optional[dict]:
+    """Finish a game in one transaction on one connection: both balances, both
+    players' stats, the game's winner and results and both drop history rows.
+
+    Returns the new balances, or None (and nothing is written) when a player
+    is missing or the loser can not pay the bet. Raises ValueError when the
+    winner is also the loser.
+    """
+    changes = game_changes(winner,loser,bet)
+    outcomes = [(winner,True),(loser,False)]
+    with sync_engine.connect() as conn:
+        try:
+            balances = _settle(conn,changes)
+            if balances is None:
+                conn.rollback()
+                return None
+            for stmt,params in finish_statements(game_id,winner,bet,results,outcomes):
+                conn.execute(stmt,params)
+            conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+    track_outcomes(outcomes)
+    return balances
 def get_user_balance(username:str) -> int:
     if not is_users_exists(username):
         raise KeyError("User not found")
@@ -122,118 +222,87 @@ def get_user_balance(username:str) -> int:
 def count_all_user_money() -> int:
     with sync_engine.connect()  as conn:
         try:
-            stmt = select(table.c.balance)
-            res = conn.execute(stmt)
-            data = res.fetchall()
-            result:int = 0
-            for balance in data:
-                result += balance[0]
-            return result    
+            stmt = select(func.coalesce(func.sum(table.c.balance),0))
+            return int(conn.execute(stmt).scalar())
         except Exception as e:
             raise Exception(f"Error : {e}")  
-def plus_one_win(username:str) -> bool:
+def _increment(username:str,**counters) -> bool:
     with sync_engine.connect() as conn:
         try:
-            stmt = select(table.c.wins).where(table.c.username == username)
-            res = conn.execute()
-            data = res.fetchone()[0]
-            if data is not None:
-                update_stmt = table.update().where(table.c.username == username).values(wins = data + 1)
-                conn.execute(update_stmt)
-                conn.commit()
-                return True 
-            else:
-                print("User not found")
-                return False
+            found = conn.execute(counter_update(username,**counters)).rowcount > 0
+            conn.commit()
         except Exception as e:
             print(f"Error : {e}") 
-            raise Exception(f"Error : {e}")       
-
+            raise Exception(f"Error : {e}")
+    if not found:
+        print("User not found")
+        return False
+    track_counters(username,counters)
+    return True
+def plus_one_win(username:str) -> bool:
+    return _increment(username,wins = 1)
 def plus_one_game(username:str) -> bool:
+    return _increment(username,games_count = 1)
+def plus_one_lose(username:str) -> bool:
+    return _increment(username,loses = 1)
+def record_game(username:str,won:bool) -> bool:
+    """Count one finished game: the game and a win or a lose, in a single UPDATE."""
+    if won:
+        return _increment(username,wins = 1,games_count = 1)
+    return _increment(username,loses = 1,games_count = 1)
+# one statement for a whole batch, sent with executemany
+record_games_stmt = table.update().where(table.c.username == bindparam("player")).values(
+    wins = table.c.wins + bindparam("won"),
+    loses = table.c.loses + bindparam("lost"),
+    games_count = table.c.games_count + 1
+)
+def record_games(outcomes:List[tuple]) -> None:
+    """Count a batch of (username, won) outcomes in one round trip, e.g. both players of a game."""
+    if not outcomes:
+        return
     with sync_engine.connect() as conn:
         try:
-            stmt = select(table.c.games_count).where(table.c.username == username)
-            res = conn.execute()
-            data = res.fetchone()[0]
-            if data is not None:
-                update_stmt = table.update().where(table.c.username == username).values(games_count = data + 1)
-                conn.execute(update_stmt)
-                conn.commit()
-                return True 
-            else:
-                print("User not found")
-                return False
+            conn.execute(record_games_stmt,outcome_params(outcomes))
+            conn.commit()
         except Exception as e:
-            print(f"Error : {e}") 
-            raise Exception(f"Error : {e}")       
-
-def plus_one_lose(username:str) -> bool:
+            raise Exception(f"Error : {e}")
+    track_outcomes(outcomes)
+def win_procent(wins:Optional[int],games_count:Optional[int]) -> float:
+    if not wins or not games_count:
+        return 0
+    return (wins / games_count) * 100
+def count_procent_of_wins(username:str) -> float:
     with sync_engine.connect() as conn:
         try:
-            stmt = select(table.c.loses).where(table.c.username == username)
-            res = conn.execute()
-            data = res.fetchone()[0]
-            if data is not None:
-                update_stmt = table.update().where(table.c.username == username).values(loses = data + 1)
-                conn.execute(update_stmt)
-                conn.commit()
-                return True 
-            else:
-                print("User not found")
-                return False
+            stmt = select(table.c.wins,table.c.games_count).where(table.c.username == username)
+            row = conn.execute(stmt).fetchone()
         except Exception as e:
-            print(f"Error : {e}") 
-            raise Exception(f"Error : {e}")       
-def count_procent_of_wins(username:str) -> float:
-    def get_user_wins() -> int:
-        with sync_engine.connect() as conn:
-            try:
-                stmt = select(table.c.wins).where(table.c.username == username)
-                res = conn.execute(stmt)
-                data = res.fetchall()
-                if data is not None:
-                    return int(data[0][0])
-                return None
-            except Exception as e:
-                return Exception(f"Error : {e}")        
-    def get_user_games_count() -> int:
-        with sync_engine.connect() as conn:
-            try:
-                stmt = select(table.c.games_count).where(table.c.username == username)
-                res = conn.execute(stmt)
-                data = res.fetchall()
-                if data is not None:
-                    return int(data[0][0])
-                return None
-            except Exception as e:
-                return Exception(f"Error : {e}")    
-    wins = get_user_wins()
-    games_count = get_user_games_count()
-    if (type(wins) != int or type(games_count) != int) or (games_count == 0 or wins ==  0):
-        return 0        
-    else:
-        return (games_count / wins) * 100
-def get_leader_borad_games() -> dict:
+            return Exception(f"Error : {e}")
+    if row is None:
+        return 0
+    return win_procent(row.wins,row.games_count)
+def attach_leaderboard(board) -> None:
+    # fill the board with one select, later changes arrive through the stats counters
+    global leaderboard
+    with sync_engine.connect() as conn:
+        stmt = select(table.c.username,table.c.wins,table.c.games_count)
+        board.load((row.username,row.wins or 0,row.games_count or 0) for row in conn.execute(stmt))
+    leaderboard = board
+def get_leader_borad_games(limit:Optional[int] = None) -> dict:
+    if leaderboard is not None:
+        return dict(leaderboard.top("games",limit))
     with sync_engine.connect() as conn:
         try:
-            stmt = select(table.c.username)
-            res = conn.execute(stmt)
-            data = res.fetchall()
-            users = []
-            for user in data:
-                users.append(user[0])
-            stmt_games = select(table.c.games_count)
-            res_games = conn.execute(stmt_games)
-            data2 = res_games.fetchall()
-            counts = []
-            for count in data2:
-                counts.append(count[0])
-            data_leader_board = {}
-            for i in range(len(users)):
-                data_leader_board[users] = counts[i]
-            return data_leader_board    
+            stmt = select(table.c.username,table.c.games_count).order_by(table.c.games_count.desc()).limit(limit)
+            return {row.username:row.games_count for row in conn.execute(stmt)}
         except Exception as e:
             return Exception(f"Error : {e}")    
+def iter_all_data(batch_size:int = 1000):
+    # server side cursor, rows arrive batch_size at a time so exports stay flat in memory
+    with sync_engine.connect() as conn:
+        stmt = select(table).execution_options(yield_per = batch_size)
+        for row in conn.execute(stmt):
+            yield row
 def get_all_data():
     with sync_engine.connect() as conn:
         try:
@@ -244,42 +313,12 @@ def get_all_data():
         except Exception as e:
             return Exception(f"Error : {e}")  
 def get_me(username:str) -> dict:
-    if not is_users_exists(username):
-        return KeyError("User not found")
+    # the whole profile is one row, read with one statement on one connection
     with sync_engine.connect() as conn:
-        def get_wins():
-            stmt = select(table.c.wins).where(table.c.username == username)
-            res = conn.execute(stmt)
-            data = res.fetchall()
-            if data is not None:
-                return data[0][0]
-        def get_loses():
-            stmt = select(table.c.loses).where(table.c.username == username)
-            res = conn.execute(stmt)
-            data = res.fetchall()
-            if data is not None:
-                return data[0][0]
-        def get_games_count():
-            stmt = select(table.c.games_count).where(table.c.username == username)
-            res = conn.execute(stmt)
-            data = res.fetchall()
-            if data is not None:
-                return data[0][0]   
         try:
-            balance  = get_user_balance(username)
-            wins = get_wins()
-            loses = get_loses()
-            total_games = get_games_count()
-            win_procent = count_procent_of_wins(username)
-            #print(win_procent)
-            result = {
-                "Tatal games":total_games,
-                "Wins":wins,
-                "Loses":loses,
-                "Balance":balance,
-                "Wins procent":win_procent
-            }
-            return result
+            row = conn.execute(profile_select(username)).fetchone()
         except Exception as e:
             return Exception(f"Error : {e}")
- 
\ No newline at end of file
+    if row is None:
+        return KeyError("User not found")
+    return profile(row)
@@ -0,0 +1,53 @@
+from drop_models import metadata_obj,drop_table
+from drop_sqli import async_engine,schema_ddl
+from sqlalchemy import select,delete
+from typing import AsyncIterator
+
+# awaitable versions of drop_core.py for async handlers
+
+async def create_table():
+    async with async_engine.begin() as conn:
+        for stmt in schema_ddl():
+            await conn.execute(stmt)
+        await conn.run_sync(metadata_obj.create_all)
+
+
+async def iter_all_data(batch_size:int = 1000) -> AsyncIterator:
+    async with async_engine.connect() as conn:
+        result = await conn.stream(select(drop_table).execution_options(yield_per = batch_size))
+        async for row in result:
+            yield row
+async def get_all_data():
+    async with async_engine.connect() as conn:
+        try:
+            return (await conn.execute(select(drop_table))).fetchall()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def write_user_drop(username:str,result:int,bet:int,won:bool):
+    async with async_engine.connect() as conn:
+        try:
+            stmt = drop_table.insert().values(
+                username = username,
+                result = result,
+                bet = bet,
+                won = won
+            )
+            await conn.execute(stmt)
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error  : {e}")
+async def get_user_history(username:str):
+    async with async_engine.connect() as conn:
+        try:
+            stmt = select(drop_table).where(drop_table.c.username == username).order_by(drop_table.c.id)
+            return (await conn.execute(stmt)).fetchall()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def clear_user_history(username:str):
+    async with async_engine.connect() as conn:
+        try:
+            stmt = delete(drop_table).where(drop_table.c.username == username)
+            await conn.execute(stmt)
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
@@ -1,12 +1,18 @@
 from drop_models import metadata_obj,drop_table
-from drop_sqli import sync_engine
+from drop_sqli import sync_engine,create_schemas
 from sqlalchemy import select,update,delete
-import uuid
 
 def create_table():
+    create_schemas()
     metadata_obj.create_all(sync_engine)
 
 
+def iter_all_data(batch_size:int = 1000):
+    # server side cursor, rows arrive batch_size at a time so exports stay flat in memory
+    with sync_engine.connect() as conn:
+        stmt = select(drop_table).execution_options(yield_per = batch_size)
+        for row in conn.execute(stmt):
+            yield row
 def get_all_data():
     with sync_engine.connect() as conn:
         try:
@@ -19,7 +25,6 @@ def write_user_drop(username:str,result:int,bet:int,won:bool):
     with sync_engine.connect() as conn:
         try:
             stmt = drop_table.insert().values(
-                id = str(uuid.uuid4()),
                 username = username,
                 result = result,
                 bet = bet,
@@ -32,7 +37,7 @@ def write_user_drop(username:str,result:int,bet:int,won:bool):
 def get_user_history(username:str):
     with sync_engine.connect() as conn:
         try:
-            stmt = select(drop_table ).where(drop_table.c.username == username)
+            stmt = select(drop_table).where(drop_table.c.username == username).order_by(drop_table.c.id)
             res = conn.execute(stmt)
             return res.fetchall()
         except Exception as e:
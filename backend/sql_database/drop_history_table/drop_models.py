@@ -1,14 +1,16 @@
-from sqlalchemy import Table,Column,MetaData,String,Integer,Boolean
+from sqlalchemy import Table,Column,MetaData,String,Integer,BigInteger,Boolean,Identity,Index
 
 
-metadata_obj = MetaData()
+metadata_obj = MetaData(schema = "drop")
 
 drop_table = Table(
     "drop_table",
     metadata_obj,
-    Column("id",String,primary_key=True),
-    Column("username",String),
+    # generated ids grow with time, so (username, id) keeps a user's drops in order
+    Column("id",BigInteger().with_variant(Integer,"sqlite"),Identity(),primary_key=True),
+    Column("username",String,nullable=False),
     Column("result",Integer),
     Column("bet",Integer),
-    Column("won",Boolean)
-)
\ No newline at end of file
+    Column("won",Boolean),
+    Index("ix_drop_table_username_id","username","id")
+)
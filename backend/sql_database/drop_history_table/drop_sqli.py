@@ -1,9 +1,5 @@
-from sqlalchemy import create_engine
-from drop_config import conect
-
-sync_engine =  create_engine(
-    url = conect(),
-    echo = False,
-    pool_size = 5,
-    max_overflow=10,
-)
\ No newline at end of file
+import os
+import sys
+# every store shares the engines (and pools) of sql_database/sql_i.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sql_i import sync_engine,async_engine,create_schemas,schema_ddl
@@ -0,0 +1,109 @@
+from sqlalchemy import select
+from game_sql import async_engine,schema_ddl
+from game_models import metadata_obj,game_table
+from game_core import waiting_lobby,free_lobby,join_lobby,open_lobby,new_lobby,result_update
+import uuid
+from typing import AsyncIterator,Optional,Tuple
+
+# awaitable versions of game_core.py for async handlers
+
+
+async def create_table():
+    async with async_engine.begin() as conn:
+        for stmt in schema_ddl():
+            await conn.execute(stmt)
+        await conn.run_sync(metadata_obj.drop_all)
+        await conn.run_sync(metadata_obj.create_all)
+
+
+async def fill_empty(count:int = 1):
+    async with async_engine.connect() as conn:
+        # the whole batch is one executemany
+        try:
+            rows = [{"bet":0,"players":[],"id":str(uuid.uuid4()),"winner":"","results":{}} for _ in range(count)]
+            await conn.execute(game_table.insert(),rows)
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def check_len_players(id_:str) -> Optional[int]:
+    async with async_engine.connect() as conn:
+        try:
+            stmt = select(game_table.c.players).where(game_table.c.id == id_)
+            data = (await conn.execute(stmt)).fetchone()
+            if data is not None:
+                return len(data[0])
+            return None
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+
+async def start_game_database(username:str,bet:int) -> Tuple[str,bool]:
+    """See game_core.start_game_database."""
+    async with async_engine.connect() as conn:
+        try:
+            row = (await conn.execute(waiting_lobby(username,bet))).fetchone()
+            joined = row is not None
+            if joined:
+                await conn.execute(join_lobby(row.id,username))
+            else:
+                row = (await conn.execute(free_lobby())).fetchone()
+                if row is not None:
+                    await conn.execute(open_lobby(row.id,username,bet))
+                else:
+                    row = (await conn.execute(new_lobby(username,bet))).fetchone()
+            await conn.commit()
+            return row.id,joined
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def cancel_game(id_:str):
+    async with async_engine.connect() as conn:
+        try:
+            stmt = game_table.update().where(game_table.c.id == id_).values(
+                players = [],
+                bet = 0,
+                winner = "",
+                results = {}
+            )
+            await conn.execute(stmt)
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def check_lobby_fill(id_:str) -> bool:
+    return await check_len_players(id_) == 2
+async def write_winner(username:str,id_:str):
+    async with async_engine.connect() as conn:
+        try:
+            stmt = game_table.update().where(game_table.c.id == id_).values(winner = username)
+            await conn.execute(stmt)
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+
+
+async def iter_all_data(batch_size:int = 1000) -> AsyncIterator:
+    async with async_engine.connect() as conn:
+        result = await conn.stream(select(game_table).execution_options(yield_per = batch_size))
+        async for row in result:
+            yield row
+async def get_all_data():
+    async with async_engine.connect() as conn:
+        try:
+            return (await conn.execute(select(game_table))).fetchall()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def write_result(game_id:str,username:str,result:int):
+    async with async_engine.connect() as conn:
+        try:
+            await conn.execute(result_update(game_id,username,result))
+            await conn.commit()
+        except Exception as e:
+            raise Exception(f"Error : {e}")
+async def get_game_result(game_id:str) -> Optional[dict]:
+    async with async_engine.connect() as conn:
+        try:
+            stmt = select(game_table.c.results).where(game_table.c.id == game_id)
+            data = (await conn.execute(stmt)).fetchone()
+            if data is not None:
+                return data[0]
+            return None
+        except Exception as e:
+            raise Exception(f"Error : {e}")
@@ -1,28 +1,24 @@
-from sqlalchemy import text,select,and_
-from game_sql import sync_engine
+from sqlalchemy import text,select,and_,not_,func,any_
+from game_sql import sync_engine,create_schemas
 from game_models import metadata_obj,game_table
 import uuid
-from typing import List,Optional
+from typing import List,Optional,Tuple
 
 
 
 
 def create_table():
+    create_schemas()
     metadata_obj.drop_all(sync_engine)
     metadata_obj.create_all(sync_engine)
 
 
-def fill_empty():
+def fill_empty(count:int = 1):
     with sync_engine.connect() as conn:
+        # the whole batch is one executemany
         try:
-            stmt = game_table.insert().values(
-                bet = 0,
-                players = [],
-                id = str(uuid.uuid4()),
-                winner = "",
-                results = {}
-            )
-            conn.execute(stmt)
+            rows = [{"bet":0,"players":[],"id":str(uuid.uuid4()),"winner":"","results":{}} for _ in range(count)]
+            conn.execute(game_table.insert(),rows)
             conn.commit()
         except Exception as e:
             raise Exception(f"Error : {e}")
@@ -40,46 +36,48 @@ def check_len_players(id_:str) -> Optional[int]:
         except Exception as e:    
             raise Exception(f"Error : {e}")
 
-def start_game_database(username:str,bet:int) -> str:
+# the predicates repeat the partial index conditions in game_models word for
+# word so the planner can use them; SKIP LOCKED lets concurrent joins pass
+# over a lobby another transaction is claiming instead of queueing on it
+def waiting_lobby(username:str,bet:int):
+    return select(game_table.c.id).where(
+        text("cardinality(players) = 1"),
+        game_table.c.bet == bet,
+        not_(username == any_(game_table.c.players))
+    ).limit(1).with_for_update(skip_locked = True)
+def free_lobby():
+    return select(game_table.c.id).where(text("cardinality(players) = 0")).limit(1).with_for_update(skip_locked = True)
+def join_lobby(id_:str,username:str):
+    return game_table.update().where(game_table.c.id == id_).values(players = func.array_append(game_table.c.players,username))
+def open_lobby(id_:str,username:str,bet:int):
+    return game_table.update().where(game_table.c.id == id_).values(bet = bet,players = [username],winner = "",results = {})
+def new_lobby(username:str,bet:int):
+    return game_table.insert().values(bet = bet,players = [username],id = str(uuid.uuid4()),winner = "",results = {}).returning(game_table.c.id)
+def result_update(id_:str,username:str,result:int):
+    # merged into results, the other player's roll stays
+    return game_table.update().where(game_table.c.id == id_).values(
+        results = game_table.c.results.op("||")(func.jsonb_build_object(username,result)))
+def start_game_database(username:str,bet:int) -> Tuple[str,bool]:
+    """Join a waiting lobby with this bet, or open one.
+
+    Claim and create happen in one transaction: a waiting lobby, else a
+    recycled empty one, else a new row, so the pool never runs dry.
+    Returns the lobby id and whether a waiting lobby was joined.
+    """
     with sync_engine.connect() as conn:
         try:
-            stmt = select(game_table).where(
-                and_(
-                    text("array_length(players, 1) = 1"),
-                    game_table.c.bet == bet
-                )
-            )
-            res = conn.execute(stmt)
-            data = res.fetchall()
-            found = False
-            if data is not  None:
-                for game in data:
-                    if username not in game[1]:
-                        found = True
-                        game[1].append(username)
-                        update_stmt = game_table.update().where(game_table.c.id == game[2]).values(players = game[1])
-                        conn.execute(update_stmt)
-                        conn.commit()
-                        return game[2]
-            if not found:
-                try:
-                   
-                    stmt_2 = select(game_table.c).where(
-                        and_(
-                            #text("players IS NULL OR array_length(players, 1) = 0"),
-                            game_table.c.bet == 0
-                        )
-                    )      
-                    res = conn.execute(stmt_2)
-                    data = res.fetchone()
-                    if data is not None:
-                        update_stmt = game_table.update().where(game_table.c.id == data[2]).values(bet = bet,players = [username])
-                        conn.execute(update_stmt)
-                        conn.commit()
-                    else:
-                        print("Nothing found")    
-                except Exception as e:
-                    raise Exception(f"Error : {e}")    
+            row = conn.execute(waiting_lobby(username,bet)).fetchone()
+            joined = row is not None
+            if joined:
+                conn.execute(join_lobby(row.id,username))
+            else:
+                row = conn.execute(free_lobby()).fetchone()
+                if row is not None:
+                    conn.execute(open_lobby(row.id,username,bet))
+                else:
+                    row = conn.execute(new_lobby(username,bet)).fetchone()
+            conn.commit()
+            return row.id,joined
         except Exception as e:
             raise Exception(f"Error : {e}")      
 def cancel_game(id_:str):
@@ -113,6 +111,12 @@ def write_winner(username:str,id_:str):
             raise Exception(f"Error : {e}")        
 
 
+def iter_all_data(batch_size:int = 1000):
+    # server side cursor, rows arrive batch_size at a time so exports stay flat in memory
+    with sync_engine.connect() as conn:
+        stmt = select(game_table).execution_options(yield_per = batch_size)
+        for row in conn.execute(stmt):
+            yield row
 def get_all_data():
     with sync_engine.connect() as conn:
         try:
@@ -125,10 +129,7 @@ def get_all_data():
 def write_result(game_id:str,username:str,result:int):
     with sync_engine.connect() as conn:
         try:
-            res = {}
-            res[username] = result
-            update_stmt = game_table.update().where(game_table.c.id == game_id).values(results = res)
-            conn.execute(update_stmt)
+            conn.execute(result_update(game_id,username,result))
             conn.commit()
         except Exception as e:
             return Exception(f"Error : {e}")
@@ -1,8 +1,8 @@
-from sqlalchemy import Table,String,Integer,MetaData,Column,ARRAY
+from sqlalchemy import Table,String,Integer,MetaData,Column,ARRAY,Index,text
 from sqlalchemy.dialects.postgresql import JSONB
 
 
-metadata_obj = MetaData()
+metadata_obj = MetaData(schema = "game")
 
 game_table = Table(
     "game_data",
@@ -11,5 +11,9 @@ game_table = Table(
     Column("players",ARRAY(String)),
     Column("id",String,primary_key=True),
     Column("winner",String),
-    Column("results",JSONB)
-)
\ No newline at end of file
+    Column("results",JSONB),
+    # matchmaking only ever looks at waiting lobbies of one bet and at empty
+    # lobbies, both partial indexes stay as small as those sets
+    Index("ix_game_data_waiting_bet","bet",postgresql_where = text("cardinality(players) = 1")),
+    Index("ix_game_data_free","id",postgresql_where = text("cardinality(players) = 0"))
+)
@@ -0,0 +1,73 @@
+from sqlalchemy import inspect,text
+from sqlalchemy.types import Integer
+from sql_i import sync_engine,create_schemas
+from config import schema_map
+from buy_history_table.history_models import history_table
+from drop_history_table.drop_models import drop_table
+from game_table.game_models import game_table
+
+# run once per database: python migrations.py
+# every step checks the live schema first, so running it again is a no-op
+
+
+def _column_types(conn,table) -> dict:
+    schema = schema_map()[table.schema]
+    return {column["name"]:column["type"] for column in inspect(conn).get_columns(table.name,schema = schema)}
+
+def _index_names(conn,table) -> set:
+    schema = schema_map()[table.schema]
+    return {index["name"] for index in inspect(conn).get_indexes(table.name,schema = schema)}
+
+def _surrogate_key(conn,table,name:str):
+    # the old keys are random uuid strings (history_data was even keyed by
+    # username), generated ids replace them for the existing rows too
+    conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT IF EXISTS {table.name}_pkey"))
+    conn.execute(text(f"ALTER TABLE {name} DROP COLUMN IF EXISTS id"))
+    conn.execute(text(f"ALTER TABLE {name} ADD COLUMN id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY"))
+    conn.execute(text(f"ALTER TABLE {name} ALTER COLUMN username SET NOT NULL"))
+
+def _qualified(table) -> str:
+    schema = schema_map()[table.schema]
+    return table.name if schema is None else f"{schema}.{table.name}"
+
+def migrate_history_keys() -> list:
+    """history_data and drop_table: generated id keys, per-user indexes, real dates."""
+    applied = []
+    create_schemas()
+    with sync_engine.begin() as conn:
+        tables = inspect(conn)
+        for table in (history_table,drop_table):
+            if not tables.has_table(table.name,schema = schema_map()[table.schema]):
+                table.create(conn)
+                applied.append(f"create {table.name}")
+                continue
+            name = _qualified(table)
+            columns = _column_types(conn,table)
+            if not isinstance(columns.get("id"),Integer):
+                _surrogate_key(conn,table,name)
+                applied.append(f"{table.name}: id key")
+            if table is history_table and "DATE" not in str(columns["date"]).upper():
+                conn.execute(text(f"ALTER TABLE {name} ALTER COLUMN date TYPE DATE USING NULLIF(date,'')::date"))
+                applied.append(f"{table.name}: date type")
+            _create_indexes(conn,table,applied)
+    return applied
+
+def _create_indexes(conn,table,applied:list):
+    existing = _index_names(conn,table)
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(conn)
+            applied.append(f"{table.name}: {index.name}")
+
+def migrate_game_indexes() -> list:
+    """game_data: partial indexes for the SKIP LOCKED matchmaking queries."""
+    applied = []
+    with sync_engine.begin() as conn:
+        if inspect(conn).has_table(game_table.name,schema = schema_map()[game_table.schema]):
+            _create_indexes(conn,game_table,applied)
+    return applied
+
+
+if __name__ == "__main__":
+    for step in migrate_history_keys() + migrate_game_indexes() or ["nothing to do"]:
+        print(step)
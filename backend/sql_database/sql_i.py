@@ -1,9 +1,27 @@
 from sqlalchemy import text,create_engine
-from config import conect
+from sqlalchemy.schema import CreateSchema
+from sqlalchemy.ext.asyncio import create_async_engine
+from config import conect,pool_options,schema_map
 
+# the only engines of the service: every store (users, games, buy history,
+# drop history) checks out connections from these two pools, so a game can
+# be finished in one transaction across all of them
 sync_engine =  create_engine(
     url = conect(),
     echo = False,
-    pool_size = 5,
-    max_overflow=10,
-)
+    **pool_options()
+).execution_options(schema_translate_map = schema_map())
+# the same database for async handlers; psycopg 3 serves both
+async_engine = create_async_engine(
+    url = conect(asyncio = True),
+    echo = False,
+    **pool_options()
+).execution_options(schema_translate_map = schema_map())
+
+def schema_ddl() -> list:
+    return [CreateSchema(schema,if_not_exists = True) for schema in sorted(set(schema_map().values()) - {None})]
+
+def create_schemas():
+    with sync_engine.begin() as conn:
+        for stmt in schema_ddl():
+            conn.execute(stmt)
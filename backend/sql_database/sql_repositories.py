@@ -0,0 +1,290 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),"game_table"))
+from sqlalchemy import text,select,func,not_,any_
+from sqlalchemy.exc import IntegrityError
+from sql_i import sync_engine,async_engine
+from models import table
+from core import balance_update,counter_update
+from game_core import game_table,waiting_lobby,free_lobby,join_lobby,open_lobby,new_lobby,result_update,start_game_database
+from typing import Callable,Iterable,Optional,Tuple
+
+# the repositories of backend/repositories.py on the SQL stores: accounts,
+# stats, terms and the first deposit share the main_data row of a user,
+# lobbies are game_data rows (Postgres only, players is an array)
+
+
+def new_user(username:str):
+    # balance stays NULL until the account is opened, so every repository
+    # can create the row without giving the user money
+    return table.insert().values(
+        username = username,
+        balance = None,
+        wins = 0,
+        loses = 0,
+        games_count = 0,
+        sogl = None,
+        down_payment = False
+    )
+
+def create_user(username:str):
+    with sync_engine.connect() as conn:
+        try:
+            conn.execute(new_user(username))
+            conn.commit()
+        except IntegrityError:
+            pass
+
+async def create_user_async(username:str):
+    async with async_engine.connect() as conn:
+        try:
+            await conn.execute(new_user(username))
+            await conn.commit()
+        except IntegrityError:
+            pass
+
+
+class SqlAccounts:
+    """Balances in main_data.balance."""
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def exists(self,username:str) -> bool:
+        return self.get(username) is not None
+
+    def get(self,username:str) -> Optional[int]:
+        with sync_engine.connect() as conn:
+            return conn.execute(select(table.c.balance).where(table.c.username == username)).scalar()
+
+    def total(self) -> int:
+        with sync_engine.connect() as conn:
+            return int(conn.execute(select(func.coalesce(func.sum(table.c.balance),0))).scalar())
+
+    def set_default(self,username:str,amount:int = 100) -> bool:
+        create_user(username)
+        with sync_engine.connect() as conn:
+            stmt = table.update().where(table.c.username == username,table.c.balance.is_(None)).values(balance = amount)
+            opened = conn.execute(stmt).rowcount > 0
+            conn.commit()
+        return opened
+
+    def _change(self,username:str,delta:int) -> Optional[int]:
+        with sync_engine.connect() as conn:
+            row = conn.execute(balance_update(username,delta)).fetchone()
+            conn.commit()
+        return None if row is None else row[0]
+
+    def increase(self,username:str,amount:int) -> int:
+        balance = self._change(username,amount)
+        if balance is None:
+            raise KeyError(username)
+        return balance
+
+    def decrease(self,username:str,amount:int) -> bool:
+        if self._change(username,-amount) is None:
+            if not self.exists(username):
+                raise KeyError(username)
+            return False
+        return True
+
+    def reset(self,username:str) -> int:
+        with sync_engine.begin() as conn:
+            old = conn.execute(select(table.c.balance).where(table.c.username == username).with_for_update()).scalar()
+            if old is None:
+                raise KeyError(username)
+            conn.execute(table.update().where(table.c.username == username).values(balance = 0))
+        return old
+
+    def delete(self,username:str) -> bool:
+        with sync_engine.connect() as conn:
+            found = conn.execute(table.delete().where(table.c.username == username,table.c.balance.isnot(None))).rowcount > 0
+            conn.commit()
+        return found
+
+
+class SqlStats:
+    """Wins and games in main_data.wins / games_count."""
+    async def create(self,user_id:str) -> bool:
+        await create_user_async(user_id)
+        return True
+
+    async def _update(self,stmt) -> bool:
+        async with async_engine.connect() as conn:
+            found = (await conn.execute(stmt)).rowcount > 0
+            await conn.commit()
+        return found
+
+    async def add_win(self,user_id:str) -> bool:
+        return await self._update(counter_update(user_id,wins = 1))
+
+    async def add_game(self,user_id:str) -> bool:
+        return await self._update(counter_update(user_id,games_count = 1))
+
+    async def get(self,user_id:str) -> Optional[dict]:
+        async with async_engine.connect() as conn:
+            row = (await conn.execute(select(table.c.wins,table.c.games_count).where(table.c.username == user_id))).fetchone()
+        if row is None:
+            return None
+        return {"user_id":user_id,"wins":row.wins or 0,"total_games":row.games_count or 0}
+
+    async def delete(self,user_id:str) -> bool:
+        # the row also holds the balance, the counters start over
+        return await self._update(table.update().where(table.c.username == user_id).values(wins = 0,loses = 0,games_count = 0))
+
+    def rows(self) -> Iterable[Tuple[str,int,int]]:
+        with sync_engine.connect() as conn:
+            stmt = select(table.c.username,table.c.wins,table.c.games_count)
+            return [(row.username,row.wins or 0,row.games_count or 0) for row in conn.execute(stmt)]
+
+
+class SqlTerms:
+    """Accepted terms in main_data.sogl."""
+    async def set(self,username:str,state:bool):
+        await create_user_async(username)
+        async with async_engine.connect() as conn:
+            await conn.execute(table.update().where(table.c.username == username).values(sogl = state))
+            await conn.commit()
+
+    async def get(self,username:str) -> Optional[bool]:
+        async with async_engine.connect() as conn:
+            return (await conn.execute(select(table.c.sogl).where(table.c.username == username))).scalar()
+
+
+class SqlPayments:
+    """The first deposit flag in main_data.down_payment."""
+    async def claim_first(self,username:str) -> bool:
+        await create_user_async(username)
+        async with async_engine.connect() as conn:
+            stmt = table.update().where(table.c.username == username,table.c.down_payment.isnot(True)).values(down_payment = True)
+            claimed = (await conn.execute(stmt)).rowcount > 0
+            await conn.commit()
+        return claimed
+
+    async def has_first(self,username:str) -> bool:
+        async with async_engine.connect() as conn:
+            return bool((await conn.execute(select(table.c.down_payment).where(table.c.username == username))).scalar())
+
+
+def lobby(row) -> dict:
+    # the same record as a game.json lobby
+    game = {"id":row.id,"players":list(row.players),"bet":row.bet,"winner":row.winner}
+    for username,result in (row.results or {}).items():
+        game[f"result_{username}"] = result
+    return game
+
+def seated(id_:str,username:str,players:int):
+    return game_table.update().where(
+        game_table.c.id == id_,
+        text(f"cardinality(players) = {players}"),
+        username == any_(game_table.c.players)
+    )
+
+def empty_values() -> dict:
+    return {"players":[],"bet":0,"winner":"","results":{}}
+
+
+class SqlLobbyTable:
+    """Lobbies as game_data rows, matched with the SKIP LOCKED claims of game_core.
+
+    Finished and cancelled lobbies are emptied and stay in the table, the
+    ix_game_data_free index hands them out again. `on_change` is only
+    called for changes made by this process.
+    """
+    def __init__(self,on_change:Optional[Callable[[str],None]] = None):
+        self.on_change = on_change
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def changed(self,id_:str):
+        if self.on_change is not None:
+            self.on_change(id_)
+
+    def _write(self,stmt,id_:str) -> bool:
+        with sync_engine.connect() as conn:
+            found = conn.execute(stmt).rowcount > 0
+            conn.commit()
+        if found:
+            self.changed(id_)
+        return found
+
+    def get(self,id_:str) -> Optional[dict]:
+        with sync_engine.connect() as conn:
+            row = conn.execute(select(game_table).where(game_table.c.id == id_)).fetchone()
+        return None if row is None else lobby(row)
+
+    def values(self) -> list:
+        with sync_engine.connect() as conn:
+            return [lobby(row) for row in conn.execute(select(game_table))]
+
+    def match(self,username:str,bet:int) -> Optional[str]:
+        with sync_engine.connect() as conn:
+            row = conn.execute(waiting_lobby(username,bet)).fetchone()
+            if row is not None:
+                conn.execute(join_lobby(row.id,username))
+            conn.commit()
+        if row is None:
+            return None
+        self.changed(row.id)
+        return row.id
+
+    def open(self,username:str,bet:int) -> str:
+        with sync_engine.connect() as conn:
+            row = conn.execute(free_lobby()).fetchone()
+            if row is not None:
+                conn.execute(open_lobby(row.id,username,bet))
+            else:
+                row = conn.execute(new_lobby(username,bet)).fetchone()
+            conn.commit()
+        self.changed(row.id)
+        return row.id
+
+    def match_or_open(self,username:str,bet:int) -> Tuple[str,bool]:
+        # claim and create in the one transaction of start_game_database
+        id_,joined = start_game_database(username,bet)
+        self.changed(id_)
+        return id_,joined
+
+    def join(self,id_:str,username:str,bet:int) -> bool:
+        stmt = join_lobby(id_,username).where(
+            text("cardinality(players) = 1"),
+            game_table.c.bet == bet,
+            not_(username == any_(game_table.c.players))
+        )
+        if self._write(stmt,id_):
+            return True
+        if self.get(id_) is None:
+            raise KeyError(id_)
+        return False
+
+    def cancel(self,id_:str,username:str) -> bool:
+        return self._write(seated(id_,username,1).values(**empty_values()),id_)
+
+    def reset(self,id_:str,username:str) -> bool:
+        return self._write(seated(id_,username,2).values(**empty_values()),id_)
+
+    def recycle(self,id_:str) -> bool:
+        return self._write(game_table.update().where(game_table.c.id == id_).values(**empty_values()),id_)
+
+    def remove(self,id_:str) -> bool:
+        return self._write(game_table.delete().where(game_table.c.id == id_),id_)
+
+    def set_winner(self,id_:str,username:str) -> bool:
+        return self._write(seated(id_,username,2).where(game_table.c.winner == "").values(winner = username),id_)
+
+    def set_result(self,id_:str,username:str,result:int) -> bool:
+        return self._write(result_update(id_,username,result),id_)
+
+    def player_lobby(self,username:str) -> Optional[dict]:
+        with sync_engine.connect() as conn:
+            row = conn.execute(select(game_table).where(username == any_(game_table.c.players)).limit(1)).fetchone()
+        return None if row is None else lobby(row)
+
+    def is_playing(self,username:str) -> bool:
+        return self.player_lobby(username) is not None
@@ -0,0 +1,680 @@
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable,Iterable,Iterator,List,Optional,Tuple
+from async_io import run_blocking
+from lobby_store import empty_lobby,empty_drotic_lobby
+
+# Every data/*.json file as a table of one SQLite file. Point reads and
+# writes go through a primary key or an index instead of loading and
+# rewriting a whole file, and every change is one transaction.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bank (
+    username TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ledger (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    op TEXT NOT NULL,
+    username TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    balance INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ledger_username ON ledger (username, seq);
+CREATE TABLE IF NOT EXISTS stats (
+    user_id TEXT PRIMARY KEY,
+    wins INTEGER NOT NULL DEFAULT 0,
+    total_games INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sogl (
+    username TEXT PRIMARY KEY,
+    accepted INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS first_vznos (
+    username TEXT PRIMARY KEY,
+    amount INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS data_second_game (
+    id TEXT PRIMARY KEY,
+    username TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS data_second_game_username ON data_second_game (username);
+CREATE TABLE IF NOT EXISTS logs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logs_date ON logs (date, seq);
+"""
+
+# one pair of tables per lobby kind (game, drotic): the lobbies, keyed by id
+# with the whole record as JSON, and who sits where. seats is the number of
+# players, the partial indexes are the waiting queues per bet and the free list
+LOBBY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id TEXT PRIMARY KEY,
+    bet INTEGER NOT NULL,
+    seats INTEGER NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {table}_waiting ON {table} (bet) WHERE seats = 1;
+CREATE INDEX IF NOT EXISTS {table}_free ON {table} (seats) WHERE seats = 0;
+CREATE TABLE IF NOT EXISTS {table}_players (
+    username TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (username, id)
+) WITHOUT ROWID;
+"""
+LOBBY_TABLES = ("game","drotic")
+
+
+class SqliteDatabase:
+    """One SQLite file in WAL mode with a connection per thread.
+
+    Readers never wait for the writer and writers queue on the file lock
+    for up to `timeout` seconds. Connections run in autocommit mode, so a
+    single statement is its own transaction; `transaction` groups several
+    under BEGIN IMMEDIATE. sqlite3 keeps the compiled form of the last
+    `cached_statements` SQL strings per connection, so the fixed statements
+    below are prepared once per thread and only re-bound.
+
+    synchronous=FULL syncs the WAL on every commit: a committed change,
+    a ledger record included, survives a crash or a power loss.
+    """
+    def __init__(self,path:str,timeout:float = 5.0,synchronous:str = "FULL",cached_statements:int = 256):
+        self.path = path
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self.cached_statements = cached_statements
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+        conn = self.connection()
+        conn.executescript(SCHEMA + "".join(LOBBY_SCHEMA.format(table = table) for table in LOBBY_TABLES))
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local,"conn",None)
+        if conn is None:
+            conn = sqlite3.connect(self.path,timeout = self.timeout,isolation_level = None,
+                                   check_same_thread = False,cached_statements = self.cached_statements)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+            self._local.conn = conn
+            with self.lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def execute(self,sql:str,params:tuple = ()) -> sqlite3.Cursor:
+        return self.connection().execute(sql,params)
+
+    def close(self):
+        with self.lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+class SqliteAccounts:
+    """bank.json as the bank table; every change is logged to `ledger` in the same transaction."""
+    def __init__(self,db:SqliteDatabase):
+        self.db = db
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _log(self,conn,op:str,username:str,amount:int,balance:int):
+        conn.execute("INSERT INTO ledger (time, op, username, amount, balance) VALUES (?, ?, ?, ?, ?)",
+                     (time.time(),op,username,amount,balance))
+
+    def _balance(self,conn,username:str) -> Optional[int]:
+        row = conn.execute("SELECT balance FROM bank WHERE username = ?",(username,)).fetchone()
+        return None if row is None else row[0]
+
+    def exists(self,username:str) -> bool:
+        return self.get(username) is not None
+
+    def get(self,username:str) -> Optional[int]:
+        return self._balance(self.db.connection(),username)
+
+    def total(self) -> int:
+        return self.db.execute("SELECT COALESCE(SUM(balance), 0) FROM bank").fetchone()[0]
+
+    def set_default(self,username:str,amount:int = 100) -> bool:
+        with self.db.transaction() as conn:
+            if conn.execute("INSERT OR IGNORE INTO bank (username, balance) VALUES (?, ?)",(username,amount)).rowcount == 0:
+                return False
+            self._log(conn,"NEW",username,amount,amount)
+            return True
+
+    def _set(self,conn,op:str,username:str,amount:int,balance:int) -> int:
+        conn.execute("UPDATE bank SET balance = ? WHERE username = ?",(balance,username))
+        self._log(conn,op,username,amount,balance)
+        return balance
+
+    def increase(self,username:str,amount:int) -> int:
+        with self.db.transaction() as conn:
+            balance = self._balance(conn,username)
+            if balance is None:
+                raise KeyError(username)
+            return self._set(conn,"INC",username,amount,balance + amount)
+
+    def decrease(self,username:str,amount:int) -> bool:
+        with self.db.transaction() as conn:
+            balance = self._balance(conn,username)
+            if balance is None:
+                raise KeyError(username)
+            if balance < amount:
+                return False
+            self._set(conn,"DEC",username,amount,balance - amount)
+            return True
+
+    def reset(self,username:str) -> int:
+        with self.db.transaction() as conn:
+            balance = self._balance(conn,username)
+            if balance is None:
+                raise KeyError(username)
+            self._set(conn,"WDR",username,balance,0)
+            return balance
+
+    def delete(self,username:str) -> bool:
+        with self.db.transaction() as conn:
+            balance = self._balance(conn,username)
+            if balance is None:
+                return False
+            conn.execute("DELETE FROM bank WHERE username = ?",(username,))
+            self._log(conn,"DEL",username,balance,0)
+            return True
+
+
+class SqliteStats:
+    """stats.json as the stats table."""
+    def __init__(self,db:SqliteDatabase):
+        self.db = db
+
+    def _write(self,sql:str,params:tuple) -> bool:
+        return self.db.execute(sql,params).rowcount > 0
+
+    async def create(self,user_id:str) -> bool:
+        await run_blocking(self._write,"INSERT OR IGNORE INTO stats (user_id) VALUES (?)",(user_id,))
+        return True
+
+    async def add_win(self,user_id:str) -> bool:
+        return await run_blocking(self._write,"UPDATE stats SET wins = wins + 1 WHERE user_id = ?",(user_id,))
+
+    async def add_game(self,user_id:str) -> bool:
+        return await run_blocking(self._write,"UPDATE stats SET total_games = total_games + 1 WHERE user_id = ?",(user_id,))
+
+    def _get(self,user_id:str) -> Optional[dict]:
+        row = self.db.execute("SELECT user_id, wins, total_games FROM stats WHERE user_id = ?",(user_id,)).fetchone()
+        return None if row is None else dict(row)
+
+    async def get(self,user_id:str) -> Optional[dict]:
+        return await run_blocking(self._get,user_id)
+
+    async def delete(self,user_id:str) -> bool:
+        return await run_blocking(self._write,"DELETE FROM stats WHERE user_id = ?",(user_id,))
+
+    def rows(self) -> Iterable[Tuple[str,int,int]]:
+        return [tuple(row) for row in self.db.execute("SELECT user_id, wins, total_games FROM stats")]
+
+
+class SqliteTerms:
+    """sogl.json as the sogl table."""
+    def __init__(self,db:SqliteDatabase):
+        self.db = db
+
+    def _set(self,username:str,state:bool):
+        self.db.execute("INSERT INTO sogl (username, accepted) VALUES (?, ?) "
+                        "ON CONFLICT (username) DO UPDATE SET accepted = excluded.accepted",(username,int(state)))
+
+    async def set(self,username:str,state:bool):
+        await run_blocking(self._set,username,state)
+
+    def _get(self,username:str) -> Optional[bool]:
+        row = self.db.execute("SELECT accepted FROM sogl WHERE username = ?",(username,)).fetchone()
+        return None if row is None else bool(row[0])
+
+    async def get(self,username:str) -> Optional[bool]:
+        return await run_blocking(self._get,username)
+
+
+class SqlitePayments:
+    """first_vznos.json as the first_vznos table."""
+    def __init__(self,db:SqliteDatabase,amount:int = 100):
+        self.db = db
+        self.amount = amount
+
+    def _claim(self,username:str) -> bool:
+        return self.db.execute("INSERT OR IGNORE INTO first_vznos (username, amount) VALUES (?, ?)",(username,self.amount)).rowcount > 0
+
+    async def claim_first(self,username:str) -> bool:
+        return await run_blocking(self._claim,username)
+
+    def _has(self,username:str) -> bool:
+        row = self.db.execute("SELECT amount FROM first_vznos WHERE username = ?",(username,)).fetchone()
+        return row is not None and bool(row[0])
+
+    async def has_first(self,username:str) -> bool:
+        return await run_blocking(self._has,username)
+
+
+class SqliteLobbyTable:
+    """game.json / drotic.json as a lobby table, see lobby_store.LobbyTable.
+
+    Claims run under BEGIN IMMEDIATE, so workers sharing the file never
+    seat two users in the same place. Matching takes the oldest waiting
+    lobby of the bet through the partial waiting index, the user's lobbies
+    are found through the players table. Lobbies are allocated on demand,
+    recycled into the free list while it holds fewer than `max_free`
+    (None: no limit) and `warm` empty ones are made ready on start.
+    """
+    def __init__(self,db:SqliteDatabase,table:str = "game",on_change:Optional[Callable[[str],None]] = None,
+                 empty:Callable[[str],dict] = empty_lobby,warm:int = 0,max_free:Optional[int] = None):
+        if table not in LOBBY_TABLES:
+            raise ValueError(f"Unknown lobby table {table}")
+        self.db = db
+        self.table = table
+        self.on_change = on_change
+        self.empty = empty
+        self.max_free = max_free
+        self.fill(warm - self.free_count())
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def changed(self,id_:str):
+        if self.on_change is not None:
+            self.on_change(id_)
+
+    def _load(self,conn,id_:str) -> Optional[dict]:
+        row = conn.execute(f"SELECT record FROM {self.table} WHERE id = ?",(id_,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _insert(self,conn,game:dict):
+        conn.execute(f"INSERT INTO {self.table} (id, bet, seats, record) VALUES (?, ?, ?, ?)",
+                     (game["id"],game["bet"],len(game["players"]),json.dumps(game)))
+        for player in game["players"]:
+            conn.execute(f"INSERT OR IGNORE INTO {self.table}_players (username, id) VALUES (?, ?)",(player,game["id"]))
+
+    def _store(self,conn,game:dict):
+        conn.execute(f"UPDATE {self.table} SET bet = ?, seats = ?, record = ? WHERE id = ?",
+                     (game["bet"],len(game["players"]),json.dumps(game),game["id"]))
+
+    def _seat(self,conn,game:dict,username:str):
+        game["players"].append(username)
+        self._store(conn,game)
+        conn.execute(f"INSERT OR IGNORE INTO {self.table}_players (username, id) VALUES (?, ?)",(username,game["id"]))
+
+    def _delete(self,conn,id_:str):
+        conn.execute(f"DELETE FROM {self.table} WHERE id = ?",(id_,))
+        conn.execute(f"DELETE FROM {self.table}_players WHERE id = ?",(id_,))
+
+    def free_count(self) -> int:
+        return self.db.execute(f"SELECT COUNT(*) FROM {self.table} WHERE seats = 0").fetchone()[0]
+
+    def fill(self,count:int) -> int:
+        """Add `count` empty lobbies in one transaction."""
+        if count <= 0:
+            return 0
+        with self.db.transaction() as conn:
+            for _ in range(count):
+                self._insert(conn,self.empty(str(uuid.uuid4())))
+        return count
+
+    def get(self,id_:str) -> Optional[dict]:
+        return self._load(self.db.connection(),id_)
+
+    def values(self) -> list:
+        return [json.loads(row[0]) for row in self.db.execute(f"SELECT record FROM {self.table}")]
+
+    def add(self,record:dict) -> str:
+        with self.db.transaction() as conn:
+            self._delete(conn,record["id"])
+            self._insert(conn,record)
+        self.changed(record["id"])
+        return record["id"]
+
+    def remove(self,id_:str) -> bool:
+        with self.db.transaction() as conn:
+            if self._load(conn,id_) is None:
+                return False
+            self._delete(conn,id_)
+        self.changed(id_)
+        return True
+
+    def _recycle(self,conn,id_:str):
+        conn.execute(f"DELETE FROM {self.table}_players WHERE id = ?",(id_,))
+        free = conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE seats = 0").fetchone()[0]
+        if self.max_free is not None and free >= self.max_free:
+            conn.execute(f"DELETE FROM {self.table} WHERE id = ?",(id_,))
+        else:
+            self._store(conn,self.empty(id_))
+
+    def recycle(self,id_:str) -> bool:
+        """Empty a lobby and put it back on the free list (or drop it once that is full)."""
+        with self.db.transaction() as conn:
+            if self._load(conn,id_) is None:
+                return False
+            self._recycle(conn,id_)
+        self.changed(id_)
+        return True
+
+    def player_lobby(self,username:str) -> Optional[dict]:
+        row = self.db.execute(f"SELECT g.record FROM {self.table}_players p JOIN {self.table} g ON g.id = p.id "
+                              "WHERE p.username = ? LIMIT 1",(username,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def is_playing(self,username:str) -> bool:
+        return self.db.execute(f"SELECT 1 FROM {self.table}_players WHERE username = ? LIMIT 1",(username,)).fetchone() is not None
+
+    def _match(self,conn,username:str,bet:int) -> Optional[str]:
+        # oldest waiting lobby with the same bet that the user does not own
+        row = conn.execute(f"SELECT record FROM {self.table} WHERE seats = 1 AND bet = ? AND id NOT IN "
+                           f"(SELECT id FROM {self.table}_players WHERE username = ?) ORDER BY rowid LIMIT 1",
+                           (bet,username)).fetchone()
+        if row is None:
+            return None
+        game = json.loads(row[0])
+        self._seat(conn,game,username)
+        return game["id"]
+
+    def _open(self,conn,username:str,bet:int) -> str:
+        row = conn.execute(f"SELECT id FROM {self.table} WHERE seats = 0 ORDER BY rowid LIMIT 1").fetchone()
+        if row is None:
+            game = self.empty(str(uuid.uuid4()))
+            self._insert(conn,game)
+        else:
+            game = self._load(conn,row[0])
+        game["bet"] = bet
+        self._seat(conn,game,username)
+        return game["id"]
+
+    def match(self,username:str,bet:int) -> Optional[str]:
+        with self.db.transaction() as conn:
+            id_ = self._match(conn,username,bet)
+        if id_ is not None:
+            self.changed(id_)
+        return id_
+
+    def open(self,username:str,bet:int) -> str:
+        with self.db.transaction() as conn:
+            id_ = self._open(conn,username,bet)
+        self.changed(id_)
+        return id_
+
+    def match_or_open(self,username:str,bet:int) -> Tuple[str,bool]:
+        """match, else open, in one transaction: (lobby id, whether a waiting lobby was joined)."""
+        with self.db.transaction() as conn:
+            id_ = self._match(conn,username,bet)
+            joined = id_ is not None
+            if not joined:
+                id_ = self._open(conn,username,bet)
+        self.changed(id_)
+        return id_,joined
+
+    def join(self,id_:str,username:str,bet:int) -> bool:
+        with self.db.transaction() as conn:
+            game = self._load(conn,id_)
+            if game is None:
+                raise KeyError(id_)
+            if len(game["players"]) != 1 or username in game["players"] or game["bet"] != bet:
+                return False
+            self._seat(conn,game,username)
+        self.changed(id_)
+        return True
+
+    def _release(self,id_:str,username:str,players:int) -> bool:
+        with self.db.transaction() as conn:
+            game = self._load(conn,id_)
+            if game is None or len(game["players"]) != players or username not in game["players"]:
+                return False
+            self._recycle(conn,id_)
+        self.changed(id_)
+        return True
+
+    def cancel(self,id_:str,username:str) -> bool:
+        return self._release(id_,username,1)
+
+    def reset(self,id_:str,username:str) -> bool:
+        return self._release(id_,username,2)
+
+    def _update(self,id_:str,change:Callable[[dict],bool]) -> bool:
+        with self.db.transaction() as conn:
+            game = self._load(conn,id_)
+            if game is None or not change(game):
+                return False
+            self._store(conn,game)
+        self.changed(id_)
+        return True
+
+    def set_winner(self,id_:str,username:str) -> bool:
+        def change(game:dict) -> bool:
+            if len(game["players"]) != 2 or username not in game["players"] or game.get("winner","") != "":
+                return False
+            game["winner"] = username
+            return True
+        return self._update(id_,change)
+
+    def set_result(self,id_:str,username:str,result:int) -> bool:
+        def change(game:dict) -> bool:
+            game[f"result_{username}"] = result
+            return True
+        return self._update(id_,change)
+
+    def append_to(self,id_:str,key:str,value) -> bool:
+        def change(game:dict) -> bool:
+            game.setdefault(key,[]).append(value)
+            return True
+        return self._update(id_,change)
+
+
+class SqliteRepository:
+    """data_second_game.json as a table of id -> record, see lobby_store.LobbyRepository."""
+    def __init__(self,db:SqliteDatabase,table:str = "data_second_game"):
+        self.db = db
+        self.table = table
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def get(self,id_:str) -> Optional[dict]:
+        row = self.db.execute(f"SELECT record FROM {self.table} WHERE id = ?",(id_,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def values(self) -> list:
+        return [json.loads(row[0]) for row in self.db.execute(f"SELECT record FROM {self.table}")]
+
+    def add(self,record:dict) -> str:
+        self.db.execute(f"INSERT OR REPLACE INTO {self.table} (id, username, record) VALUES (?, ?, ?)",
+                        (record["id"],record.get("username"),json.dumps(record)))
+        return record["id"]
+
+    def remove(self,id_:str) -> bool:
+        return self.db.execute(f"DELETE FROM {self.table} WHERE id = ?",(id_,)).rowcount > 0
+
+    def append_to(self,id_:str,key:str,value) -> bool:
+        with self.db.transaction():
+            record = self.get(id_)
+            if record is None:
+                return False
+            record.setdefault(key,[]).append(value)
+            self.add(record)
+            return True
+
+
+class SqliteLogSink:
+    """The server error log as the logs table, see log_sink.LogSink.
+
+    `write` only queues the record; a background thread inserts queued
+    records in batches, one transaction per batch. Cursors are the last
+    sequence number read.
+    """
+    def __init__(self,db:SqliteDatabase,max_queue:int = 10000,flush_interval:float = 0.5):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize = max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self,error:str,**fields) -> bool:
+        record = {"time":str(datetime.now()),"error":error,"id":str(uuid.uuid4())}
+        record.update(fields)
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def insert(self,records:List[dict]):
+        with self.db.transaction() as conn:
+            conn.executemany("INSERT INTO logs (date, record) VALUES (?, ?)",
+                             [(str(record.get("time",""))[:10],json.dumps(record,default = str,ensure_ascii = False)) for record in records])
+
+    def _take(self,batch:List[dict]) -> List[dict]:
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def drain(self):
+        batch = self._take([])
+        if batch:
+            self.insert(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout = self.flush_interval)
+            except queue.Empty:
+                continue
+            try:
+                # the oldest record leads its batch, one transaction per batch
+                self.insert(self._take([first]))
+            except Exception as e:
+                print(f"Error while writing logs : {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target = self._run,name = "log-sink",daemon = True)
+            self._thread.start()
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.drain()
+
+    def records(self,date:Optional[str] = None) -> Iterator[dict]:
+        if date is None:
+            rows = self.db.execute("SELECT record FROM logs ORDER BY seq")
+        else:
+            rows = self.db.execute("SELECT record FROM logs WHERE date = ? ORDER BY seq",(date,))
+        for row in rows:
+            yield json.loads(row[0])
+
+    def read(self,cursor:Optional[str] = None,limit:int = 100) -> Tuple[List[dict],Optional[str]]:
+        """A page of records after `cursor`, and the cursor to continue from."""
+        seq = int(cursor) if cursor else 0
+        rows = self.db.execute("SELECT seq, record FROM logs WHERE seq > ? ORDER BY seq LIMIT ?",(seq,limit)).fetchall()
+        if rows:
+            seq = rows[-1][0]
+        return [json.loads(row[1]) for row in rows],str(seq)
+
+
+def import_json(db:SqliteDatabase,data_dir:str,logs_dir:Optional[str] = None) -> List[str]:
+    """Copy the data/*.json files into `db`, one transaction for all of them.
+
+    Rows that already exist are kept, so running it again only adds what
+    is new. Duplicate stats entries keep the first one, which is the one
+    the JSON backend reads and updates.
+    """
+    from json_store import read_json
+    from log_sink import LogSink
+    def load(name:str,default):
+        return read_json(os.path.join(data_dir,name),default)
+    applied = []
+    with db.transaction() as conn:
+        def insert(table:str,sql:str,rows:list):
+            count = sum(conn.execute(sql,row).rowcount for row in rows)
+            applied.append(f"{table}: {count} of {len(rows)}")
+        bank = load("bank.json",{})
+        opened = [username for username,balance in bank.items()
+                  if conn.execute("INSERT OR IGNORE INTO bank (username, balance) VALUES (?, ?)",(username,balance)).rowcount]
+        conn.executemany("INSERT INTO ledger (time, op, username, amount, balance) VALUES (?, 'NEW', ?, ?, ?)",
+                         [(time.time(),username,bank[username],bank[username]) for username in opened])
+        applied.append(f"bank: {len(opened)} of {len(bank)}")
+        insert("stats","INSERT OR IGNORE INTO stats (user_id, wins, total_games) VALUES (?, ?, ?)",
+               [(user["user_id"],user["wins"],user["total_games"]) for user in load("stats.json",[])])
+        insert("sogl","INSERT OR IGNORE INTO sogl (username, accepted) VALUES (?, ?)",
+               [(username,int(bool(state))) for username,state in load("sogl.json",{}).items()])
+        insert("first_vznos","INSERT OR IGNORE INTO first_vznos (username, amount) VALUES (?, ?)",
+               list(load("first_vznos.json",{}).items()))
+        for table,name in (("game","game.json"),("drotic","drotic.json")):
+            games = load(name,[])
+            insert(table,f"INSERT OR IGNORE INTO {table} (id, bet, seats, record) VALUES (?, ?, ?, ?)",
+                   [(game["id"],game["bet"],len(game["players"]),json.dumps(game)) for game in games])
+            conn.executemany(f"INSERT OR IGNORE INTO {table}_players (username, id) VALUES (?, ?)",
+                             [(player,game["id"]) for game in games for player in game["players"]])
+        games = [dict(game,id = game.get("id") or str(uuid.uuid4())) for game in load("data_second_game.json",[])]
+        insert("data_second_game","INSERT OR IGNORE INTO data_second_game (id, username, record) VALUES (?, ?, ?)",
+               [(game["id"],game.get("username"),json.dumps(game)) for game in games])
+        # logs have no key to compare, they are only copied into an empty table
+        if conn.execute("SELECT 1 FROM logs LIMIT 1").fetchone() is not None:
+            applied.append("logs: 0, table not empty")
+            return applied
+        # logs.json records carry the message as "log", those of the NDJSON sink as "error"
+        logs = [dict(record,error = record.get("error",record.get("log",""))) for record in load("logs.json",[])]
+        for record in logs:
+            record.pop("log",None)
+        if logs_dir is not None and os.path.isdir(logs_dir):
+            logs.extend(LogSink(logs_dir).records())
+        conn.executemany("INSERT INTO logs (date, record) VALUES (?, ?)",
+                         [(str(record.get("time",""))[:10],json.dumps(record,default = str,ensure_ascii = False)) for record in logs])
+        applied.append(f"logs: {len(logs)}")
+    return applied
+
+
+if __name__ == "__main__":
+    # python sqlite_store.py <data dir> <database file>, once per deployment
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "../data"
+    db = SqliteDatabase(sys.argv[2] if len(sys.argv) > 2 else os.path.join(data_dir,"ludice.db"))
+    for step in import_json(db,data_dir,os.path.join(data_dir,"logs")):
+        print(step)
+    db.close()
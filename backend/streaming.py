@@ -0,0 +1,66 @@
+import json
+from typing import Any,Iterable,Iterator,Tuple
+from fastapi.responses import StreamingResponse
+
+# Bulk responses are written while their source (a file, a store, a SQL
+# cursor) is still being read, so peak memory is one chunk instead of the
+# whole result plus its encoded copy. Sync iterators are consumed by
+# Starlette in its thread pool, so blocking reads stay off the event loop.
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _encode(value:Any) -> str:
+    return json.dumps(value,default = str,ensure_ascii = False,separators = (",",":"))
+
+
+def _chunked(parts:Iterable[str]) -> Iterator[bytes]:
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def ndjson_lines(items:Iterable[Any]) -> Iterator[bytes]:
+    return _chunked(_encode(item) + "\n" for item in items)
+
+
+def json_array_chunks(items:Iterable[Any]) -> Iterator[bytes]:
+    def parts():
+        yield "["
+        separator = ""
+        for item in items:
+            yield separator + _encode(item)
+            separator = ","
+        yield "]"
+    return _chunked(parts())
+
+
+def json_object_chunks(pairs:Iterable[Tuple[str,Any]]) -> Iterator[bytes]:
+    def parts():
+        yield "{"
+        separator = ""
+        for key,value in pairs:
+            yield separator + _encode(str(key)) + ":" + _encode(value)
+            separator = ","
+        yield "}"
+    return _chunked(parts())
+
+
+def ndjson_response(items:Iterable[Any]) -> StreamingResponse:
+    return StreamingResponse(ndjson_lines(items),media_type = "application/x-ndjson")
+
+
+def json_array_response(items:Iterable[Any]) -> StreamingResponse:
+    return StreamingResponse(json_array_chunks(items),media_type = "application/json")
+
+
+def json_object_response(pairs:Iterable[Tuple[str,Any]]) -> StreamingResponse:
+    return StreamingResponse(json_object_chunks(pairs),media_type = "application/json")
@@ -33,6 +33,7 @@ async def main():
         # Initialize bot with the custom session
         bot = Bot(TOKEN, session=bot_session)
         dp = Dispatcher()
+        dp.startup.register(private_user.on_startup)
 
         dp.include_router(start_router)
         dp.include_router(game_router)
@@ -0,0 +1,80 @@
+import hashlib
+import hmac
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Any
+
+# Shared by the API and the bot: backend/signing.py and
+# frontend/common/signing.py must stay identical.
+#
+# Signatures are HMAC-SHA256 over
+#   json.dumps(data without "signature", sort_keys=True, separators=(',',':'))
+# canonical() produces exactly that string for flat request bodies without
+# going through the generic encoder, and every key gets one pre-keyed HMAC
+# that is copied per message instead of being keyed again.
+
+INF = float("inf")
+
+_prefixes = {}
+_macs = {}
+
+
+def _plain(value:Any) -> Any:
+    if hasattr(value,"model_dump"):
+        return value.model_dump()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+_dumps = json.JSONEncoder(sort_keys=True,separators=(',',':'),default=_plain).encode
+
+
+def _key_prefixes(keys:tuple) -> list:
+    # '"key":' for every signed field, in sorted order; request bodies only
+    # come in a handful of shapes so this is built once per shape
+    prefixes = _prefixes.get(keys)
+    if prefixes is None:
+        if len(_prefixes) > 1024:
+            _prefixes.clear()
+        prefixes = _prefixes[keys] = [(key,encode_basestring_ascii(key) + ":") for key in sorted(keys) if key != "signature"]
+    return prefixes
+
+
+def _value(value:Any) -> str:
+    cls = type(value)
+    if cls is str:
+        return encode_basestring_ascii(value)
+    if cls is int:
+        return int.__repr__(value)
+    if cls is float and value == value and value != INF and value != -INF:
+        return float.__repr__(value)
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if value is None:
+        return "null"
+    return _dumps(value)
+
+
+def canonical(data:Any) -> str:
+    # a dict or a flat pydantic model (its field values live in __dict__)
+    fields = data if isinstance(data,dict) else vars(data)
+    return "{" + ",".join([prefix + _value(fields[key]) for key,prefix in _key_prefixes(tuple(fields))]) + "}"
+
+
+def keyed(key:str):
+    mac = _macs.get(key)
+    if mac is None:
+        if len(_macs) > 8:
+            _macs.clear()
+        mac = _macs[key] = hmac.new(key.encode(),digestmod=hashlib.sha256)
+    return mac
+
+
+def sign(key:str,data:Any) -> str:
+    mac = keyed(key).copy()
+    mac.update(canonical(data).encode())
+    return mac.hexdigest()
+
+
+def verify(key:str,data:Any,signature:str) -> bool:
+    return hmac.compare_digest(signature,sign(key,data))
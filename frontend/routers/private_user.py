@@ -29,6 +29,8 @@ backend_session: aiohttp.ClientSession = None
 
 # Legal text import
 from common.legal_text import TERMS_FULL
+from common.secrets_store import SecretsFile
+from common import signing
 
 # Gamling reminder function
 GAMBLING_REMINDER = """
@@ -48,27 +50,33 @@ async def show_gambling_reminder(message):
 secrets_path = "/Users/vikrorkhanin/Ludice/data/secrets.json"
 load_dotenv(find_dotenv())
 secret_token = os.getenv("secret_token")
+# Kept in memory and reloaded when secrets.json changes or on SIGHUP
+secrets_file = SecretsFile(secrets_path)
+
+
+async def on_startup():
+    """Bot startup hook: reload secrets.json on SIGHUP."""
+    secrets_file.install_sighup()
+
 def get_key_for_api() -> str:
     try:
-        with open(secrets_path,"r") as file:
-            data = json.load(file)
-        return data["key"]  
+        return secrets_file.get("key")
     except Exception as e:
         print(f"Error while geting api key : {e}")
         raise TypeError("Error")
 
 def get_api_key_for_get_request() -> str:
     try:
-        with open(secrets_path,"r") as file:
-            data = json.load(file)
-        return data["x-api-normal"]    
+        return secrets_file.get("x-api-normal")
     except Exception as e:
         print(f"Error while getting api key : {e}")
         raise TypeError("API Error")    
-# System secret for API signature verification
-SYSTEM_SECRET = get_key_for_api()
 BACKEND_API_URL = "http://127.0.0.1:8000"
 
+# Long-poll window per request; the backend answers earlier as soon as the lobby changes
+LONG_POLL_WAIT = 25.0
+LONG_POLL_TIMEOUT = aiohttp.ClientTimeout(total=LONG_POLL_WAIT + 10)
+
 # State groups
 class BetStates(StatesGroup):
     waiting_for_bet = State()
@@ -95,21 +103,11 @@ legal_router = Router()
 # Helper functions
 def generate_signature(data: dict) -> str:
     """Generate HMAC-SHA256 signature for API requests."""
-    # Create a copy without signature field
-    data_to_sign = data.copy()
-    data_to_sign.pop("signature", None)
-    
-    # Serialize with sorted keys and no spaces
-    data_str = json.dumps(data_to_sign, sort_keys=True, separators=(',', ':'))
+    # The key is read per call, so a rotated key is used right away
+    key = get_key_for_api()
 
-    # Generate HMAC signature
-    signature = hmac.new(
-        SYSTEM_SECRET.encode(),
-        data_str.encode(),
-        hashlib.sha256
-    ).hexdigest()
-
-    return signature
+    # Sorted-key compact JSON without the signature field, signed with a pre-keyed HMAC
+    return signing.sign(key, data)
 
 
 def get_legal_nav_keyboard() -> InlineKeyboardMarkup:
@@ -521,33 +519,45 @@ async def process_bet(message: types.Message, state: FSMContext):
         await state.clear()
 
 
+def lobby_fill_request(game_id: str, remaining: float) -> dict:
+    """Build the signed /wait/lobby/fill body for the time left in the search."""
+    # The backend parses wait as a float and signs what it parsed,
+    # so an int here (25 instead of 25.0) would never verify
+    data = {
+        "lobby_id": game_id,
+        "wait": float(min(LONG_POLL_WAIT, max(remaining, 0))),
+        "timestamp": time.time()
+    }
+    data["signature"] = generate_signature(data)
+    return data
+
+
 async def poll_for_opponent(message: types.Message, state: FSMContext, game_id: str):
-    """Poll backend to check if opponent has joined the lobby."""
+    """Wait on the backend long-poll until an opponent joins the lobby."""
     bot = message.bot
     max_wait_time = 300  # 5 minutes
-    poll_interval = 2  # 2 seconds
-
-    for _ in range(max_wait_time // poll_interval):
-        await asyncio.sleep(poll_interval)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait_time
 
+    while loop.time() < deadline:
         # Check if user cancelled search
         current_state = await state.get_state()
         if current_state != BetStates.waiting_for_opponent:
             return
 
         try:
-            # Check if lobby is full (2 players)
-            data = {
-                "lobby_id": game_id,
-                "timestamp": time.time()
-            }
-            data["signature"] = generate_signature(data)
+            # Blocks on the backend until the lobby is full (2 players) or the window ends
+            data = lobby_fill_request(game_id, deadline - loop.time())
 
             async with backend_session.post(
-                f"{BACKEND_API_URL}/check/lobby/fill",
+                f"{BACKEND_API_URL}/wait/lobby/fill",
                 json=data,
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                timeout=LONG_POLL_TIMEOUT
             ) as response:
+                # The search may have been cancelled while we were waiting
+                if await state.get_state() != BetStates.waiting_for_opponent:
+                    return
                 if response.status == 200:
                     is_full = await response.json()
 
@@ -576,9 +586,12 @@ async def poll_for_opponent(message: types.Message, state: FSMContext, game_id:
                     )
                     await state.clear()
                     return
+                else:
+                    await asyncio.sleep(2)
 
         except Exception as e:
             print(f"Polling error: {e}")
+            await asyncio.sleep(2)
             continue
 
     # Timeout - cancel search and refund bet
@@ -729,32 +742,32 @@ async def roll_dice(callback: types.CallbackQuery, state: FSMContext):
 
 
 async def poll_for_game_result(message: types.Message, state: FSMContext, game_id: str, user_roll: int):
-    """Poll backend to check if both players have rolled and determine winner."""
+    """Wait on the backend long-poll until both players have rolled and determine winner."""
     bot = message.bot
     user_id = str(message.from_user.id)
     max_wait = 60  # 1 minute
-    poll_interval = 2
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait
 
-    for _ in range(max_wait // poll_interval):
-        await asyncio.sleep(poll_interval)
-
-        # Check game results from backend
+    while loop.time() < deadline:
+        # Blocks on the backend until both results are written or the window ends
         try:
+            wait = min(LONG_POLL_WAIT, max(deadline - loop.time(), 0))
             async with backend_session.get(
-                f"{BACKEND_API_URL}/get/game/result/{game_id}",
-                headers={"X-API-Key": get_api_key_for_get_request()}
+                f"{BACKEND_API_URL}/wait/game/result/{game_id}",
+                params={"wait": wait},
+                headers={"X-API-Key": get_api_key_for_get_request()},
+                timeout=LONG_POLL_TIMEOUT
             ) as response:
                 if response.status == 200:
                     result_data = await response.json()
                     winner = result_data["winner"]
 
-                    # results for both players
-                    my_res = result_data[f"result_{user_id}"]
-                    print("DEBUDG")
-                    print(my_res)
+                    # results for both players, keyed by player id
+                    my_res = result_data[user_id]
                     def get_except() -> str:
                         for key in result_data.keys():
-                            if key != my_res and key != "winner":
+                            if key != user_id and key != "winner":
                                 return result_data[key]
                         return None
                     opponent_res = get_except()
@@ -824,9 +837,13 @@ async def poll_for_game_result(message: types.Message, state: FSMContext, game_i
                         await bot.send_message(message.chat.id, outcome_msg)
 
                     return  # Exit polling loop after processing result
+                else:
+                    # Not rolled yet after the whole window, or an error; back off briefly
+                    await asyncio.sleep(2)
 
         except Exception as e:
             print(f"Error polling game result: {e}")
+            await asyncio.sleep(2)
             continue
         # Timeout
     await bot.send_message(
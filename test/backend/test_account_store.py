@@ -0,0 +1,120 @@
+"""
+Account Store Tests for Ludicé API.
+
+Tests the in-memory bank.json store and its write-behind persistence.
+"""
+
+import pytest
+import json
+
+from account_store import AccountStore
+
+
+pytestmark = pytest.mark.backend
+
+
+@pytest.fixture
+def bank_file(tmp_path):
+    """Create a bank.json in the legacy {username: balance} format."""
+    path = tmp_path / "bank.json"
+    with open(path, "w") as f:
+        json.dump({"player1": 150, "player2": 20}, f)
+    return path
+
+
+class TestAccountReads:
+    """Test reads served from memory."""
+
+    def test_loads_existing_balances(self, bank_file):
+        """Test that balances are loaded once from disk."""
+        store = AccountStore(str(bank_file))
+
+        assert store.get("player1") == 150
+        assert store.get("missing") is None
+        assert store.exists("player2")
+        assert store.total() == 170
+
+    def test_missing_file_starts_empty(self, tmp_path):
+        """Test that a missing bank.json starts an empty store."""
+        store = AccountStore(str(tmp_path / "bank.json"))
+
+        assert store.total() == 0
+        assert not store.exists("player1")
+
+
+class TestAccountWrites:
+    """Test balance mutations."""
+
+    def test_default_balance_only_once(self, bank_file):
+        """Test that the default credit is not given twice."""
+        store = AccountStore(str(bank_file))
+
+        assert store.set_default("new_user", 100) is True
+        assert store.set_default("new_user", 100) is False
+        assert store.get("new_user") == 100
+        assert store.total() == 270
+
+    def test_increase_and_decrease(self, bank_file):
+        """Test increasing and decreasing a balance."""
+        store = AccountStore(str(bank_file))
+
+        assert store.increase("player2", 30) == 50
+        assert store.decrease("player2", 40) is True
+        assert store.decrease("player2", 40) is False
+        assert store.get("player2") == 10
+        assert store.total() == 160
+
+    def test_unknown_user_raises(self, bank_file):
+        """Test that mutating an unknown user raises KeyError."""
+        store = AccountStore(str(bank_file))
+
+        with pytest.raises(KeyError):
+            store.increase("ghost", 10)
+        with pytest.raises(KeyError):
+            store.decrease("ghost", 10)
+
+    def test_reset_and_delete(self, bank_file):
+        """Test withdrawing everything and deleting an account."""
+        store = AccountStore(str(bank_file))
+
+        assert store.reset("player1") == 150
+        assert store.get("player1") == 0
+        assert store.delete("player2") is True
+        assert store.delete("player2") is False
+        assert store.total() == 0
+
+
+class TestWriteBehind:
+    """Test batched persistence to disk."""
+
+    def test_writes_are_deferred_until_flush(self, bank_file):
+        """Test that disk is only touched on flush."""
+        store = AccountStore(str(bank_file))
+        store.increase("player1", 50)
+
+        with open(bank_file) as f:
+            assert json.load(f)["player1"] == 150
+
+        assert store.flush() is True
+        assert store.flush() is False  # nothing dirty
+
+        with open(bank_file) as f:
+            assert json.load(f) == {"player1": 200, "player2": 20}
+
+    def test_close_flushes_pending_changes(self, bank_file):
+        """Test that closing the store persists pending changes."""
+        store = AccountStore(str(bank_file), flush_interval=60)
+        store.start()
+        store.set_default("new_user", 100)
+        store.close()
+
+        reloaded = AccountStore(str(bank_file))
+        assert reloaded.get("new_user") == 100
+
+    def test_no_temp_files_left_behind(self, bank_file):
+        """Test that the atomic rename cleans up temporary files."""
+        store = AccountStore(str(bank_file))
+        store.increase("player1", 1)
+        store.flush()
+
+        assert sorted(p.name for p in bank_file.parent.iterdir()) == ["bank.json"]
@@ -0,0 +1,56 @@
+"""
+Async I/O Tests for Ludicé API.
+
+Tests that JSON file access from handlers runs off the event loop without losing updates.
+"""
+
+import pytest
+import asyncio
+import json
+
+from async_io import edit_json, read_json, write_json
+
+
+pytestmark = pytest.mark.backend
+
+
+class TestJsonAccess:
+    """Test reading and editing JSON files through the io pool."""
+
+    async def test_read_missing_file_returns_default(self, tmp_path):
+        """Test that a missing file reads as the default."""
+        assert await read_json(str(tmp_path / "missing.json"), []) == []
+
+    async def test_write_then_read(self, tmp_path):
+        """Test a write followed by a read."""
+        path = str(tmp_path / "sogl.json")
+        await write_json(path, {"player1": True})
+
+        assert await read_json(path, {}) == {"player1": True}
+
+    async def test_concurrent_edits_are_not_lost(self, tmp_path):
+        """Test that concurrent read-modify-write edits are serialized per file."""
+        path = str(tmp_path / "stats.json")
+        await write_json(path, [{"user_id": "player1", "wins": 0, "total_games": 0}])
+
+        async def add_game():
+            async with edit_json(path, []) as data:
+                await asyncio.sleep(0)
+                data[0]["total_games"] += 1
+
+        await asyncio.gather(*(add_game() for _ in range(20)))
+
+        with open(path) as f:
+            assert json.load(f)[0]["total_games"] == 20
+
+    async def test_failed_edit_is_not_written(self, tmp_path):
+        """Test that an edit that raises leaves the file unchanged."""
+        path = str(tmp_path / "first_vznos.json")
+        await write_json(path, {})
+
+        with pytest.raises(ValueError):
+            async with edit_json(path, {}) as data:
+                data["player1"] = 100
+                raise ValueError("boom")
+
+        assert await read_json(path, {}) == {}
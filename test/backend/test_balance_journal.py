@@ -0,0 +1,199 @@
+"""
+Balance Journal Tests for Ludicé API.
+
+Tests the write-ahead journal, crash recovery and snapshot compaction.
+"""
+
+import pytest
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import balance_journal
+from account_store import AccountStore
+from balance_journal import BalanceJournal, parse_record
+
+
+pytestmark = pytest.mark.backend
+
+
+@pytest.fixture
+def bank_file(tmp_path):
+    """Create a bank.json snapshot."""
+    path = tmp_path / "bank.json"
+    with open(path, "w") as f:
+        json.dump({"player1": 100}, f)
+    return path
+
+
+@pytest.fixture
+def open_store(bank_file):
+    """Open account stores with a journal next to bank.json; all are closed on teardown."""
+    opened = []
+
+    def open_():
+        journal = BalanceJournal(str(bank_file) + ".journal")
+        store = AccountStore(str(bank_file), flush_interval=60, journal=journal)
+        opened.append((store, journal))
+        return store, journal
+    yield open_
+    for store, journal in reversed(opened):
+        store.close()
+        journal.close()
+
+
+@pytest.fixture
+def journal(tmp_path):
+    """A journal without a store."""
+    journal = BalanceJournal(str(tmp_path / "bank.json.journal"))
+    yield journal
+    journal.close()
+
+
+class TestJournalFormat:
+    """Test the fixed-format journal records."""
+
+    def test_record_round_trip(self, journal, tmp_path):
+        """Test that an appended record can be parsed back."""
+        journal.append("INC", "player1", 25, 125)
+        journal.close()
+
+        with open(tmp_path / "bank.json.journal") as f:
+            line = f.readline()
+
+        assert parse_record(line) == (1, "INC", 25, 125, "player1")
+
+    def test_torn_record_is_rejected(self):
+        """Test that a record without its newline is treated as torn."""
+        assert parse_record("000000000001 INC +000000000025 +0000000") is None
+        assert parse_record("garbage\n") is None
+
+    def test_unknown_operation_rejected(self, journal):
+        """Test that only known operations are journaled."""
+        with pytest.raises(ValueError):
+            journal.append("XXX", "player1", 1, 1)
+
+
+class TestRecovery:
+    """Test replaying the journal tail on startup."""
+
+    def test_replay_after_crash(self, open_store, bank_file):
+        """Test that unflushed changes survive a restart."""
+        store, journal = open_store()
+        store.increase("player1", 50)
+        store.set_default("player2", 100)
+        store.decrease("player2", 30)
+        journal.close()  # crash: bank.json never rewritten
+
+        with open(bank_file) as f:
+            assert json.load(f) == {"player1": 100}
+
+        recovered, _ = open_store()
+        assert recovered.get("player1") == 150
+        assert recovered.get("player2") == 70
+        assert recovered.total() == 220
+
+    def test_replay_stops_at_torn_tail(self, open_store, bank_file):
+        """Test that a half-written last record is ignored."""
+        store, journal = open_store()
+        store.increase("player1", 10)
+        journal.close()
+        with open(str(bank_file) + ".journal", "a") as f:
+            f.write("000000000002 INC +000000000500")
+
+        recovered, _ = open_store()
+        assert recovered.get("player1") == 110
+
+    def test_sequence_continues_after_restart(self, open_store):
+        """Test that sequence numbers keep growing across restarts."""
+        store, journal = open_store()
+        store.increase("player1", 1)
+        journal.close()
+
+        _, journal = open_store()
+        assert journal.append("INC", "player1", 1, 102) == 2
+
+
+class TestGroupCommit:
+    """Test that a change is on disk when the call returns."""
+
+    def test_acknowledged_change_survives_process_exit(self, open_store, bank_file):
+        """Test that a process dying right after the calls loses nothing."""
+        script = (
+            "import os, sys\n"
+            f"sys.path.insert(0, {os.path.dirname(balance_journal.__file__)!r})\n"
+            "from account_store import AccountStore\n"
+            "from balance_journal import BalanceJournal\n"
+            f"store = AccountStore({str(bank_file)!r}, flush_interval=60, "
+            f"journal=BalanceJournal({str(bank_file) + '.journal'!r}))\n"
+            "store.set_default('player2', 100)\n"
+            "store.increase('player2', 25)\n"
+            "os._exit(0)\n"
+        )
+        subprocess.run([sys.executable, "-c", script], check=True)
+
+        recovered, _ = open_store()
+        assert recovered.get("player2") == 125
+
+    def test_concurrent_changes_share_fsyncs(self, open_store, monkeypatch):
+        """Test that changes written during an fsync are synced by one later fsync."""
+        fsyncs = []
+        fsync = os.fsync
+
+        def slow_fsync(fd):
+            fsyncs.append(fd)
+            time.sleep(0.02)
+            fsync(fd)
+        monkeypatch.setattr(balance_journal.os, "fsync", slow_fsync)
+        store, journal = open_store()
+        threads = [threading.Thread(target=store.increase, args=("player1", 1)) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert store.get("player1") == 116
+        assert journal.synced == journal.seq == 16
+        assert len(fsyncs) < 16
+
+
+class TestCompaction:
+    """Test folding the journal into a bank.json snapshot."""
+
+    def test_flush_writes_snapshot_and_drops_segments(self, open_store, bank_file):
+        """Test that compaction rewrites bank.json and empties the journal."""
+        store, journal = open_store()
+        store.increase("player1", 5)
+        store.flush()
+
+        with open(bank_file) as f:
+            assert json.load(f) == {"player1": 105}
+        assert journal.segments() == []
+
+        store.increase("player1", 5)
+        journal.close()
+        recovered, _ = open_store()
+        assert recovered.get("player1") == 110
+
+    def test_leftover_segment_is_replayed(self, open_store):
+        """Test recovery when a crash happens between rotation and snapshot."""
+        store, journal = open_store()
+        store.increase("player1", 7)
+        journal.rotate()  # segment renamed, snapshot never written
+        store.increase("player1", 3)
+        journal.close()
+
+        recovered, _ = open_store()
+        assert recovered.get("player1") == 110
+
+    def test_deleted_account_stays_deleted(self, open_store):
+        """Test that deletions are replayed."""
+        store, journal = open_store()
+        store.delete("player1")
+        journal.close()
+
+        recovered, _ = open_store()
+        assert not recovered.exists("player1")
@@ -0,0 +1,121 @@
+"""
+Leaderboard Tests for Ludicé API.
+
+Tests the ranked boards behind /get/leader/board/most_games and /get/procent/wins.
+"""
+
+import pytest
+
+from leaderboard import Leaderboard, RedisLeaderboard, procent
+
+
+pytestmark = pytest.mark.backend
+
+
+class FakePipeline:
+    """Collects sorted set commands and runs them on execute."""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def zadd(self, key, mapping):
+        self.commands.append(lambda: self.client.zadd(key, mapping))
+
+    def zincrby(self, key, amount, member):
+        self.commands.append(lambda: self.client.zincrby(key, amount, member))
+
+    def zrem(self, key, member):
+        self.commands.append(lambda: self.client.zrem(key, member))
+
+    def execute(self):
+        return [command() for command in self.commands]
+
+
+class FakeRedis:
+    """Just enough of the sorted set commands."""
+
+    def __init__(self):
+        self.sets = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def zadd(self, key, mapping):
+        self.sets.setdefault(key, {}).update(mapping)
+
+    def zincrby(self, key, amount, member):
+        scores = self.sets.setdefault(key, {})
+        scores[member] = scores.get(member, 0) + amount
+        return scores[member]
+
+    def zrem(self, key, member):
+        self.sets.get(key, {}).pop(member, None)
+
+    def _ranked(self, key):
+        return sorted(self.sets.get(key, {}).items(), key=lambda item: (-item[1], item[0]))
+
+    def zrevrange(self, key, start, end, withscores=False):
+        ranked = self._ranked(key)
+        return ranked[start:] if end == -1 else ranked[start:end + 1]
+
+    def zrevrank(self, key, member):
+        users = [user for user, _ in self._ranked(key)]
+        return users.index(member) if member in users else None
+
+
+class TestLeaderboard:
+    """Test the in-memory boards."""
+
+    def test_top_is_ranked(self):
+        """Test that boards are ordered by score and limited to n."""
+        board = Leaderboard()
+        board.load([("player1", 10, 50), ("player2", 15, 30), ("player3", 8, 40)])
+
+        assert board.top("games") == [("player1", 50), ("player3", 40), ("player2", 30)]
+        assert board.top("wins", 1) == [("player2", 15)]
+        assert board.top("procent", 2) == [("player2", 50.0), ("player1", 20.0)]
+
+    def test_updates_move_rank(self):
+        """Test that wins and games re-rank a user."""
+        board = Leaderboard()
+        board.load([("player1", 0, 2), ("player2", 0, 1)])
+        assert board.rank("games", "player2") == 2
+
+        board.add("player2", wins=1, games=1)
+        board.add("player2", games=1)
+
+        assert board.rank("games", "player2") == 1
+        assert board.rank("wins", "player2") == 1
+        assert board.top("procent", 1) == [("player2", round(100 / 3, 2))]
+
+    def test_remove_and_unknown_user(self):
+        """Test that removed users leave every board."""
+        board = Leaderboard()
+        board.set("player1", 1, 1)
+        board.remove("player1")
+
+        assert board.rank("games", "player1") is None
+        assert board.top("games") == []
+        assert len(board) == 0
+
+    def test_procent_without_games(self):
+        """Test that a user without games is at 0%."""
+        assert procent(0, 0) == 0.0
+        assert procent(3, 7) == 42.86
+
+
+class TestRedisLeaderboard:
+    """Test the Redis sorted set boards."""
+
+    def test_add_and_rank(self):
+        """Test that increments update all boards."""
+        board = RedisLeaderboard(FakeRedis())
+        board.load([("player1", 1, 4), ("player2", 0, 0)])
+
+        board.add("player2", wins=1, games=1)
+
+        assert board.top("games") == [("player1", 4), ("player2", 1)]
+        assert board.top("procent", 1) == [("player2", 100.0)]
+        assert board.rank("wins", "player1") == 1
+        assert board.rank("wins", "player3") is None
@@ -0,0 +1,121 @@
+"""
+Lobby Event Tests for Ludicé API.
+
+Tests the long-poll wake-ups behind /wait/lobby/fill and /wait/game/result.
+"""
+
+import pytest
+import asyncio
+import json
+import threading
+
+from lobby_events import LobbyEvents
+from lobby_store import LobbyTable
+
+
+pytestmark = pytest.mark.backend
+
+
+@pytest.fixture
+def game_file(tmp_path):
+    """Create a game.json with one waiting lobby."""
+    path = tmp_path / "game.json"
+    with open(path, "w") as f:
+        json.dump([{"id": "lobby1", "players": ["player1"], "bet": 10, "winner": ""}], f)
+    return path
+
+
+class TestLongPoll:
+    """Test waiting on lobby changes."""
+
+    async def test_returns_immediately_when_ready(self):
+        """Test that a ready condition does not wait."""
+        events = LobbyEvents()
+
+        assert await events.wait_for("lobby1", lambda: True, 5) is True
+        assert events.waiting() == 0
+
+    async def test_times_out_when_nothing_changes(self):
+        """Test that the wait ends after the timeout."""
+        events = LobbyEvents()
+
+        assert await events.wait_for("lobby1", lambda: False, 0.05) is False
+        assert events.waiting() == 0
+
+    async def test_woken_when_second_player_joins(self, game_file):
+        """Test that joining the lobby wakes the waiting request."""
+        events = LobbyEvents()
+        table = LobbyTable(str(game_file), on_change=events.notify)
+
+        waiter = asyncio.create_task(
+            events.wait_for("lobby1", lambda: len(table.get("lobby1")["players"]) == 2, 5)
+        )
+        await asyncio.sleep(0.01)
+        table.match("player2", 10)
+
+        assert await asyncio.wait_for(waiter, 1) is True
+
+    async def test_other_lobbies_do_not_wake(self, game_file):
+        """Test that changes to other lobbies are ignored."""
+        events = LobbyEvents()
+        woken = []
+
+        async def wait():
+            woken.append(await events.wait_for("lobby1", lambda: False, 0.1))
+
+        task = asyncio.create_task(wait())
+        await asyncio.sleep(0.01)
+        events.notify("lobby2")
+        await task
+
+        assert woken == [False]
+
+    async def test_notify_from_another_thread(self):
+        """Test that stores mutated off the event loop can still wake waiters."""
+        events = LobbyEvents()
+        ready = []
+
+        waiter = asyncio.create_task(events.wait_for("lobby1", lambda: bool(ready), 5))
+        await asyncio.sleep(0.01)
+
+        def mutate():
+            ready.append(True)
+            events.notify("lobby1")
+
+        thread = threading.Thread(target=mutate)
+        thread.start()
+        thread.join()
+
+        assert await asyncio.wait_for(waiter, 1) is True
+
+    async def test_notify_between_check_and_wait(self):
+        """Test that a change from another thread right after the check is not missed."""
+        events = LobbyEvents()
+        ready = []
+
+        def check():
+            # the first check fails and the store changes before the waiter sleeps
+            if not ready and not hasattr(check, "done"):
+                check.done = True
+                thread = threading.Thread(target=lambda: (ready.append(True), events.notify("lobby1")))
+                thread.start()
+                thread.join()
+                return False
+            return bool(ready)
+
+        assert await asyncio.wait_for(events.wait_for("lobby1", check, 5), 1) is True
+
+    async def test_async_check_sees_change_made_while_checking(self):
+        """Test that a change made while an async check runs wakes the waiter."""
+        events = LobbyEvents()
+        ready = []
+
+        async def check():
+            # the store is read off the loop; the change lands before the read returns
+            seen = bool(ready)
+            if not ready:
+                ready.append(True)
+                await asyncio.to_thread(events.notify, "lobby1")
+            return seen
+
+        assert await asyncio.wait_for(events.wait_for("lobby1", check, 5), 1) is True
@@ -0,0 +1,349 @@
+"""
+Lobby Table Tests for Ludicé API.
+
+Tests the in-memory game.json table and its matchmaking index.
+"""
+
+import pytest
+import json
+import threading
+
+from lobby_store import LobbyRepository, LobbyTable, RedisLobbyTable, empty_drotic_lobby
+
+
+pytestmark = pytest.mark.backend
+
+
+@pytest.fixture
+def game_file(tmp_path):
+    """Create a game.json with empty, waiting and full lobbies."""
+    path = tmp_path / "game.json"
+    games = [
+        {"id": "empty1", "players": [], "bet": 0, "winner": ""},
+        {"id": "empty2", "players": [], "bet": 0, "winner": ""},
+        {"id": "wait10", "players": ["player1"], "bet": 10, "winner": ""},
+        {"id": "full", "players": ["player2", "player3"], "bet": 10, "winner": "",
+         "result_player2": 4, "result_player3": 2},
+    ]
+    with open(path, "w") as f:
+        json.dump(games, f)
+    return path
+
+
+class TestIndexRebuild:
+    """Test that the index is rebuilt from game.json."""
+
+    def test_rebuild_from_file(self, game_file):
+        """Test that waiting and free lobbies are indexed on load."""
+        table = LobbyTable(str(game_file))
+
+        assert list(table.free) == ["empty1", "empty2"]
+        assert list(table.waiting[10]) == ["wait10"]
+        assert table.get("full")["players"] == ["player2", "player3"]
+
+
+class TestMatchmaking:
+    """Test /start/game and /join/link through the index."""
+
+    def test_match_waiting_lobby_with_same_bet(self, game_file):
+        """Test joining the waiting lobby with the same bet."""
+        table = LobbyTable(str(game_file))
+
+        assert table.match("player4", 10) == "wait10"
+        assert table.get("wait10")["players"] == ["player1", "player4"]
+        assert 10 not in table.waiting
+
+    def test_no_match_for_other_bet_or_own_lobby(self, game_file):
+        """Test that other bets and the user's own lobby are skipped."""
+        table = LobbyTable(str(game_file))
+
+        assert table.match("player4", 50) is None
+        assert table.match("player1", 10) is None
+
+    def test_open_takes_free_lobby(self, game_file):
+        """Test creating a lobby from the free list."""
+        table = LobbyTable(str(game_file))
+
+        assert table.open("player4", 50) == "empty1"
+        assert list(table.waiting[50]) == ["empty1"]
+        assert table.match("player5", 50) == "empty1"
+
+    def test_open_without_free_lobby(self, game_file):
+        """Test that a lobby is allocated once the free list is empty."""
+        table = LobbyTable(str(game_file))
+        table.open("a", 1)
+        table.open("b", 2)
+
+        id_ = table.open("c", 3)
+        assert id_ not in ("empty1", "empty2")
+        assert table.get(id_)["players"] == ["c"]
+        assert table.match("d", 3) == id_
+
+    def test_match_or_open(self, game_file):
+        """Test that a waiting lobby is joined and a new one opened otherwise."""
+        table = LobbyTable(str(game_file))
+
+        assert table.match_or_open("player4", 10) == ("wait10", True)
+        assert table.match_or_open("player5", 10) == ("empty1", False)
+        assert table.match_or_open("player6", 10) == ("empty1", True)
+
+    def test_match_or_open_pairs_racing_players(self, game_file):
+        """Test that players racing on an empty queue end up in pairs instead of alone."""
+        table = LobbyTable(str(game_file))
+        found = []
+        threads = [threading.Thread(target=lambda i=i: found.append(table.match_or_open(f"user{i}", 50)))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(joined for _, joined in found) == [False] * 4 + [True] * 4
+        assert {len(table.get(id_)["players"]) for id_, _ in found} == {2}
+
+    def test_join_by_link(self, game_file):
+        """Test joining a specific lobby by id."""
+        table = LobbyTable(str(game_file))
+
+        assert table.join("wait10", "player4", 20) is False
+        assert table.join("wait10", "player4", 10) is True
+        assert table.join("wait10", "player5", 10) is False
+        with pytest.raises(KeyError):
+            table.join("missing", "player4", 10)
+
+
+class TestLobbyLifecycle:
+    """Test that /cancel/find, /leave and /write/winner keep the index consistent."""
+
+    def test_cancel_recycles_lobby(self, game_file):
+        """Test cancelling a waiting lobby."""
+        table = LobbyTable(str(game_file))
+
+        assert table.cancel("wait10", "player4") is False
+        assert table.cancel("wait10", "player1") is True
+        assert table.get("wait10")["players"] == []
+        assert list(table.free) == ["empty1", "empty2", "wait10"]
+        assert table.match("player4", 10) is None
+
+    def test_leave_returns_lobby_to_free_list(self, game_file):
+        """Test that leaving a full lobby resets it and frees it."""
+        table = LobbyTable(str(game_file))
+
+        assert table.reset("full", "player2") is True
+        game = table.get("full")
+        assert game["players"] == [] and game["bet"] == 0
+        assert "result_player2" not in game
+        assert "full" in table.free
+
+    def test_winner_written_once(self, game_file):
+        """Test that the winner can only be written once."""
+        table = LobbyTable(str(game_file))
+
+        assert table.set_winner("full", "player3") is True
+        assert table.set_winner("full", "player2") is False
+        assert table.get("full")["winner"] == "player3"
+
+    def test_changes_persist_on_flush(self, game_file):
+        """Test that the table is written back in the game.json format."""
+        table = LobbyTable(str(game_file))
+        table.match("player4", 10)
+        table.flush()
+
+        reloaded = LobbyTable(str(game_file))
+        assert reloaded.get("wait10")["players"] == ["player1", "player4"]
+        assert 10 not in reloaded.waiting
+
+
+class TestLobbyPool:
+    """Test on-demand allocation, the warm pool and recycling."""
+
+    def test_warm_pool_is_filled_on_load(self, tmp_path):
+        """Test that a missing game.json starts with `warm` empty lobbies."""
+        table = LobbyTable(str(tmp_path / "game.json"), warm=3)
+
+        assert len(table.free) == 3
+        assert all(table.get(id_) == {"id": id_, "players": [], "bet": 0, "winner": ""} for id_ in table.free)
+
+    def test_warm_pool_counts_existing_free_lobbies(self, game_file):
+        """Test that only the missing free lobbies are added."""
+        table = LobbyTable(str(game_file), warm=3)
+
+        assert len(table.free) == 3
+        assert list(table.free)[:2] == ["empty1", "empty2"]
+
+    def test_recycled_lobbies_are_capped(self, game_file):
+        """Test that lobbies beyond max_free are dropped instead of recycled."""
+        table = LobbyTable(str(game_file), max_free=2)
+
+        assert table.reset("full", "player2") is True
+        assert table.get("full") is None
+        assert list(table.free) == ["empty1", "empty2"]
+
+    def test_drotic_lobbies_recycle_with_empty_cache(self, tmp_path):
+        """Test that a recycled drotic lobby loses its throws."""
+        path = tmp_path / "drotic.json"
+        with open(path, "w") as f:
+            json.dump([{"id": "d1", "players": ["a"], "bet": 5, "cache": [{"username": "a"}]}], f)
+        table = LobbyTable(str(path), empty=empty_drotic_lobby)
+
+        assert table.recycle("d1") is True
+        assert table.get("d1") == {"bet": 0, "players": [], "id": "d1", "cache": []}
+        assert table.open("b", 7) == "d1"
+
+
+class TestLobbyRepository:
+    """Test the shared id -> record repository used by every game type."""
+
+    def test_drotic_throws_by_id(self, tmp_path):
+        """Test appending and reading drotic throws by lobby id."""
+        path = tmp_path / "drotic.json"
+        with open(path, "w") as f:
+            json.dump([{"id": "d1", "players": ["a", "b"], "bet": 5, "cache": []}], f)
+        table = LobbyTable(str(path))
+
+        assert table.append_to("d1", "cache", {"username": "a", "result": "7"}) is True
+        assert table.append_to("missing", "cache", {}) is False
+        assert table.get("d1")["cache"][-1] == {"username": "a", "result": "7"}
+
+    def test_reads_are_copies(self, game_file):
+        """Test that later changes do not show up in a record already read."""
+        table = LobbyTable(str(game_file))
+        game = table.get("wait10")
+        lobby = table.player_lobby("player1")
+        listed = table.values()
+
+        table.match("player4", 10)
+        table.set_result("wait10", "player1", 6)
+
+        assert game["players"] == lobby["players"] == ["player1"]
+        assert "result_player1" not in game and "result_player1" not in lobby
+        assert [g["players"] for g in listed if g["id"] == "wait10"] == [["player1"]]
+        assert table.get("wait10")["players"] == ["player1", "player4"]
+
+    def test_remove_drops_index_entry(self, game_file):
+        """Test that removing a waiting lobby also removes it from its queue."""
+        table = LobbyTable(str(game_file))
+
+        assert table.remove("wait10") is True
+        assert table.remove("wait10") is False
+        assert 10 not in table.waiting
+
+    def test_plain_repository_add_and_get(self, tmp_path):
+        """Test a repository for records without players."""
+        repo = LobbyRepository(str(tmp_path / "data_second_game.json"))
+        repo.add({"id": "g1", "username": "a", "num": 3})
+        repo.flush()
+
+        reloaded = LobbyRepository(str(tmp_path / "data_second_game.json"))
+        assert reloaded.get("g1")["num"] == 3
+
+
+@pytest.fixture
+def redis_server():
+    """One in-process Redis that runs the Lua scripts, shared by every "worker"."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    return lambda: fakeredis.FakeRedis(server=server, decode_responses=True)
+
+
+class TestRedisLobbyTable:
+    """Test the Redis lobbies behind STORAGE_LOBBIES=redis."""
+
+    def test_workers_share_the_queues(self, redis_server):
+        """Test that a lobby opened by one worker is matched by another."""
+        worker1, worker2 = RedisLobbyTable(redis_server()), RedisLobbyTable(redis_server())
+
+        id_ = worker1.open("player1", 10)
+        assert worker2.match("player1", 10) is None
+        assert worker2.match("player2", 50) is None
+        assert worker2.match("player2", 10) == id_
+        assert worker1.get(id_) == {"id": id_, "players": ["player1", "player2"], "bet": 10, "winner": ""}
+        assert worker1.match("player3", 10) is None
+
+    def test_concurrent_matches_claim_the_lobby_once(self, redis_server):
+        """Test that only one of many racing users gets the second seat."""
+        table = RedisLobbyTable(redis_server())
+        id_ = table.open("player0", 10)
+        found = []
+
+        def join(username):
+            found.append(RedisLobbyTable(redis_server()).match(username, 10))
+        threads = [threading.Thread(target=join, args=(f"player{i}",)) for i in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert found.count(id_) == 1 and found.count(None) == 7
+        assert len(table.get(id_)["players"]) == 2
+
+    def test_match_or_open_pairs_racing_players(self, redis_server):
+        """Test that players racing on an empty queue end up in pairs instead of alone."""
+        found = []
+
+        def start(username):
+            found.append(RedisLobbyTable(redis_server()).match_or_open(username, 10))
+        threads = [threading.Thread(target=start, args=(f"player{i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        table = RedisLobbyTable(redis_server())
+        assert sorted(joined for _, joined in found) == [False] * 4 + [True] * 4
+        assert {len(table.get(id_)["players"]) for id_, _ in found} == {2}
+
+    def test_join_cancel_and_leave(self, redis_server):
+        """Test the checks of /join/link, /cancel/find and /leave."""
+        table = RedisLobbyTable(redis_server())
+        id_ = table.open("player1", 10)
+
+        assert table.join(id_, "player2", 20) is False
+        assert table.cancel(id_, "player2") is False
+        assert table.join(id_, "player2", 10) is True
+        assert table.cancel(id_, "player1") is False
+        assert table.is_playing("player2") is True
+        assert table.reset(id_, "player2") is True
+        assert table.get(id_) is None
+        assert table.is_playing("player1") is False
+        with pytest.raises(KeyError):
+            table.join(id_, "player3", 10)
+
+    def test_results_and_winner(self, redis_server):
+        """Test /write/game/result and /write/winner on a full lobby."""
+        table = RedisLobbyTable(redis_server())
+        id_ = table.open("player1", 10)
+        table.match("player2", 10)
+
+        assert table.set_result(id_, "player1", 5) is True
+        assert table.set_result("missing", "player1", 5) is False
+        assert table.set_winner(id_, "player1") is True
+        assert table.set_winner(id_, "player2") is False
+        game = table.player_lobby("player2")
+        assert game["result_player1"] == 5 and game["winner"] == "player1"
+
+    def test_drotic_throws(self, redis_server):
+        """Test appending throws to a drotic lobby."""
+        table = RedisLobbyTable(redis_server(), prefix="drotic:", empty=empty_drotic_lobby)
+        id_ = table.open("a", 5)
+
+        assert table.append_to(id_, "cache", {"username": "a", "result": "7"}) is True
+        assert table.append_to(id_, "cache", {"username": "b", "result": "3"}) is True
+        assert [throw["username"] for throw in table.get(id_)["cache"]] == ["a", "b"]
+        assert [game["id"] for game in table.values()] == [id_]
+        assert table.recycle(id_) is True
+        assert table.values() == []
+
+    def test_changes_reach_every_worker(self, redis_server):
+        """Test that changes are published to the subscribers of every worker."""
+        changed = []
+        event = threading.Event()
+        listener = RedisLobbyTable(redis_server(), on_change=lambda id_: (changed.append(id_), event.set()))
+        listener.start()
+        try:
+            id_ = RedisLobbyTable(redis_server()).open("player1", 10)
+            assert event.wait(5)
+        finally:
+            listener.close()
+        assert changed == [id_]
@@ -0,0 +1,120 @@
+"""
+Log Sink Tests for Ludicé API.
+
+Tests the queued NDJSON error log behind write_logs and its paginated reads.
+"""
+
+import pytest
+import json
+import os
+
+import log_sink
+from log_sink import LogSink
+
+
+pytestmark = pytest.mark.backend
+
+
+class TestLogSink:
+    """Test writing and reading log segments."""
+
+    def test_records_are_serializable(self, tmp_path):
+        """Test that records with time and id reach the file as JSON."""
+        sink = LogSink(str(tmp_path))
+        sink.start()
+        sink.write("Lobby not found")
+        sink.close()
+
+        [record] = list(sink.records())
+        assert record["error"] == "Lobby not found"
+        assert isinstance(record["time"], str) and isinstance(record["id"], str)
+
+    def test_write_does_not_touch_disk(self, tmp_path):
+        """Test that write only queues; the writer flushes on close."""
+        sink = LogSink(str(tmp_path))
+        sink.write("queued")
+
+        assert sink.segments() == []
+        sink.close()
+        assert len(sink.segments()) == 1
+
+    def test_full_queue_drops_instead_of_blocking(self, tmp_path):
+        """Test that a backed up writer never blocks the caller."""
+        sink = LogSink(str(tmp_path), max_queue=2)
+
+        assert [sink.write(str(i)) for i in range(3)] == [True, True, False]
+        assert sink.dropped == 1
+
+    def test_segments_per_day_and_size(self, tmp_path):
+        """Test that segments rotate by date and by size."""
+        sink = LogSink(str(tmp_path), max_bytes=150)
+        for day in ("2026-01-01", "2026-01-01", "2026-01-01", "2026-01-02"):
+            sink._queue.put_nowait({"time": f"{day} 12:00:00", "error": "x" * 50, "id": "1"})
+        sink.close()
+
+        names = [os.path.basename(path) for path in sink.segments()]
+        assert names == ["2026-01-01.ndjson", "2026-01-01.1.ndjson", "2026-01-02.ndjson"]
+        assert len(list(sink.records("2026-01-01"))) == 3
+
+    def test_torn_line_is_skipped(self, tmp_path):
+        """Test that a half written last line does not break reading."""
+        with open(tmp_path / "2026-01-01.ndjson", "w") as f:
+            f.write(json.dumps({"time": "2026-01-01 00:00:00", "error": "ok", "id": "1"}) + "\n")
+            f.write('{"time": "2026-01-01')
+
+        sink = LogSink(str(tmp_path))
+        assert [record["error"] for record in sink.records()] == ["ok"]
+
+
+def fill(sink, days):
+    """Queue numbered records for each (date, count) pair and write them."""
+    for day, count in days:
+        for i in range(count):
+            sink._queue.put_nowait({"time": f"{day} 12:00:00", "error": f"{day}/{i}", "id": str(i)})
+    sink.drain()
+
+
+class TestLogPages:
+    """Test the per-day offset index and cursor pagination."""
+
+    @pytest.fixture(autouse=True)
+    def small_index(self, monkeypatch):
+        """Index every 4th line so tests cross checkpoints."""
+        monkeypatch.setattr(log_sink, "INDEX_EVERY", 4)
+
+    def test_page_seeks_through_index(self, tmp_path):
+        """Test reading from the middle of a day."""
+        sink = LogSink(str(tmp_path), max_bytes=300)
+        fill(sink, [("2026-01-01", 10)])
+        sink.close()
+
+        assert sink.checkpoint("2026-01-01", 9)[0] == 8
+        records, next_line = sink.page("2026-01-01", 5, 3)
+        assert [r["error"] for r in records] == ["2026-01-01/5", "2026-01-01/6", "2026-01-01/7"]
+        assert next_line == 8
+
+    def test_cursor_walks_across_days(self, tmp_path):
+        """Test that pages continue into the next day."""
+        sink = LogSink(str(tmp_path))
+        fill(sink, [("2026-01-01", 3), ("2026-01-02", 2)])
+        sink.close()
+
+        first, cursor = sink.read(limit=4)
+        second, cursor = sink.read(cursor, limit=4)
+        assert [r["error"] for r in first] == ["2026-01-01/0", "2026-01-01/1", "2026-01-01/2", "2026-01-02/0"]
+        assert [r["error"] for r in second] == ["2026-01-02/1"]
+        assert sink.read(cursor)[0] == []
+
+    def test_numbering_continues_after_restart(self, tmp_path):
+        """Test that a restarted writer keeps the day's line numbers and index."""
+        sink = LogSink(str(tmp_path))
+        fill(sink, [("2026-01-01", 6)])
+        sink.close()
+
+        restarted = LogSink(str(tmp_path))
+        fill(restarted, [("2026-01-01", 3)])
+        restarted.close()
+
+        records, _ = restarted.page("2026-01-01", 8, 10)
+        assert [r["error"] for r in records] == ["2026-01-01/2"]
+        assert restarted.checkpoint("2026-01-01", 8)[0] == 8
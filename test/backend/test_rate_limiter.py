@@ -0,0 +1,73 @@
+"""
+Rate Limiter Tests for Ludicé API.
+
+Tests the token buckets behind check_time_seciruty.
+"""
+
+import pytest
+
+from rate_limiter import RateLimiter, RedisRateLimiter
+
+
+pytestmark = pytest.mark.backend
+
+
+class FakeRedis:
+    """Records the token bucket script calls."""
+
+    def __init__(self, allowed=1):
+        self.allowed = allowed
+        self.calls = []
+
+    def register_script(self, script):
+        def run(keys, args):
+            self.calls.append((keys, args))
+            return self.allowed
+        return run
+
+
+class BrokenRedis:
+    """A Redis client whose server is down."""
+
+    def register_script(self, script):
+        def run(keys, args):
+            raise ConnectionError("Connection refused")
+        return run
+
+
+class TestTokenBucket:
+    """Test the in-memory token bucket."""
+
+    def test_burst_then_refill(self):
+        """Test that a burst is allowed and then refilled at the rate."""
+        limiter = RateLimiter(rate=2, burst=3)
+
+        assert [limiter.allow("player1", now=10.0) for _ in range(4)] == [True, True, True, False]
+        assert limiter.allow("player1", now=10.5) is True
+        assert limiter.allow("player1", now=10.5) is False
+
+    def test_users_are_limited_separately(self):
+        """Test that one user's requests do not use another user's tokens."""
+        limiter = RateLimiter(rate=1, burst=1)
+
+        assert limiter.allow("player1", now=10.0) is True
+        assert limiter.allow("player2", now=10.0) is True
+
+
+class TestRedisRateLimiter:
+    """Test the Redis backed rate limiter."""
+
+    def test_bucket_is_checked_in_redis(self):
+        """Test that the script runs against the user's key."""
+        client = FakeRedis(allowed=0)
+        limiter = RedisRateLimiter(client, rate=1, burst=5)
+
+        assert limiter.allow("player1") is False
+        assert client.calls == [(["rate:player1"], [1, 5])]
+
+    def test_falls_back_when_redis_is_down(self):
+        """Test that requests are still limited locally without Redis."""
+        limiter = RedisRateLimiter(BrokenRedis(), rate=1, burst=1)
+
+        assert limiter.allow("player1", now=10.0) is True
+        assert limiter.allow("player1", now=10.2) is False
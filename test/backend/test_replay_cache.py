@@ -0,0 +1,84 @@
+"""
+Replay Cache Tests for Ludicé API.
+
+Tests the TTL cache of accepted signatures behind verify_signature.
+"""
+
+import pytest
+
+from replay_cache import ReplayCache, RedisReplayCache
+
+
+pytestmark = pytest.mark.backend
+
+SIGNATURE = "ab" * 32
+
+
+class FakeRedis:
+    """Minimal SET NX stand-in."""
+
+    def __init__(self):
+        self.keys = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = (value, ex)
+        return True
+
+
+class BrokenRedis:
+    """A Redis client whose server is down."""
+
+    def set(self, *args, **kwargs):
+        raise ConnectionError("Connection refused")
+
+
+class TestReplayCache:
+    """Test the in-memory replay cache."""
+
+    def test_second_use_is_a_replay(self):
+        """Test that a signature is only accepted once."""
+        cache = ReplayCache(ttl=300)
+
+        assert cache.seen(SIGNATURE, now=0) is False
+        assert cache.seen(SIGNATURE, now=1) is True
+
+    def test_entries_expire_after_ttl(self):
+        """Test that expired signatures are evicted."""
+        cache = ReplayCache(ttl=300)
+        cache.seen(SIGNATURE, now=0)
+        cache.seen("cd" * 32, now=200)
+
+        assert cache.seen("ef" * 32, now=301) is False
+        assert len(cache) == 2
+        assert cache.seen(SIGNATURE, now=302) is False
+
+    def test_memory_is_bounded(self):
+        """Test that the oldest entries are dropped past max_entries."""
+        cache = ReplayCache(ttl=300, max_entries=2)
+        for i in range(3):
+            cache.seen(f"{i:064x}", now=i)
+
+        assert len(cache) == 2
+        assert cache.seen(f"{2:064x}", now=3) is True
+
+
+class TestRedisReplayCache:
+    """Test the Redis backed replay cache."""
+
+    def test_shared_through_redis(self):
+        """Test that SET NX decides whether the signature was used."""
+        client = FakeRedis()
+        cache = RedisReplayCache(client, ttl=330)
+
+        assert cache.seen(SIGNATURE) is False
+        assert cache.seen(SIGNATURE) is True
+        assert client.keys["replay:" + SIGNATURE] == (1, 331)
+
+    def test_falls_back_when_redis_is_down(self):
+        """Test that replays are still caught locally without Redis."""
+        cache = RedisReplayCache(BrokenRedis(), ttl=330)
+
+        assert cache.seen(SIGNATURE) is False
+        assert cache.seen(SIGNATURE) is True
@@ -0,0 +1,154 @@
+"""
+Storage Repository Tests for Ludicé API.
+
+Runs the same checks against the JSON files, the SQL stores (on a
+SQLite file) and the embedded SQLite store behind backend/repositories.py.
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+from repositories import backend, JsonStats, JsonTerms, JsonPayments
+from sqlite_store import SqliteDatabase, SqliteStats, SqliteTerms, SqlitePayments
+
+
+pytestmark = pytest.mark.backend
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "backend" / "sql_database"
+SCHEMAS = {"game": None, "history": None, "drop": None}
+MODULES = ("core", "sql_repositories", "game_sql", "game_core", "game_models")
+
+
+@pytest.fixture
+def sql(monkeypatch, tmp_path):
+    """sql_repositories.py bound to one SQLite file instead of sql_i's Postgres engines."""
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("greenlet")
+    pytest.importorskip("dotenv")
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    path = tmp_path / "ludice.db"
+    engines = types.SimpleNamespace(
+        sync_engine=create_engine(f"sqlite:///{path}").execution_options(schema_translate_map=SCHEMAS),
+        # no pool: every aiosqlite connection is closed by the test loop that opened it
+        async_engine=create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool).execution_options(
+            schema_translate_map=SCHEMAS),
+        create_schemas=lambda: None,
+        schema_ddl=lambda: [],
+    )
+    monkeypatch.syspath_prepend(str(SQL_DIR / "game_table"))
+    monkeypatch.syspath_prepend(str(SQL_DIR))
+    monkeypatch.setitem(sys.modules, "sql_i", engines)
+    for name in MODULES:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import sql_repositories
+    import models
+    models.metadata_obj.create_all(engines.sync_engine)
+    yield sql_repositories
+    for name in MODULES:
+        sys.modules.pop(name, None)
+    engines.sync_engine.dispose()
+
+
+@pytest.fixture(params=["json", "sql", "sqlite"])
+def stores(request, tmp_path):
+    """Stats, terms and first deposits of one backend."""
+    if request.param == "json":
+        return types.SimpleNamespace(
+            stats=JsonStats(str(tmp_path / "stats.json")),
+            terms=JsonTerms(str(tmp_path / "sogl.json")),
+            payments=JsonPayments(str(tmp_path / "first_vznos.json")),
+        )
+    if request.param == "sqlite":
+        db = SqliteDatabase(str(tmp_path / "ludice.db"))
+        request.addfinalizer(db.close)
+        return types.SimpleNamespace(stats=SqliteStats(db), terms=SqliteTerms(db), payments=SqlitePayments(db))
+    sql = request.getfixturevalue("sql")
+    return types.SimpleNamespace(stats=sql.SqlStats(), terms=sql.SqlTerms(), payments=sql.SqlPayments())
+
+
+class TestBackendSelection:
+    """Test STORAGE and STORAGE_<ENTITY>."""
+
+    def test_default_and_override(self, monkeypatch):
+        """Test that one entity can be moved while the rest stay on STORAGE."""
+        monkeypatch.delenv("STORAGE", raising=False)
+        monkeypatch.setenv("STORAGE_LOBBIES", "redis")
+
+        assert backend("accounts") == "json"
+        assert backend("lobbies") == "redis"
+
+    def test_unknown_backend(self, monkeypatch):
+        """Test that a backend an entity does not have is refused at startup."""
+        monkeypatch.setenv("STORAGE", "sql")
+        assert backend("logs") == "json"
+
+        monkeypatch.setenv("STORAGE_LOGS", "sql")
+        with pytest.raises(ValueError):
+            backend("logs")
+
+
+class TestRepositories:
+    """Test that every backend behaves the same."""
+
+    async def test_stats(self, stores):
+        """Test counting games and wins."""
+        assert await stores.stats.get("player1") is None
+        assert await stores.stats.add_win("player1") is False
+        await stores.stats.create("player1")
+        assert await stores.stats.add_game("player1") is True
+        assert await stores.stats.add_win("player1") is True
+
+        user = await stores.stats.get("player1")
+        assert (user["wins"], user["total_games"]) == (1, 1)
+        assert list(stores.stats.rows()) == [("player1", 1, 1)]
+
+    async def test_terms(self, stores):
+        """Test that terms are unknown until answered."""
+        assert await stores.terms.get("player1") is None
+        await stores.terms.set("player1", True)
+
+        assert await stores.terms.get("player1") is True
+
+    async def test_first_deposit_once(self, stores):
+        """Test that the first deposit is only given once."""
+        assert await stores.payments.has_first("player1") is False
+        assert await stores.payments.claim_first("player1") is True
+        assert await stores.payments.claim_first("player1") is False
+        assert await stores.payments.has_first("player1") is True
+
+
+class TestSqlAccounts:
+    """Test the SQL accounts against the AccountStore contract."""
+
+    def test_balance_lifecycle(self, sql):
+        """Test opening, moving and withdrawing a balance."""
+        accounts = sql.SqlAccounts()
+
+        assert accounts.exists("player1") is False
+        assert accounts.set_default("player1", 100) is True
+        assert accounts.set_default("player1", 100) is False
+        assert accounts.increase("player1", 50) == 150
+        assert accounts.decrease("player1", 500) is False
+        assert accounts.decrease("player1", 20) is True
+        assert accounts.total() == 130
+        assert accounts.reset("player1") == 130
+        assert accounts.get("player1") == 0
+        with pytest.raises(KeyError):
+            accounts.increase("player2", 1)
+
+    async def test_other_stores_do_not_open_an_account(self, sql):
+        """Test that a user row made by the stats store has no balance yet."""
+        await sql.SqlStats().create("player1")
+        accounts = sql.SqlAccounts()
+
+        assert accounts.exists("player1") is False
+        assert accounts.set_default("player1", 100) is True
+        assert accounts.delete("player1") is True
+        assert accounts.delete("player1") is False
@@ -0,0 +1,84 @@
+"""
+Secrets Cache Tests for Ludicé API.
+
+Tests that secrets.json is read once and reloaded only when it changes.
+"""
+
+import pytest
+import json
+import os
+from pathlib import Path
+
+from secrets_store import SecretsFile
+
+
+pytestmark = pytest.mark.backend
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+@pytest.fixture
+def secrets_file(tmp_path):
+    """Create a secrets.json with both keys."""
+    path = tmp_path / "secrets.json"
+    with open(path, "w") as f:
+        json.dump({"key": "key1", "x-api-normal": "api1"}, f)
+    return path
+
+
+def rotate(path, data):
+    """Replace secrets.json the way a deploy does, via a rename."""
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class TestSecretsCache:
+    """Test the cached secrets provider."""
+
+    def test_served_from_memory(self, secrets_file):
+        """Test that reads within the check interval do not touch the file."""
+        secrets = SecretsFile(str(secrets_file), check_interval=60)
+        assert secrets.get("x-api-normal") == "api1"
+
+        os.remove(secrets_file)
+
+        assert secrets.get("x-api-normal") == "api1"
+
+    def test_reloads_after_rotation(self, secrets_file):
+        """Test that a replaced file is picked up."""
+        reloaded = []
+        secrets = SecretsFile(str(secrets_file), check_interval=0, on_reload=reloaded.append)
+        assert secrets.get("key") == "key1"
+
+        rotate(secrets_file, {"key": "key2", "x-api-normal": "api2"})
+
+        assert secrets.get("key") == "key2"
+        assert [data["key"] for data in reloaded] == ["key1", "key2"]
+
+    def test_invalidate_forces_reload(self, secrets_file):
+        """Test that invalidate (the SIGHUP handler) reloads on the next read."""
+        secrets = SecretsFile(str(secrets_file), check_interval=60)
+        secrets.get("key")
+        rotate(secrets_file, {"key": "key2", "x-api-normal": "api2"})
+
+        assert secrets.get("key") == "key1"
+        secrets.invalidate()
+        assert secrets.get("key") == "key2"
+
+    def test_broken_file_keeps_last_keys(self, secrets_file):
+        """Test that a half written file does not drop the loaded keys."""
+        secrets = SecretsFile(str(secrets_file), check_interval=0)
+        secrets.get("key")
+        with open(secrets_file, "w") as f:
+            f.write('{"key": ')
+
+        assert secrets.get("key") == "key1"
+
+    def test_bot_copy_is_identical(self):
+        """Test that the bot ships the same module as the API."""
+        backend = (ROOT / "backend" / "secrets_store.py").read_text()
+        bot = (ROOT / "frontend" / "common" / "secrets_store.py").read_text()
+
+        assert backend == bot
@@ -0,0 +1,89 @@
+"""
+Request Signing Tests for Ludicé API.
+
+Tests that the fast canonical serializer signs exactly what the json.dumps based signatures did.
+"""
+
+import pytest
+import json
+import hmac
+import hashlib
+import time
+from pathlib import Path
+from pydantic import BaseModel, Field
+
+import signing
+
+
+pytestmark = pytest.mark.backend
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def reference_signature(key, data):
+    """The original signature: HMAC over sorted, compact json.dumps without the signature."""
+    data = dict(data)
+    data.pop("signature", None)
+    data_str = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hmac.new(key.encode(), data_str.encode(), hashlib.sha256).hexdigest()
+
+
+class Start_Game(BaseModel):
+    username: str
+    bet: int
+    signature: str
+    timestamp: float = Field(default_factory=time.time)
+
+
+class TestCanonicalForm:
+    """Test that canonical() matches json.dumps(sort_keys=True, separators=(',', ':'))."""
+
+    @pytest.mark.parametrize("data", [
+        {},
+        {"username": "test_user", "bet": 10, "timestamp": 1700000000.123},
+        {"username": "用户\"测试\\\n", "amount": -5, "ok": True, "no": False, "none": None},
+        {"big": 2 ** 70, "small": 1e-7, "huge": 1e300, "inf": float("inf")},
+        {"players": ["a", "b"], "nested": {"b": 1, "a": [2.5]}},
+    ])
+    def test_matches_json_dumps(self, test_secret_key, data):
+        """Test that signatures match the json.dumps based ones."""
+        assert signing.sign(test_secret_key, data) == reference_signature(test_secret_key, data)
+
+    def test_signature_field_excluded(self, test_secret_key):
+        """Test that the signature field itself is not signed."""
+        data = {"username": "test_user", "timestamp": 1.0}
+        signed = dict(data, signature="abc")
+
+        assert signing.sign(test_secret_key, signed) == signing.sign(test_secret_key, data)
+
+    def test_model_signed_without_dump(self, test_secret_key):
+        """Test that a request model signs the same as its model_dump()."""
+        request = Start_Game(username="test_user", bet=10, signature="x")
+
+        assert signing.sign(test_secret_key, request) == reference_signature(test_secret_key, request.model_dump())
+
+
+class TestKeyedMac:
+    """Test the pre-keyed HMAC objects."""
+
+    def test_verify(self, test_secret_key):
+        """Test verifying a correct and a tampered signature."""
+        data = {"username": "test_user", "bet": 10, "timestamp": time.time()}
+        signature = reference_signature(test_secret_key, data)
+
+        assert signing.verify(test_secret_key, data, signature) is True
+        assert signing.verify(test_secret_key, dict(data, bet=1000), signature) is False
+
+    def test_rotated_key_gets_its_own_mac(self, test_secret_key):
+        """Test that signing with a new key does not reuse the old keyed state."""
+        data = {"username": "test_user"}
+
+        assert signing.sign("other_key", data) == reference_signature("other_key", data)
+        assert signing.sign(test_secret_key, data) == reference_signature(test_secret_key, data)
+
+    def test_bot_copy_is_identical(self):
+        """Test that the bot ships the same module as the API."""
+        backend = (ROOT / "backend" / "signing.py").read_text()
+        bot = (ROOT / "frontend" / "common" / "signing.py").read_text()
+
+        assert backend == bot
@@ -0,0 +1,91 @@
+"""
+Async SQL User Store Tests for Ludicé API.
+
+Runs sql_database/async_core.py against a SQLite file through aiosqlite.
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+pytest.importorskip("dotenv")
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+pytestmark = pytest.mark.backend
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "backend" / "sql_database"
+SCHEMAS = {"game": None, "history": None, "drop": None}
+
+
+@pytest.fixture
+async def async_core(monkeypatch, tmp_path):
+    """async_core.py bound to SQLite engines instead of sql_i's Postgres ones."""
+    path = tmp_path / "ludice.db"
+    engines = types.SimpleNamespace(
+        sync_engine=create_engine(f"sqlite:///{path}").execution_options(schema_translate_map=SCHEMAS),
+        async_engine=create_async_engine(f"sqlite+aiosqlite:///{path}").execution_options(schema_translate_map=SCHEMAS),
+    )
+    monkeypatch.syspath_prepend(str(SQL_DIR))
+    monkeypatch.setitem(sys.modules, "sql_i", engines)
+    for name in ("core", "async_core"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import async_core
+    await async_core.create_table()
+    yield async_core
+    for name in ("core", "async_core"):
+        sys.modules.pop(name, None)
+    await engines.async_engine.dispose()
+    engines.sync_engine.dispose()
+
+
+class TestAsyncCore:
+    """Test the awaitable user store."""
+
+    async def test_register_and_profile(self, async_core):
+        """Test that a registered user has the default profile."""
+        assert await async_core.register("player1") is True
+
+        assert await async_core.get_me("player1") == {
+            "Tatal games": 0,
+            "Wins": 0,
+            "Loses": 0,
+            "Balance": 100,
+            "Wins procent": 0,
+        }
+        with pytest.raises(KeyError):
+            await async_core.register("player1")
+
+    async def test_finished_game(self, async_core):
+        """Test settling and counting a game."""
+        await async_core.register("player1")
+        await async_core.register("player2")
+
+        assert await async_core.settle_game("player1", "player2", 30) == {"player1": 130, "player2": 70}
+        await async_core.record_games([("player1", True), ("player2", False)])
+
+        assert (await async_core.get_me("player1"))["Wins procent"] == 100
+        assert await async_core.decrease_user_balance("player2", 500) is False
+        assert await async_core.count_all_user_money() == 200
+
+    async def test_player_can_not_settle_against_themselves(self, async_core):
+        """Test that a game with the same winner and loser is refused."""
+        await async_core.register("player1")
+
+        with pytest.raises(ValueError):
+            await async_core.settle_game("player1", "player1", 30)
+        assert await async_core.get_user_balance("player1") == 100
+
+    async def test_iter_all_data(self, async_core):
+        """Test streaming every row."""
+        await async_core.register("player1")
+        await async_core.register("player2")
+
+        assert sorted([row.username async for row in async_core.iter_all_data(batch_size=1)]) == ["player1", "player2"]
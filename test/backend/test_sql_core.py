@@ -0,0 +1,250 @@
+"""
+SQL User Store Tests for Ludicé API.
+
+Runs sql_database/core.py against an in-memory SQLite engine and counts
+the statements each call sends.
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+pytest.importorskip("dotenv")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+
+pytestmark = pytest.mark.backend
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "backend" / "sql_database"
+# SQLite has no schemas, route every store to the default one
+SCHEMAS = {"game": None, "history": None, "drop": None}
+
+
+@pytest.fixture
+def core(monkeypatch):
+    """core.py bound to a fresh SQLite engine instead of sql_i's Postgres one."""
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    ).execution_options(schema_translate_map=SCHEMAS)
+    monkeypatch.syspath_prepend(str(SQL_DIR))
+    monkeypatch.setitem(sys.modules, "sql_i", types.SimpleNamespace(sync_engine=engine))
+    monkeypatch.delitem(sys.modules, "core", raising=False)
+    import core
+    core.create_table()
+    yield core
+    sys.modules.pop("core", None)
+    engine.dispose()
+
+
+@pytest.fixture
+def statements(core):
+    """Every SQL statement sent by core after the fixture is set up."""
+    sent = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        sent.append(statement)
+
+    event.listen(core.sync_engine, "before_cursor_execute", record)
+    yield sent
+    event.remove(core.sync_engine, "before_cursor_execute", record)
+
+
+def add_user(core, username, **values):
+    row = {"username": username, "balance": 100, "wins": 0, "loses": 0,
+           "games_count": 0, "sogl": False, "down_payment": True}
+    row.update(values)
+    with core.sync_engine.begin() as conn:
+        conn.execute(core.table.insert().values(**row))
+
+
+class TestGetMe:
+    """Test the profile read path."""
+
+    def test_profile_is_one_statement(self, core, statements):
+        """Test that the whole profile is read with a single SELECT."""
+        add_user(core, "player1", balance=250, wins=3, loses=4, games_count=7)
+        statements.clear()
+
+        profile = core.get_me("player1")
+
+        assert len(statements) == 1
+        assert profile == {
+            "Tatal games": 7,
+            "Wins": 3,
+            "Loses": 4,
+            "Balance": 250,
+            "Wins procent": 3 / 7 * 100,
+        }
+
+    def test_unknown_user(self, core, statements):
+        """Test that a missing user is reported after the same single SELECT."""
+        result = core.get_me("ghost")
+
+        assert isinstance(result, KeyError)
+        assert len(statements) == 1
+
+    def test_no_games_is_zero_percent(self, core):
+        """Test the win percentage of a new user."""
+        add_user(core, "player1")
+
+        assert core.get_me("player1")["Wins procent"] == 0
+        assert core.count_procent_of_wins("player1") == 0
+
+
+def balance(core, username):
+    return core.get_user_balance(username)
+
+
+class TestBalanceUpdates:
+    """Test the single-statement balance updates."""
+
+    def test_decrease_is_one_statement(self, core, statements):
+        """Test that a bet is taken with one conditional UPDATE."""
+        add_user(core, "player1", balance=100)
+        statements.clear()
+
+        assert core.decrease_user_balance("player1", 30) is True
+        assert len(statements) == 1
+        assert balance(core, "player1") == 70
+
+    def test_decrease_never_goes_below_zero(self, core):
+        """Test that an insufficient balance is left untouched."""
+        add_user(core, "player1", balance=20)
+
+        assert core.decrease_user_balance("player1", 30) is False
+        assert balance(core, "player1") == 20
+
+    def test_unknown_user(self, core):
+        """Test that missing users still raise KeyError."""
+        with pytest.raises(KeyError):
+            core.decrease_user_balance("ghost", 1)
+        with pytest.raises(KeyError):
+            core.increase_user_balance("ghost", 1)
+
+    def test_increase_from_zero(self, core):
+        """Test that an empty balance can be topped up."""
+        add_user(core, "player1", balance=0)
+
+        assert core.increase_user_balance("player1", 50) is True
+        assert balance(core, "player1") == 50
+
+
+class TestSettlement:
+    """Test settling both players of a game in one transaction."""
+
+    def test_settle_game(self, core):
+        """Test that the winner gets the bet and the loser pays it."""
+        add_user(core, "player1", balance=100)
+        add_user(core, "player2", balance=100)
+
+        assert core.settle_game("player1", "player2", 40) == {"player1": 140, "player2": 60}
+
+    def test_failed_settlement_changes_nothing(self, core):
+        """Test that a loser who can not pay rolls back the winner too."""
+        add_user(core, "player1", balance=100)
+        add_user(core, "player2", balance=10)
+
+        assert core.settle_game("player1", "player2", 40) is None
+        assert balance(core, "player1") == 100
+        assert balance(core, "player2") == 10
+
+    def test_player_can_not_settle_against_themselves(self, core):
+        """Test that a game with the same winner and loser is refused before any write."""
+        add_user(core, "player1", balance=100)
+
+        with pytest.raises(ValueError):
+            core.settle_game("player1", "player1", 40)
+        with pytest.raises(ValueError):
+            core.finish_game("game1", "player1", "player1", 40, {"player1": 6})
+        assert balance(core, "player1") == 100
+
+
+class TestStatsCounters:
+    """Test the in-database stats counters."""
+
+    def stats(self, core, username):
+        profile = core.get_me(username)
+        return profile["Wins"], profile["Loses"], profile["Tatal games"]
+
+    def test_plus_one_counters(self, core):
+        """Test that the single counters work and report unknown users."""
+        add_user(core, "player1")
+
+        assert core.plus_one_win("player1") is True
+        assert core.plus_one_lose("player1") is True
+        assert core.plus_one_game("player1") is True
+        assert core.plus_one_win("ghost") is False
+        assert self.stats(core, "player1") == (1, 1, 1)
+
+    def test_record_game_is_one_statement(self, core, statements):
+        """Test that a finished game is counted with one UPDATE."""
+        add_user(core, "player1")
+        statements.clear()
+
+        assert core.record_game("player1", won=True) is True
+        assert len(statements) == 1
+        assert self.stats(core, "player1") == (1, 0, 1)
+
+    def test_record_games_batch(self, core, statements):
+        """Test that a batch of outcomes is sent as one executemany."""
+        add_user(core, "player1")
+        add_user(core, "player2")
+        statements.clear()
+
+        core.record_games([("player1", True), ("player2", False), ("player1", False)])
+
+        assert len(statements) == 1
+        assert self.stats(core, "player1") == (1, 1, 2)
+        assert self.stats(core, "player2") == (0, 1, 1)
+
+    def test_counters_update_leaderboard(self, core):
+        """Test that an attached leaderboard follows the counters."""
+        from leaderboard import Leaderboard
+        add_user(core, "player1", wins=1, games_count=1)
+        add_user(core, "player2")
+        core.attach_leaderboard(Leaderboard())
+
+        core.record_games([("player2", True), ("player2", True)])
+
+        assert core.leaderboard.top("wins", 1) == [("player2", 2)]
+        assert core.get_leader_borad_games() == {"player2": 2, "player1": 1}
+
+
+class TestFinishGame:
+    """Test finishing a game across the stores in one transaction."""
+
+    def test_loser_who_can_not_pay_changes_nothing(self, core):
+        """Test that a failed settlement writes neither balances nor stats."""
+        add_user(core, "player1", balance=100)
+        add_user(core, "player2", balance=10)
+
+        assert core.finish_game("game1", "player1", "player2", 40, {"player1": 6, "player2": 2}) is None
+        assert core.get_me("player1")["Balance"] == 100
+        assert core.get_me("player2")["Tatal games"] == 0
+
+    def test_finish_writes_every_store(self, core):
+        """Test the statements that follow the balances."""
+        statements = core.finish_statements("game1", "player1", 40, {"player1": 6, "player2": 2},
+                                            [("player1", True), ("player2", False)])
+        tables = [stmt.table.name for stmt, _ in statements]
+
+        assert tables == ["main_data", "game_data", "drop_table"]
+        assert [row["won"] for row in statements[2][1]] == [True, False]
+
+
+class TestSchemaRouting:
+    """Test that every store shares one database."""
+
+    def test_stores_are_routed_by_schema(self, core, monkeypatch):
+        """Test the default schemas and their overrides."""
+        import config
+        monkeypatch.setenv("DB_SCHEMA_DROP", "drops")
+
+        assert config.schema_map() == {"game": "game_data", "history": "history_data", "drop": "drops"}
+        assert core.game_table.schema == "game"
+        assert core.drop_table.schema == "drop"
@@ -0,0 +1,67 @@
+"""
+Game Table Tests for Ludicé API.
+
+Checks the Postgres matchmaking statements of game_table/game_core.py.
+game_data uses ARRAY and JSONB columns, so the statements are compiled
+for Postgres instead of being run on SQLite; see
+test/benchmarks/bench_matchmaking.py for a run against a real server.
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("dotenv")
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+
+pytestmark = pytest.mark.backend
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "backend" / "sql_database"
+
+
+@pytest.fixture
+def game_core(monkeypatch):
+    monkeypatch.syspath_prepend(str(SQL_DIR / "game_table"))
+    monkeypatch.syspath_prepend(str(SQL_DIR))
+    monkeypatch.setitem(sys.modules, "sql_i", types.SimpleNamespace(
+        sync_engine=None, async_engine=None, create_schemas=lambda: None, schema_ddl=lambda: []))
+    for name in ("game_sql", "game_core"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import game_core
+    yield game_core
+    for name in ("game_sql", "game_core"):
+        sys.modules.pop(name, None)
+
+
+def sql(statement) -> str:
+    return " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+
+
+class TestMatchmakingStatements:
+    """Test that joins claim one lobby through the partial index."""
+
+    def test_waiting_lobby_is_claimed_with_skip_locked(self, game_core):
+        """Test the claim query."""
+        query = sql(game_core.waiting_lobby("player1", 10))
+
+        assert "cardinality(players) = 1" in query
+        assert "NOT (%(param_1)s::VARCHAR = ANY (game.game_data.players))" in query
+        assert query.endswith("LIMIT %(param_2)s::INTEGER FOR UPDATE SKIP LOCKED")
+
+    def test_join_appends_in_the_database(self, game_core):
+        """Test that the player list is not written back from a stale read."""
+        assert "SET players=array_append(game.game_data.players" in sql(game_core.join_lobby("lobby1", "player2"))
+
+    def test_partial_indexes_match_the_queries(self, game_core):
+        """Test that the index predicates are the ones the queries use."""
+        indexes = {index.name: sql(CreateIndex(index)) for index in game_core.game_table.indexes}
+
+        assert indexes["ix_game_data_waiting_bet"].endswith("(bet) WHERE cardinality(players) = 1")
+        assert indexes["ix_game_data_free"].endswith("(id) WHERE cardinality(players) = 0")
+        assert "cardinality(players) = 0" in sql(game_core.free_lobby())
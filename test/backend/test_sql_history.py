@@ -0,0 +1,85 @@
+"""
+Purchase and Drop History Tests for Ludicé API.
+
+Runs the history stores and their migration against in-memory SQLite.
+"""
+
+import sys
+import types
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("dotenv")
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import StaticPool
+
+
+pytestmark = pytest.mark.backend
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "backend" / "sql_database"
+MODULES = ("history_sqli", "history_core", "drop_sqli", "drop_core", "migrations")
+
+
+@pytest.fixture
+def sql(monkeypatch):
+    """The history stores on one SQLite engine with every schema routed to the default one."""
+    for store in ("GAME", "HISTORY", "DROP"):
+        monkeypatch.setenv(f"DB_SCHEMA_{store}", "")
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    ).execution_options(schema_translate_map={"game": None, "history": None, "drop": None})
+    monkeypatch.syspath_prepend(str(SQL_DIR / "drop_history_table"))
+    monkeypatch.syspath_prepend(str(SQL_DIR / "buy_history_table"))
+    monkeypatch.syspath_prepend(str(SQL_DIR))
+    monkeypatch.setitem(sys.modules, "sql_i", types.SimpleNamespace(
+        sync_engine=engine, async_engine=None, create_schemas=lambda: None, schema_ddl=lambda: []))
+    for name in MODULES:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import history_core
+    import drop_core
+    import migrations
+    yield types.SimpleNamespace(engine=engine, history=history_core, drop=drop_core, migrations=migrations)
+    for name in MODULES:
+        sys.modules.pop(name, None)
+    engine.dispose()
+
+
+class TestHistoryKeys:
+    """Test that users keep every purchase and drop."""
+
+    def test_many_purchases_per_user(self, sql):
+        """Test that a second purchase no longer collides on the username key."""
+        sql.history.create_table()
+        sql.history.create_new_buy("player1", "skin", 50)
+        sql.history.create_new_buy("player1", "dice", 20)
+
+        rows = sql.history.get_user_history("player1")
+
+        assert [row.name for row in rows] == ["skin", "dice"]
+        assert rows[0].date == date.today()
+
+    def test_drops_in_order(self, sql):
+        """Test that a user's drops come back in the order they were written."""
+        sql.drop.create_table()
+        for result in (3, 6, 1):
+            sql.drop.write_user_drop("player1", result, 10, result == 6)
+        sql.drop.write_user_drop("player2", 4, 10, False)
+
+        assert [row.result for row in sql.drop.get_user_history("player1")] == [3, 6, 1]
+
+
+class TestMigration:
+    """Test the history migration on a fresh database."""
+
+    def test_creates_tables_and_indexes_once(self, sql):
+        """Test that a second run finds nothing to do."""
+        applied = sql.migrations.migrate_history_keys()
+
+        assert applied == ["create history_data", "create drop_table"]
+        indexes = {index["name"] for index in inspect(sql.engine).get_indexes("drop_table")}
+        assert "ix_drop_table_username_id" in indexes
+        assert sql.migrations.migrate_history_keys() == []
@@ -0,0 +1,265 @@
+"""
+SQLite Store Tests for Ludicé API.
+
+Tests the embedded WAL database: the ledger, the lobby tables, the log
+table and the one-shot import of data/*.json.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from lobby_store import empty_drotic_lobby
+from log_sink import LogSink
+from sqlite_store import (
+    SqliteDatabase, SqliteAccounts, SqliteLobbyTable, SqliteRepository, SqliteLogSink, import_json
+)
+
+
+pytestmark = pytest.mark.backend
+
+
+@pytest.fixture
+def db(tmp_path):
+    """An empty database file."""
+    db = SqliteDatabase(str(tmp_path / "ludice.db"))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def logs(db):
+    """The log table; its sink is closed before the database."""
+    logs = SqliteLogSink(db)
+    yield logs
+    logs.close()
+
+
+class TestDatabase:
+    """Test the connection pool and transactions."""
+
+    def test_wal_and_connection_per_thread(self, db):
+        """Test that every thread gets its own connection in WAL mode."""
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(db.connection()))
+        thread.start()
+        thread.join()
+
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert connections[0] is not db.connection()
+        assert db.connection() is db.connection()
+
+    def test_failed_transaction_rolls_back(self, db):
+        """Test that nothing of a failed transaction is written."""
+        with pytest.raises(RuntimeError):
+            with db.transaction() as conn:
+                conn.execute("INSERT INTO bank (username, balance) VALUES ('player1', 100)")
+                raise RuntimeError()
+
+        assert db.execute("SELECT COUNT(*) FROM bank").fetchone()[0] == 0
+
+
+class TestSqliteAccounts:
+    """Test balances and their ledger."""
+
+    def test_balance_lifecycle(self, db):
+        """Test opening, moving and withdrawing a balance."""
+        accounts = SqliteAccounts(db)
+
+        assert accounts.set_default("player1", 100) is True
+        assert accounts.set_default("player1", 100) is False
+        assert accounts.increase("player1", 50) == 150
+        assert accounts.decrease("player1", 500) is False
+        assert accounts.decrease("player1", 20) is True
+        assert accounts.total() == 130
+        assert accounts.reset("player1") == 130
+        assert accounts.delete("player1") is True
+        with pytest.raises(KeyError):
+            accounts.increase("player1", 1)
+
+    def test_every_change_is_in_the_ledger(self, db):
+        """Test that the ledger holds each change with the balance after it."""
+        accounts = SqliteAccounts(db)
+        accounts.set_default("player1", 100)
+        accounts.increase("player1", 50)
+        accounts.decrease("player1", 500)
+        accounts.reset("player1")
+
+        rows = db.execute("SELECT op, amount, balance FROM ledger ORDER BY seq").fetchall()
+        assert [tuple(row) for row in rows] == [("NEW", 100, 100), ("INC", 50, 150), ("WDR", 150, 0)]
+
+    def test_concurrent_increases_are_not_lost(self, db):
+        """Test that writers on several threads serialize on the file lock."""
+        accounts = SqliteAccounts(db)
+        accounts.set_default("player1", 0)
+        threads = [threading.Thread(target=lambda: [accounts.increase("player1", 1) for _ in range(50)])
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert accounts.get("player1") == 200
+
+
+class TestSqliteLobbyTable:
+    """Test matchmaking on the lobby tables."""
+
+    def test_match_open_and_join(self, db):
+        """Test that the second player with the same bet lands in the waiting lobby."""
+        lobbies = SqliteLobbyTable(db, warm=2)
+        assert lobbies.free_count() == 2
+
+        id_ = lobbies.open("player1", 10)
+        assert lobbies.match("player1", 10) is None
+        assert lobbies.match("player2", 20) is None
+        assert lobbies.match("player2", 10) == id_
+        assert lobbies.get(id_)["players"] == ["player1", "player2"]
+        assert lobbies.join(id_, "player3", 10) is False
+        with pytest.raises(KeyError):
+            lobbies.join("missing", "player3", 10)
+
+    def test_lifecycle_recycles_lobby(self, db):
+        """Test results, winner and reset of a full lobby."""
+        changes = []
+        lobbies = SqliteLobbyTable(db, on_change=changes.append)
+        id_ = lobbies.open("player1", 10)
+        lobbies.match("player2", 10)
+
+        assert lobbies.player_lobby("player2")["id"] == id_
+        assert lobbies.set_result(id_, "player1", 4) is True
+        assert lobbies.set_winner(id_, "player1") is True
+        assert lobbies.set_winner(id_, "player2") is False
+        assert lobbies.get(id_)["result_player1"] == 4
+        assert lobbies.reset(id_, "player2") is True
+        assert lobbies.is_playing("player1") is False
+        assert lobbies.get(id_)["players"] == []
+        assert changes.count(id_) == 5
+
+    def test_recycled_lobbies_are_capped(self, db):
+        """Test that lobbies past max_free are dropped instead of recycled."""
+        lobbies = SqliteLobbyTable(db, max_free=0)
+        id_ = lobbies.open("player1", 10)
+
+        assert lobbies.cancel(id_, "player1") is True
+        assert lobbies.get(id_) is None
+
+    def test_concurrent_matches_claim_the_lobby_once(self, db):
+        """Test that one waiting lobby is given to one of many matching players."""
+        lobbies = SqliteLobbyTable(db)
+        id_ = lobbies.open("player0", 10)
+        found = []
+        threads = [threading.Thread(target=lambda i=i: found.append(lobbies.match(f"player{i + 1}", 10)))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert found.count(id_) == 1 and found.count(None) == 7
+
+    def test_match_or_open_pairs_racing_players(self, db):
+        """Test that players racing on an empty queue end up in pairs instead of alone."""
+        lobbies = SqliteLobbyTable(db)
+        found = []
+        threads = [threading.Thread(target=lambda i=i: found.append(lobbies.match_or_open(f"player{i}", 10)))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(joined for _, joined in found) == [False] * 4 + [True] * 4
+        assert {len(lobbies.get(id_)["players"]) for id_, _ in found} == {2}
+
+    def test_drotic_throws(self, db):
+        """Test that drotic lobbies keep their throws per id."""
+        drotic = SqliteLobbyTable(db, "drotic", empty=empty_drotic_lobby)
+        id_ = drotic.open("player1", 10)
+
+        assert drotic.append_to(id_, "cache", {"username": "player1", "num": 3}) is True
+        assert drotic.get(id_)["cache"] == [{"username": "player1", "num": 3}]
+        assert drotic.recycle(id_) is True
+        assert drotic.get(id_)["cache"] == []
+
+
+class TestSqliteLogSink:
+    """Test the log table."""
+
+    def test_cursor_pages_through_records(self, logs):
+        """Test that read continues after the last record returned."""
+        for i in range(5):
+            logs.write(f"error {i}")
+        logs.drain()
+
+        first, cursor = logs.read(None, 3)
+        rest, cursor = logs.read(cursor, 3)
+        assert [record["error"] for record in first + rest] == [f"error {i}" for i in range(5)]
+        assert logs.read(cursor, 3) == ([], cursor)
+
+    def test_writer_keeps_queue_order(self, db):
+        """Test that the writer thread inserts records in the order they were written."""
+        logs = SqliteLogSink(db, flush_interval=0.01)
+        for i in range(5):
+            logs.write(f"error {i}")
+        logs.start()
+        # let the writer thread take the batch, close() would drain it in order anyway
+        deadline = time.monotonic() + 5
+        while db.execute("SELECT COUNT(*) FROM logs").fetchone()[0] < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        logs.close()
+
+        assert [record["error"] for record in logs.records()] == [f"error {i}" for i in range(5)]
+
+
+class TestImport:
+    """Test the one-shot import of data/*.json."""
+
+    def test_import_json_files(self, db, tmp_path):
+        """Test that every file lands in its table and a second run adds nothing."""
+        data = tmp_path / "data"
+        data.mkdir()
+        files = {
+            "bank.json": {"player1": 100, "player2": 50},
+            "stats.json": [{"user_id": "player1", "wins": 2, "total_games": 3},
+                           {"user_id": "player1", "wins": 0, "total_games": 0}],
+            "sogl.json": {"player1": True},
+            "first_vznos.json": {"player1": 100},
+            "game.json": [{"id": "g1", "players": ["player1"], "bet": 10, "winner": ""}],
+            "drotic.json": [{"id": "d1", "players": [], "bet": 0, "cache": []}],
+            "data_second_game.json": [{"username": "player1", "bet": 10, "win": False, "num": 3}],
+            "logs.json": [{"log": "boom", "time": "2024-01-01 00:00:00", "id": "l1"},
+                          {"error": "bang", "time": "2024-01-02 00:00:00", "id": "l2", "path": "/leave"}],
+        }
+        for name, content in files.items():
+            (data / name).write_text(json.dumps(content))
+
+        import_json(db, str(data))
+        again = import_json(db, str(data))
+
+        assert SqliteAccounts(db).get("player2") == 50
+        assert tuple(db.execute("SELECT wins, total_games FROM stats").fetchone()) == (2, 3)
+        assert SqliteLobbyTable(db).match("player2", 10) == "g1"
+        assert SqliteLobbyTable(db, "drotic", empty=empty_drotic_lobby).free_count() == 1
+        assert SqliteRepository(db).values()[0]["num"] == 3
+        assert "bank: 0 of 2" in again
+
+    def test_import_both_log_shapes(self, db, logs, tmp_path):
+        """Test that old "log" records and sink "error" records keep their message."""
+        data = tmp_path / "data"
+        data.mkdir()
+        (data / "logs.json").write_text(json.dumps([
+            {"log": "boom", "time": "2024-01-01 00:00:00", "id": "l1"},
+            {"error": "bang", "time": "2024-01-02 00:00:00", "id": "l2", "path": "/leave"},
+        ]))
+        sink = LogSink(str(data / "logs"))
+        sink.write("crash")
+        sink.close()
+
+        import_json(db, str(data), str(data / "logs"))
+
+        records = list(logs.records())
+        assert [record["error"] for record in records] == ["boom", "bang", "crash"]
+        assert "log" not in records[0] and records[1]["path"] == "/leave"
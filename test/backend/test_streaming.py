@@ -0,0 +1,51 @@
+"""
+Streaming Response Tests for Ludicé API.
+
+Tests the chunked JSON and NDJSON encoders behind the bulk admin endpoints.
+"""
+
+import pytest
+import json
+
+import streaming
+from streaming import json_array_chunks, json_object_chunks, ndjson_lines
+
+
+pytestmark = pytest.mark.backend
+
+
+def body(chunks):
+    """Join streamed chunks into the response body."""
+    return b"".join(chunks).decode("utf-8")
+
+
+class TestStreamingEncoders:
+    """Test that streamed bodies parse to the same JSON as before."""
+
+    def test_array_matches_list(self):
+        """Test that a streamed array equals the list it came from."""
+        games = [{"id": "g1", "players": ["a", "b"]}, {"id": "g2", "players": []}]
+
+        assert json.loads(body(json_array_chunks(iter(games)))) == games
+        assert json.loads(body(json_array_chunks(iter([])))) == []
+
+    def test_object_from_pairs(self):
+        """Test that leaderboard pairs stream as one JSON object."""
+        pairs = [("player1", 10), ("player2", 3)]
+
+        assert json.loads(body(json_object_chunks(pairs))) == {"player1": 10, "player2": 3}
+
+    def test_ndjson_one_record_per_line(self):
+        """Test that NDJSON output has one parsable record per line."""
+        logs = [{"error": "a"}, {"error": "б"}]
+
+        lines = body(ndjson_lines(logs)).splitlines()
+        assert [json.loads(line) for line in lines] == logs
+
+    def test_output_is_chunked(self, monkeypatch):
+        """Test that large outputs are sent in several chunks, not one."""
+        monkeypatch.setattr(streaming, "CHUNK_SIZE", 100)
+        chunks = list(json_array_chunks({"n": i} for i in range(100)))
+
+        assert len(chunks) > 1
+        assert len(json.loads(b"".join(chunks))) == 100
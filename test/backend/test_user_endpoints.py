@@ -37,7 +37,7 @@ class TestUserRegistration:
         }
 
         # Act & Assert
-        with patch("backend.new.KEY", test_secret_key):
+        with patch("backend.new.get_key", return_value=test_secret_key):
             with patch("backend.new.verify_signature", return_value=True):
                 with patch("backend.new.check_time_seciruty", return_value=True):
                     with patch("builtins.open", mock_open(read_data="{}")):
@@ -60,7 +60,7 @@ class TestUserRegistration:
         users_data = {existing_user: "password"}
 
         # Act & Assert
-        with patch("backend.new.KEY", test_secret_key):
+        with patch("backend.new.get_key", return_value=test_secret_key):
             with patch("backend.new.verify_signature", return_value=True):
                 with patch("backend.new.check_time_seciruty", return_value=True):
                     with patch("builtins.open", mock_open(read_data=json.dumps(users_data))):
@@ -79,7 +79,7 @@ class TestUserRegistration:
         }
 
         # Act & Assert
-        with patch("backend.new.KEY", test_secret_key):
+        with patch("backend.new.get_key", return_value=test_secret_key):
             with patch("backend.new.verify_signature", return_value=False):
                 with patch("backend.new.check_time_seciruty", return_value=True):
                     # Should raise HTTPException with 403 status
@@ -97,7 +97,7 @@ class TestUserRegistration:
         user_data["signature"] = signature_generator(user_data)
 
         # Act & Assert
-        with patch("backend.new.KEY", test_secret_key):
+        with patch("backend.new.get_key", return_value=test_secret_key):
             with patch("backend.new.verify_signature", return_value=True):
                 with patch("backend.new.check_time_seciruty", return_value=False):
                     # Should raise HTTPException with 429 status
@@ -121,7 +121,7 @@ class TestBalanceIncrease:
         bank_data = [{"username": "test_user", "balance": 100}]
 
         # Act
-        with patch("backend.new.KEY", test_secret_key):
+        with patch("backend.new.get_key", return_value=test_secret_key):
             with patch("backend.new.verify_signature", return_value=True):
                 with patch("backend.new.check_time_seciruty", return_value=True):
                     # Simulate balance increase
@@ -164,7 +164,7 @@ class TestBalanceIncrease:
         }
 
         # Act & Assert
-        with patch("backend.new.KEY", test_secret_key):
+        with patch("backend.new.get_key", return_value=test_secret_key):
             from backend.new import verify_signature
             result = verify_signature(request_data, request_data["signature"])
             assert result is False
@@ -0,0 +1,101 @@
+"""
+Matchmaking load test for the Postgres game_data table.
+
+Seeds WAITING lobbies with one player each, then lets THREADS workers join
+them concurrently, first with the SKIP LOCKED path of game_core and then
+with the old select-everything-and-loop join. Reports joins per second and
+joins that were lost because two users claimed the same lobby.
+
+Needs the Postgres from backend/sql_database/config.py (DB_USER,
+DB_PASSWORD, DB_HOST, DB_NAME). The game store is routed to a scratch
+schema, so no real lobby is touched. Run from the repository root:
+    python test/benchmarks/bench_matchmaking.py [waiting_lobbies] [threads]
+"""
+
+import os
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+SCHEMA = "bench_matchmaking"
+os.environ["DB_SCHEMA_GAME"] = SCHEMA
+os.environ.setdefault("DB_POOL_SIZE", "32")
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend" / "sql_database" / "game_table"))
+
+from sqlalchemy import delete, func, select, text
+
+import game_core
+from game_core import game_table, sync_engine
+
+
+BETS = [10, 50, 100, 500]
+
+
+def legacy_join(username: str, bet: int) -> str:
+    # the join before SKIP LOCKED: read every waiting lobby, pick one in
+    # Python, write back the player list that was read
+    with sync_engine.connect() as conn:
+        stmt = select(game_table.c.id, game_table.c.players).where(
+            text("array_length(players, 1) = 1"), game_table.c.bet == bet)
+        for game in conn.execute(stmt).fetchall():
+            if username not in game.players:
+                conn.execute(game_table.update().where(game_table.c.id == game.id).values(players=game.players + [username]))
+                conn.commit()
+                return game.id
+        return None
+
+
+def seed(count: int):
+    with sync_engine.begin() as conn:
+        conn.execute(delete(game_table))
+        conn.execute(game_table.insert(), [{
+            "bet": BETS[i % len(BETS)],
+            "players": [f"seed{i}"],
+            "id": str(uuid.uuid4()),
+            "winner": "",
+            "results": {},
+        } for i in range(count)])
+        conn.execute(text(f"ANALYZE {SCHEMA}.game_data"))
+
+
+def players_seated() -> int:
+    with sync_engine.connect() as conn:
+        return conn.execute(select(func.coalesce(func.sum(func.cardinality(game_table.c.players)), 0))).scalar()
+
+
+def run(join, waiting: int, threads: int) -> tuple:
+    seed(waiting)
+    before = players_seated()
+    joins = [0]
+    lock = threading.Lock()
+
+    def worker(index):
+        for i in range(index, waiting, threads):
+            if join(f"user{i}", BETS[i % len(BETS)]) is not None:
+                with lock:
+                    joins[0] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return joins[0], elapsed, joins[0] - (players_seated() - before)
+
+
+def main():
+    waiting = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    game_core.create_table()
+    print(f"{waiting} waiting lobbies, {threads} threads")
+    for name, join in (("skip locked", game_core.start_game_database), ("legacy scan", legacy_join)):
+        joins, elapsed, lost = run(join, waiting, threads)
+        print(f"{name}: {joins / elapsed:.0f} joins/s, {lost} lost joins")
+
+
+if __name__ == "__main__":
+    main()
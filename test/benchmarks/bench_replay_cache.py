@@ -0,0 +1,73 @@
+"""
+Replay cache load test for Ludicé API.
+
+Feeds the in-memory replay cache a full window of signatures at a given
+request rate, then reports memory held and per-lookup cost.
+
+Run from the repository root:
+    python test/benchmarks/bench_replay_cache.py [requests_per_second]
+"""
+
+import hashlib
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from replay_cache import ReplayCache
+
+
+WINDOW = 330  # SIGNATURE_WINDOW + MAX_CLOCK_SKEW in backend/new.py
+THREADS = 8
+
+
+def signatures(count: int, salt: str) -> list:
+    return [hashlib.sha256(f"{salt}{i}".encode()).hexdigest() for i in range(count)]
+
+
+def main():
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    total = rate * WINDOW
+    sigs = signatures(total, "a")
+
+    cache = ReplayCache(ttl=WINDOW)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i, sig in enumerate(sigs):
+        cache.seen(sig, now=i / rate)
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{rate} req/s, {len(cache)} live signatures")
+    print(f"memory: {memory / 2**20:.1f} MiB ({memory / len(cache):.0f} B per signature)")
+    print(f"insert: {elapsed / total * 1e6:.2f} us")
+
+    # steady state: new signatures arrive as old ones expire, from several threads
+    fresh = signatures(rate * 10, "b")
+    clock = [WINDOW]
+
+    def worker(part):
+        for sig in part:
+            clock[0] += 1 / rate
+            cache.seen(sig, now=clock[0])
+
+    threads = [threading.Thread(target=worker, args=(fresh[i::THREADS],)) for i in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    print(f"steady state, {THREADS} threads: {elapsed / len(fresh) * 1e6:.2f} us per request")
+
+    start = time.perf_counter()
+    replays = sum(cache.seen(sig, now=clock[0]) for sig in fresh)
+    elapsed = time.perf_counter() - start
+    print(f"replay lookups: {elapsed / len(fresh) * 1e6:.2f} us, {replays}/{len(fresh)} rejected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Signing micro-benchmark for Ludicé API.
+
+Compares the per-request cost of the original signature path
+(dict copy + json.dumps + hmac.new) with signing.sign.
+
+Run from the repository root:
+    python test/benchmarks/bench_signing.py
+"""
+
+import hashlib
+import hmac
+import json
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+import signing
+
+
+KEY = "test_secret_key_for_hmac_signatures_12345"
+NUMBER = 100_000
+
+REQUESTS = {
+    "Start_Game": {"username": "123456789", "bet": 50, "timestamp": time.time()},
+    "IsLobbyfull": {"lobby_id": "3f1c2d7e-8b4a-4e1f-9c2d-1a2b3c4d5e6f", "timestamp": time.time()},
+    "WriteResult": {"username": "123456789", "game_id": "3f1c2d7e-8b4a-4e1f-9c2d-1a2b3c4d5e6f",
+                    "result": 5, "timestamp": time.time()},
+}
+
+
+def old_sign(data: dict) -> str:
+    data_to_sign = data.copy()
+    data_to_sign.pop("signature", None)
+    data_str = json.dumps(data_to_sign, sort_keys=True, separators=(',', ':'))
+    return hmac.new(KEY.encode(), data_str.encode(), hashlib.sha256).hexdigest()
+
+
+def main():
+    print(f"{'request':<14}{'json.dumps':>14}{'signing':>14}{'speedup':>10}")
+    for name, data in REQUESTS.items():
+        assert old_sign(data) == signing.sign(KEY, data)
+        before = min(timeit.repeat(lambda: old_sign(data), number=NUMBER, repeat=5)) / NUMBER
+        after = min(timeit.repeat(lambda: signing.sign(KEY, data), number=NUMBER, repeat=5)) / NUMBER
+        print(f"{name:<14}{before * 1e6:>11.2f} us{after * 1e6:>11.2f} us{before / after:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
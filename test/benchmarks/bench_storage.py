@@ -0,0 +1,85 @@
+"""
+Storage backend load test for Ludicé API.
+
+Runs the same load against the accounts and stats repositories of each
+backend in backend/repositories.py: USERS users, OPS balance moves and
+counted games, from CONCURRENCY concurrent requests. Reports operations
+per second per entity.
+
+json writes to a temporary directory. sql uses the database of
+backend/sql_database/config.py, so set DB_URL=sqlite:///bench.db or the
+Postgres DB_* variables; it creates main_data and touches only the bench
+users. sqlite is the embedded WAL file of backend/sqlite_store.py, also
+in the temporary directory. Run from the repository root:
+    python test/benchmarks/bench_storage.py [ops] [json|sql|sqlite ...]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from account_store import AccountStore
+from async_io import run_blocking
+from repositories import JsonStats, load_sql
+from sqlite_store import SqliteDatabase, SqliteAccounts, SqliteStats
+
+
+USERS = 100
+CONCURRENCY = 32
+
+
+def open_backend(name: str, directory: str):
+    if name == "json":
+        return AccountStore(f"{directory}/bank.json"), JsonStats(f"{directory}/stats.json")
+    if name == "sqlite":
+        db = SqliteDatabase(f"{directory}/ludice.db")
+        return SqliteAccounts(db), SqliteStats(db)
+    sql = load_sql()
+    import models
+    from sql_i import sync_engine
+    models.metadata_obj.create_all(sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(models.table.delete().where(models.table.c.username.like("bench%")))
+    return sql.SqlAccounts(), sql.SqlStats()
+
+
+async def load(ops: int, call) -> float:
+    queue = asyncio.Queue()
+    for i in range(ops):
+        queue.put_nowait(f"bench{i % USERS}")
+
+    async def worker():
+        while not queue.empty():
+            await call(queue.get_nowait())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return ops / (time.perf_counter() - start)
+
+
+async def run(name: str, ops: int):
+    with tempfile.TemporaryDirectory() as directory:
+        accounts, stats = open_backend(name, directory)
+        for i in range(USERS):
+            accounts.set_default(f"bench{i}", 100)
+            await stats.create(f"bench{i}")
+
+        async def move(user):
+            # the accounts interface is blocking, as in new.py's handlers
+            await run_blocking(accounts.increase, user, 1)
+        balance = await load(ops, move)
+        games = await load(ops, stats.add_game)
+        print(f"{name}: accounts {balance:.0f} ops/s, stats {games:.0f} ops/s")
+
+
+def main():
+    ops = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for name in sys.argv[2:] or ["json", "sql", "sqlite"]:
+        asyncio.run(run(name, ops))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,10 +12,16 @@ import hashlib
 import time
 import tempfile
 import os
+import sys
 from unittest.mock import Mock, patch, AsyncMock
 from typing import Dict, Any, Generator
 from pathlib import Path
 
+# Backend modules import their siblings directly (the API runs from backend/)
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
 # FastAPI testing
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
@@ -541,3 +541,28 @@ class TestInvoiceGeneration:
         call_kwargs = callback.message.answer_invoice.call_args[1]
         assert "description" in call_kwargs
         assert len(call_kwargs["description"]) > 0
+
+
+class TestLongPollRequests:
+    """Test the signed bodies the bot sends to the long-poll endpoints."""
+
+    @pytest.mark.parametrize("remaining", [300, 10, 0])
+    def test_lobby_fill_signature_survives_backend_parsing(self, remaining):
+        """Test that /wait/lobby/fill verifies the bot's body after WaitLobby parses it."""
+        # Arrange
+        from frontend.routers.private_user import lobby_fill_request, get_key_for_api
+        from frontend.common import signing
+
+        # Act
+        data = lobby_fill_request("lobby1", remaining)
+        # What the endpoint verifies: WaitLobby holds wait and timestamp as floats
+        parsed = {
+            "lobby_id": data["lobby_id"],
+            "wait": float(data["wait"]),
+            "timestamp": float(data["timestamp"]),
+            "signature": data["signature"],
+        }
+
+        # Assert
+        assert type(data["wait"]) is float
+        assert signing.verify(get_key_for_api(), parsed, data["signature"])